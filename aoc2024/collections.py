@@ -1,58 +1,250 @@
 import heapq
 import itertools
-from dataclasses import dataclass
+from array import array
+from collections.abc import (
+    Hashable, Iterable, Iterator, MutableMapping, MutableSequence
+)
+from typing import Any
 
 
-@dataclass
-class HeapEntry[T]:
-    element: T
-    priority: float
-    count: int
+class PriorityQueue[T]:
+    """A binary-heap priority queue supporting priority updates.
+
+    Heap entries are ``[priority, count, element]`` lists, so comparisons
+    never reach the elements themselves. Updated and removed elements leave
+    tombstones behind, which are purged once they make up more than half of
+    the heap.
+    """
+    _REMOVED: Any = object()
+    _COMPACTION_THRESHOLD = 64
+
+    def __init__(
+            self,
+            prioritized_elements: Iterable[tuple[T, float]] | None = None
+    ):
+        self._counter = itertools.count()
+        self._entry_finder: dict[T, list] = {
+            element: [priority, next(self._counter), element]
+            for element, priority in prioritized_elements or []
+        }
+        self._heap = list(self._entry_finder.values())
+        heapq.heapify(self._heap)
+        self._removed_count = 0
 
-    def __lt__(self, other):
-        return (
-            (self.priority, self.count, self.element)
-            < (other.priority, other.count, other.element)
-        )
+    def __bool__(self):
+        return bool(self._entry_finder)
 
+    def __len__(self):
+        return len(self._entry_finder)
 
-class PriorityQueue[T]:
+    def __contains__(self, element: T):
+        return element in self._entry_finder
+
+    def add(self, element: T, priority: float = 0):
+        'Add a new element or update the priority of an existing element'
+        if element in self._entry_finder:
+            self.remove(element)
+        entry = [priority, next(self._counter), element]
+        self._entry_finder[element] = entry
+        heapq.heappush(self._heap, entry)
+
+    def decrease_key(self, element: T, priority: float):
+        'Lower the priority of an element. Raise KeyError if not found.'
+        current_priority = self._entry_finder[element][0]
+        if priority > current_priority:
+            raise ValueError(
+                f'Cannot decrease the priority of {element} from '
+                f'{current_priority} to {priority}.'
+            )
+        self.add(element, priority)
+
+    def remove(self, element: T):
+        'Mark an existing element as removed. Raise KeyError if not found.'
+        entry = self._entry_finder.pop(element)
+        entry[2] = self._REMOVED
+        self._removed_count += 1
+        if (
+                self._removed_count > self._COMPACTION_THRESHOLD
+                and 2 * self._removed_count > len(self._heap)
+        ):
+            self._compact()
+
+    def peek(self) -> tuple[T, float]:
+        'Return the lowest priority element. Raise KeyError if empty.'
+        self._discard_removed_minima()
+        if not self._heap:
+            raise KeyError('peek at an empty priority queue')
+        priority, _, element = self._heap[0]
+        return element, priority
+
+    def pop(self) -> tuple[T, float]:
+        'Remove and return the lowest priority element. Raise KeyError if empty.'
+        self._discard_removed_minima()
+        if not self._heap:
+            raise KeyError('pop from an empty priority queue')
+        priority, _, element = heapq.heappop(self._heap)
+        del self._entry_finder[element]
+        return element, priority
+
+    def _discard_removed_minima(self):
+        heap = self._heap
+        while heap and heap[0][2] is self._REMOVED:
+            heapq.heappop(heap)
+            self._removed_count -= 1
+
+    def _compact(self):
+        self._heap = [
+            entry for entry in self._heap if entry[2] is not self._REMOVED
+        ]
+        heapq.heapify(self._heap)
+        self._removed_count = 0
+
+
+class BucketQueue[T]:
+    """A priority queue storing one heap entry per distinct priority.
+
+    Elements sharing a priority are kept together in a bucket, so when
+    priorities repeat often (as path costs do on graphs with small integer
+    edge weights) most additions and removals are list operations rather
+    than heap operations. Re-adding an element updates its priority.
+    """
     def __init__(
             self,
             prioritized_elements: list[tuple[T, float]] | None = None
     ):
-        if prioritized_elements is None:
-            prioritized_elements = []
-
-        self._heap = []
-        self._heap_entry_finder: dict[T, HeapEntry[T]] = {}
-        self._REMOVED = '<removed-task>'
-        self._counter = itertools.count()
+        self._buckets: dict[float, list[T]] = {}
+        self._priorities: list[float] = []
+        self._priority_of: dict[T, float] = {}
 
-        for element, priority in prioritized_elements:
+        for element, priority in prioritized_elements or []:
             self.add(element, priority)
 
     def __bool__(self):
-        return bool(self._heap)
+        return bool(self._priority_of)
+
+    def __len__(self):
+        return len(self._priority_of)
 
     def add(self, element: T, priority: float = 0):
-        'Add a new task or update the priority of an existing task'
-        if element in self._heap_entry_finder:
-            self.remove(element)
-        entry = HeapEntry(element, priority, next(self._counter))
-        self._heap_entry_finder[element] = entry
-        heapq.heappush(self._heap, entry)  # type: ignore
-
-    def remove(self, element: HeapEntry[T]):
-        'Mark an existing task as REMOVED. Raise KeyError if not found.'
-        entry = self._heap_entry_finder.pop(element)
-        entry.element = self._REMOVED
-
-    def pop(self):
-        'Remove and return the lowest priority task. Raise KeyError if empty.'
-        while self._heap:
-            entry = heapq.heappop(self._heap)
-            if (element := entry.element) is not self._REMOVED:
-                del self._heap_entry_finder[element]
-                return element, entry.priority
+        'Add a new element or update the priority of an existing element'
+        self._priority_of[element] = priority
+        bucket = self._buckets.get(priority)
+        if bucket is None:
+            self._buckets[priority] = [element]
+            heapq.heappush(self._priorities, priority)
+        else:
+            bucket.append(element)
+
+    def pop(self) -> tuple[T, float]:
+        'Remove and return a lowest priority element. Raise KeyError if empty.'
+        while self._priorities:
+            priority = self._priorities[0]
+            bucket = self._buckets[priority]
+            while bucket:
+                element = bucket.pop()
+                if self._priority_of.get(element, None) == priority:
+                    del self._priority_of[element]
+                    return element, priority
+            del self._buckets[priority]
+            heapq.heappop(self._priorities)
         raise KeyError('pop from an empty priority queue')
+
+
+class DisjointSet[T: Hashable]:
+    """Union-find over a partition of elements into disjoint sets.
+
+    Uses path compression and union by rank. Constructed with an integer
+    ``n``, the elements are ``range(n)`` and are stored in arrays;
+    otherwise elements are stored in dicts and added on first use.
+    """
+    def __init__(self, elements: int | Iterable[T] = ()):
+        self._parent: MutableMapping[T, T] | MutableSequence[int]
+        self._rank: MutableMapping[T, int] | MutableSequence[int]
+        self._size: MutableMapping[T, int] | MutableSequence[int]
+        if isinstance(elements, int):
+            self._parent = array('q', range(elements))
+            self._rank = bytearray(elements)
+            self._size = array('q', [1]) * elements
+            self._element_count = self._set_count = elements
+            self._indexed = True
+        else:
+            self._parent, self._rank, self._size = {}, {}, {}
+            self._element_count = self._set_count = 0
+            self._indexed = False
+            for element in elements:
+                self.add(element)
+
+    def __len__(self):
+        return self._element_count
+
+    def __contains__(self, element: T):
+        if self._indexed:
+            return (
+                isinstance(element, int) and 0 <= element < len(self._parent)
+            )
+        return element in self._parent
+
+    def __iter__(self) -> Iterator[T]:
+        if self._indexed:
+            return iter(range(len(self._parent)))  # type: ignore
+        return iter(self._parent)  # type: ignore
+
+    @property
+    def set_count(self) -> int:
+        return self._set_count
+
+    def add(self, element: T):
+        'Add an element as a singleton set if it is not already present'
+        if element in self:
+            return
+        if self._indexed:
+            raise KeyError(
+                f'Cannot add {element} to a disjoint set of range('
+                f'{len(self._parent)}).'
+            )
+        self._parent[element] = element  # type: ignore
+        self._rank[element] = 0  # type: ignore
+        self._size[element] = 1  # type: ignore
+        self._element_count += 1
+        self._set_count += 1
+
+    def find(self, element: T) -> T:
+        'Return the representative of the set containing element'
+        parent = self._parent
+        if not self._indexed and element not in parent:
+            self.add(element)
+            return element
+        root = element
+        while (root_parent := parent[root]) != root:  # type: ignore
+            root = root_parent
+        while element != root:
+            parent[element], element = root, parent[element]  # type: ignore
+        return root
+
+    def union(self, element: T, other_element: T) -> bool:
+        'Merge the sets of two elements, returning whether they were distinct'
+        root, other_root = self.find(element), self.find(other_element)
+        if root == other_root:
+            return False
+        rank = self._rank
+        if rank[root] < rank[other_root]:  # type: ignore
+            root, other_root = other_root, root
+        elif rank[root] == rank[other_root]:  # type: ignore
+            rank[root] += 1  # type: ignore
+        self._parent[other_root] = root  # type: ignore
+        self._size[root] += self._size[other_root]  # type: ignore
+        self._set_count -= 1
+        return True
+
+    def connected(self, element: T, other_element: T) -> bool:
+        return self.find(element) == self.find(other_element)
+
+    def size(self, element: T) -> int:
+        'Return the number of elements in the set containing element'
+        return self._size[self.find(element)]  # type: ignore
+
+    def groups(self) -> list[set[T]]:
+        groups: dict[T, set[T]] = {}
+        for element in self:
+            groups.setdefault(self.find(element), set()).add(element)
+        return list(groups.values())
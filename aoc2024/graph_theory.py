@@ -1,18 +1,234 @@
 from __future__ import annotations
 
+import ast
+import hashlib
 import heapq
 import itertools
 import math
+import mmap
+import os
+import pathlib
+import pickle
+import sys
+import tempfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from collections import deque, defaultdict
-from collections.abc import Hashable, Set, Sequence, Mapping, Callable
-from copy import deepcopy
-from functools import cached_property, cache, lru_cache
-from typing import Any, Union, Generator
-
-from aoc2024.collections import PriorityQueue
+from dataclasses import dataclass
+from collections.abc import (
+    Hashable, Set, Sequence, Mapping, Callable, Collection, Iterable,
+    Iterator, MutableMapping, MutableSequence
+)
+from functools import cached_property, partial, wraps
+from typing import (
+    Any, Concatenate, Union, Generator, NamedTuple, Protocol
+)
+
+from aoc2024.collections import BucketQueue, DisjointSet, PriorityQueue
 
 type Node[T: Hashable] = T
 type Edge[T: Hashable] = tuple[T, T]
+type Successors[N] = Callable[[N], Iterable[tuple[N, Any]]]
+type SearchSpace[T, N] = tuple[
+    Successors[N], Callable[[T], N], Callable[[N], T]
+]
+
+
+class SearchableGraph[T: Hashable](Protocol):
+    """What the search functions need from a graph.
+
+    Searches run over the encoded nodes of ``_search_space``, so a graph
+    may generate its adjacency however it likes.
+    """
+    @property
+    def is_directed(self) -> bool: ...
+
+    @property
+    def nodes(self) -> Collection[T]: ...
+
+    def _search_space(
+            self, edge_weight: Any = ..., reverse: bool = ...
+    ) -> SearchSpace[T, Any]: ...
+
+    def _has_integer_weights(self, edge_weight: Any) -> bool: ...
+
+
+def _identity[T](value: T) -> T:
+    return value
+
+
+class CycleError(ValueError):
+    def __init__(self, cycle: Sequence[Hashable]):
+        self.cycle = list(cycle)
+        super().__init__(
+            'The graph contains the cycle '
+            + ' -> '.join(map(repr, [*self.cycle, self.cycle[0]]))
+        )
+
+
+type _CacheKey = tuple[str, tuple[Any, ...], tuple[tuple[str, Any], ...]]
+
+
+class _GraphCache:
+    def __init__(self):
+        self.per_node: defaultdict[str, dict[Hashable, Any]] = (
+            defaultdict(dict)
+        )
+        self.paths: dict[Hashable, Any] = {}
+        self.path_nodes: dict[Hashable, frozenset[Hashable] | None] = {}
+        self.path_keys_through: defaultdict[Hashable, set[Hashable]] = (
+            defaultdict(set)
+        )
+        self.structures: dict[_CacheKey, Any] = {}
+
+    def remember_paths(
+            self,
+            key: Hashable,
+            result: Any,
+            paths: Iterable[Iterable[Hashable]] | None
+    ):
+        self.paths[key] = result
+        if paths is None:
+            self.path_nodes[key] = None
+            return
+        self.path_nodes[key] = nodes = frozenset(
+            itertools.chain.from_iterable(paths)
+        )
+        for node in nodes:
+            self.path_keys_through[node].add(key)
+
+    def forget_nodes(self, nodes: Iterable[Hashable]):
+        for results in self.per_node.values():
+            for node in nodes:
+                results.pop(node, None)
+
+    def forget_paths_through(self, node: Hashable):
+        self._forget_paths(self.path_keys_through.get(node, set()))
+
+    def forget_paths_along(self, edge: Edge[Hashable]):
+        source, target = edge
+        self._forget_paths(
+            self.path_keys_through.get(source, set())
+            & self.path_keys_through.get(target, set())
+        )
+
+    def forget_global_paths(self):
+        self._forget_paths(set())
+
+    def forget_all_paths(self):
+        self.paths.clear()
+        self.path_nodes.clear()
+        self.path_keys_through.clear()
+
+    def forget_structures(self, keep: Set[str] = frozenset()):
+        self.structures = {
+            key: structure
+            for key, structure in self.structures.items()
+            if key[0] in keep
+        }
+
+    def update_structures(self, name: str, update: Callable[[Any], Any]):
+        for key, structure in self.structures.items():
+            if key[0] == name:
+                self.structures[key] = update(structure)
+
+    def _forget_paths(self, keys: Set[Hashable]):
+        keys = keys | {
+            key for key, nodes in self.path_nodes.items() if nodes is None
+        }
+        for key in keys:
+            del self.paths[key]
+            for node in self.path_nodes.pop(key) or ():
+                self.path_keys_through[node].discard(key)
+                if not self.path_keys_through[node]:
+                    del self.path_keys_through[node]
+
+
+def _cached_per_node[N, R](
+        method: Callable[[Any, N], R]
+) -> Callable[[Any, N], R]:
+    name = method.__name__
+
+    @wraps(method)
+    def cached_method(self: Any, node: N) -> R:
+        results = self._cache.per_node[name]
+        try:
+            return results[node]
+        except KeyError:
+            result = results[node] = method(self, node)
+            return result
+    return cached_method
+
+
+def _cached_paths[**P, R](
+        support: Callable[[Any], Iterable[Iterable[Hashable]] | None]
+) -> Callable[
+    [Callable[Concatenate[Any, P], R]], Callable[Concatenate[Any, P], R]
+]:
+    def decorator(
+            method: Callable[Concatenate[Any, P], R]
+    ) -> Callable[Concatenate[Any, P], R]:
+        name = method.__name__
+
+        @wraps(method)
+        def cached_method(self: Any, *args: P.args, **kwargs: P.kwargs) -> R:
+            key = (name, args, tuple(kwargs.items()))
+            try:
+                return self._cache.paths[key]
+            except KeyError:
+                result = method(self, *args, **kwargs)
+                self._cache.remember_paths(key, result, support(result))
+                return result
+            except TypeError:
+                # Unhashable arguments (e.g., a list of targets) cannot be
+                # cached.
+                return method(self, *args, **kwargs)
+        return cached_method
+    return decorator
+
+
+def _cached_structure[**P, R](
+        method: Callable[Concatenate[Any, P], R]
+) -> Callable[Concatenate[Any, P], R]:
+    name = method.__name__
+
+    @wraps(method)
+    def cached_method(self: Any, *args: P.args, **kwargs: P.kwargs) -> R:
+        key = (name, args, tuple(kwargs.items()))
+        try:
+            return self._cache.structures[key]
+        except KeyError:
+            result = self._cache.structures[key] = method(
+                self, *args, **kwargs
+            )
+            return result
+    return cached_method
+
+
+def _shortest_path_support(
+        path_and_distance: tuple[Sequence[Hashable], float]
+) -> Iterable[Sequence[Hashable]]:
+    path, _ = path_and_distance
+    return [path]
+
+
+def _shortest_path_dag_support(
+        shortest_paths: ShortestPathDAG
+) -> Iterable[Iterable[Hashable]]:
+    return [
+        shortest_paths.nodes_on_paths(target)
+        for target in shortest_paths.targets
+    ]
+
+
+def _shortest_paths_support(
+        paths: Any
+) -> Iterable[Sequence[Hashable]] | None:
+    if isinstance(paths, Mapping):
+        return None
+    if isinstance(paths, tuple):
+        paths, _ = paths
+    return paths
 
 
 class UndirectedGraph[T: Hashable]:
@@ -25,13 +241,14 @@ class UndirectedGraph[T: Hashable]:
             edges, default_edge_weight, self.is_directed
         )
         self._neighbors: dict[Node[T], set[Node[T]]] = {
-            node: set(self._edges.get(node, set())) for node in self._nodes
+            node: set(self._edges.get(node, ())) for node in self._nodes
         }
-        for target in self._nodes:
-            for source in self._edges:
-                if target in self._edges[source]:
-                    self._neighbors[target].add(source)
+        for source, targets in self._edges.items():
+            for target in targets:
+                self._neighbors[target].add(source)
         self._in_nodes = self._out_nodes = self._neighbors
+        self._edge_count = sum(map(len, self._edges.values()))
+        self._cache = _GraphCache()
 
     def __getitem__(self, edge: Edge[T]):
         return self._edges[edge[0]][edge[1]]
@@ -41,8 +258,8 @@ class UndirectedGraph[T: Hashable]:
         return False
 
     @cached_property
-    def edges(self) -> EdgeView[Edge[T]]:
-        return EdgeView(self._edges, self.is_directed)
+    def edges(self) -> EdgeView[T]:
+        return EdgeView(self)
 
     @cached_property
     def nodes(self) -> Sequence[Node[T]]:
@@ -54,38 +271,48 @@ class UndirectedGraph[T: Hashable]:
         self._nodes[node] = {}
         self._neighbors[node] = set()
 
-        try:
-            del self.__dict__['nodes']
-        except KeyError:
-            pass
+        self._cache.forget_global_paths()
+        self._cache.forget_structures()
+        self._forget_views()
 
     def add_edge(self, edge: Edge[T]):
         source, target = edge
-        self._edges.setdefault(source, {}).setdefault(target, {})
+        # Each edge is stored once, in the orientation it was first added.
+        if (source, target) not in self.edges:
+            self._edges.setdefault(source, {})[target] = {}
+            self._edge_count += 1
         for node in edge:
             self.add_node(node)
 
         self._neighbors[source].add(target)
         self._neighbors[target].add(source)
 
-        self._clear_caches()
+        self._cache.forget_nodes(edge)
+        self._cache.forget_all_paths()
+        self._cache.forget_structures()
+        self._forget_views()
 
     def remove_node(self, node: Node[T]):
         if node not in self._nodes:
             return
         del self._nodes[node]
+        self._edge_count -= len(self._neighbors[node])
         for neighbor in self._neighbors[node]:
             self._neighbors[neighbor].remove(node)
             try:
                 del self._edges[neighbor][node]
             except KeyError:
                 continue
-        del self._neighbors[node]
+        neighbors = self._neighbors.pop(node)
         try:
             del self._edges[node]
         except KeyError:
             pass
-        self._clear_caches()
+
+        self._cache.forget_nodes((node, *neighbors))
+        self._cache.forget_paths_through(node)
+        self._cache.forget_structures()
+        self._forget_views()
 
     def remove_edge(self, edge: Edge[T]):
         to_remove = {edge}
@@ -96,10 +323,15 @@ class UndirectedGraph[T: Hashable]:
                 del self._edges[source][target]
             except KeyError:
                 continue
+            self._edge_count -= 1
 
         self._neighbors[edge[0]].remove(edge[1])
         self._neighbors[edge[1]].remove(edge[0])
-        self._clear_caches()
+
+        self._cache.forget_nodes(edge)
+        self._cache.forget_paths_along(edge)
+        self._cache.forget_structures()
+        self._forget_views()
 
     def to_directed(self) -> DiGraph[T]:
         return DiGraph(
@@ -112,15 +344,49 @@ class UndirectedGraph[T: Hashable]:
             )
         )
 
-    @cache
+    def to_compact(self, edge_weight: str = 'weight') -> CompactGraph[T]:
+        return CompactGraph.from_graph(self, edge_weight)
+
+    def save(
+            self,
+            path: str | os.PathLike,
+            edge_weight: str = 'weight',
+            content_hash: str | None = None
+    ) -> str:
+        return self.to_compact(edge_weight).save(path, content_hash)
+
+    @classmethod
+    def load(
+            cls,
+            path: str | os.PathLike,
+            mmap: bool = True,
+            content_hash: str | None = None
+    ) -> CompactGraph[T]:
+        """Load a snapshot written by save as a CompactGraph.
+
+        Like CompactGraph.load, this unpickles parts of the file, so only
+        load snapshots from a trusted source.
+        """
+        return CompactGraph.load(path, mmap, content_hash)
+
+    def _search_space(
+            self, edge_weight='weight', reverse: bool = False
+    ) -> SearchSpace[T, T]:
+        return _dict_search_space(self, self._neighbors, edge_weight, reverse)
+
+    @_cached_structure
+    def _has_integer_weights(self, edge_weight: str) -> bool:
+        return _dict_has_integer_weights(self._edges, edge_weight)
+
+    @_cached_per_node
     def neighbors(self, node: Node[T]) -> Set[T]:
         return self._neighbors[node]
 
-    @cache
+    @_cached_per_node
     def in_edges(self, node: Node[T]) -> set[Edge[T]]:
         return {(neighbor, node) for neighbor in self._in_nodes[node]}
 
-    @cache
+    @_cached_per_node
     def out_edges(self, node: Node[T]) -> set[Edge[T]]:
         return {(node, neighbor) for neighbor in self._out_nodes[node]}
 
@@ -130,11 +396,88 @@ class UndirectedGraph[T: Hashable]:
     def out_nodes(self, node: Node[T]) -> set[Node[T]]:
         return self.neighbors(node)
 
-    @cache
+    @_cached_structure
+    def node_index(self) -> dict[T, int]:
+        return {node: index for index, node in enumerate(self._nodes)}
+
+    @_cached_structure
+    def connected_components(self) -> list[set[Node[T]]]:
+        return _connected_components(self._nodes, self._neighbors.__getitem__)
+
+    @_cached_structure
+    def reachable_from(
+            self, node: Node[T], bitset: bool = False
+    ) -> set[Node[T]] | int:
+        reachable_nodes = _reachable_from(node, self._neighbors.__getitem__)
+        if bitset:
+            return _pack_bitset(
+                map(self.node_index().__getitem__, reachable_nodes),
+                len(self._nodes)
+            )
+        return reachable_nodes
+
+    @_cached_structure
     def cliques(self) -> Sequence[set[Node[T]]]:
-        return list(_ibk_gpx(self, set(), set(self.nodes), set()))
+        return list(self.iter_cliques())
+
+    def iter_cliques(self) -> Iterator[set[Node[T]]]:
+        nodes, neighbors = self._clique_bitsets()
+        for clique in _iter_bitset_cliques(neighbors, [0]):
+            yield {nodes[index] for index in clique}
+
+    @_cached_structure
+    def max_clique(self) -> set[Node[T]]:
+        nodes, neighbors = self._clique_bitsets()
+        # Every clique found raises the size that the remaining branches
+        # must be able to beat.
+        minimum_size = [0]
+        largest_clique: list[int] = []
+        for clique in _iter_bitset_cliques(neighbors, minimum_size):
+            largest_clique = clique
+            minimum_size[0] = len(clique) + 1
+        return {nodes[index] for index in largest_clique}
+
+    def cliques_of_size(self, size: int) -> Iterator[set[Node[T]]]:
+        nodes, neighbors = self._clique_bitsets()
+        for clique in _iter_bitset_cliques(neighbors, [size], size):
+            yield {nodes[index] for index in clique}
+
+    def triangles(
+            self, filter: Callable[[Node[T]], bool] | None = None
+    ) -> Iterator[tuple[Node[T], Node[T], Node[T]]]:
+        nodes, neighbors = self._clique_bitsets()
+        for anchor, candidates in _clique_anchors(nodes, neighbors, filter):
+            for clique in _iter_ordered_cliques(
+                    neighbors, [anchor], candidates, 2
+            ):
+                yield tuple(nodes[index] for index in clique)  # type: ignore
+
+    def count_k_cliques(
+            self, k: int, filter: Callable[[Node[T]], bool] | None = None
+    ) -> int:
+        if k < 1:
+            raise ValueError(f'Cliques must have at least one node, not {k}.')
+        nodes, neighbors = self._clique_bitsets()
+        return sum(
+            _count_ordered_cliques(neighbors, candidates, k - 1)
+            for _, candidates in _clique_anchors(nodes, neighbors, filter)
+        )
+
+    @_cached_structure
+    def _clique_bitsets(self) -> tuple[list[T], list[int]]:
+        nodes = _degeneracy_order(self._neighbors)
+        index = {node: position for position, node in enumerate(nodes)}
+        neighbors = [
+            sum(
+                1 << index[neighbor]
+                for neighbor in self._neighbors[node]
+                if neighbor != node
+            )
+            for node in nodes
+        ]
+        return nodes, neighbors
 
-    @cache
+    @_cached_paths(_shortest_paths_support)
     def all_shortest_paths(
             self,
             source: Node[T],
@@ -158,29 +501,78 @@ class UndirectedGraph[T: Hashable]:
             return all_shortest_paths_to_targets(
                 graph=self,
                 source=source,
-                targets=[target] if target in self.nodes else target,
+                targets=_as_targets(self, target),
                 with_distance=with_distance,
                 edge_weight=edge_weight
             )
 
-    @cache
+    @_cached_paths(_shortest_path_support)
     def shortest_path(
             self,
             source: Node[T],
             target: Node[T],
             heuristic: Callable[[Node[T], Node[T]], float],
+            edge_weight = 'weight',
+            statistics: SearchStatistics | None = None
+    ) -> tuple[Sequence[Node[T]], float]:
+        return shortest_path(
+            self, source, target, heuristic, edge_weight, statistics
+        )
+
+    @_cached_paths(_shortest_path_support)
+    def shortest_path_to_any(
+            self,
+            source: Node[T],
+            targets: Iterable[Node[T]],
+            heuristic: Callable[[Node[T], Node[T]], float],
+            edge_weight = 'weight',
+            statistics: SearchStatistics | None = None
+    ) -> tuple[Sequence[Node[T]], float]:
+        return shortest_path_to_any(
+            self, source, targets, heuristic, edge_weight, statistics
+        )
+
+    @_cached_paths(_shortest_path_support)
+    def bidirectional_shortest_path(
+            self,
+            source: Node[T],
+            target: Node[T],
             edge_weight = 'weight'
     ) -> tuple[Sequence[Node[T]], float]:
-        return shortest_path(self, source, target, heuristic, edge_weight)
+        return bidirectional_shortest_path(self, source, target, edge_weight)
+
+    @_cached_paths(_shortest_path_dag_support)
+    def shortest_path_dag(
+            self,
+            source: Node[T],
+            targets: Node[T] | Iterable[Node[T]],
+            edge_weight = 'weight'
+    ) -> ShortestPathDAG[T]:
+        return shortest_path_dag(
+            self, source, _as_targets(self, targets), edge_weight
+        )
 
-    def _clear_caches(self):
-        self.in_edges.cache_clear()
-        self.out_edges.cache_clear()
-        self.neighbors.cache_clear()
-        self.cliques.cache_clear()
-        self.all_shortest_paths.cache_clear()
-        self.shortest_path.cache_clear()
+    @_cached_structure
+    def distances_from(
+            self, source: Node[T], edge_weight = 'weight'
+    ) -> ShortestPathTree[T]:
+        return distances_from(self, source, edge_weight)
 
+    @_cached_structure
+    def distances_to(
+            self, target: Node[T], edge_weight = 'weight'
+    ) -> ShortestPathTree[T]:
+        return distances_to(self, target, edge_weight)
+
+    @_cached_structure
+    def all_pairs_distances(
+            self,
+            edge_weight = 'weight',
+            cache_directory: str | os.PathLike | None = None
+    ) -> DistanceMatrix[T]:
+        return all_pairs_distances(self, edge_weight, cache_directory)
+
+    def _forget_views(self):
         for cached_property_name in ('nodes', 'edges'):
             try:
                 del self.__dict__[cached_property_name]
@@ -204,6 +596,8 @@ class DiGraph[T: Hashable]:
         for source in self._edges:
             for target in self._edges[source]:
                 self._in_nodes[target].add(source)
+        self._edge_count = sum(map(len, self._edges.values()))
+        self._cache = _GraphCache()
 
     def __getitem__(self, edge: Edge[T]):
         return self._edges[edge[0]][edge[1]]
@@ -213,14 +607,14 @@ class DiGraph[T: Hashable]:
         return True
 
     @cached_property
-    def edges(self) -> EdgeView[Edge[T]]:
-        return EdgeView(self._edges, self.is_directed)
+    def edges(self) -> EdgeView[T]:
+        return EdgeView(self)
 
-    @cache
+    @_cached_per_node
     def in_edges(self, node: Node[T]) -> set[Edge[T]]:
         return {(neighbor, node) for neighbor in self._in_nodes[node]}
 
-    @cache
+    @_cached_per_node
     def out_edges(self, node: Node[T]) -> set[Edge[T]]:
         return {(node, neighbor) for neighbor in self._out_nodes[node]}
 
@@ -235,14 +629,18 @@ class DiGraph[T: Hashable]:
         self._in_nodes[node] = set()
         self._out_nodes[node] = set()
 
-        try:
-            del self.__dict__['nodes']
-        except KeyError:
-            pass
+        self._cache.forget_global_paths()
+        self._cache.forget_structures(keep={'_topological_order'})
+        self._cache.update_structures(
+            '_topological_order', lambda order: [*order, node]
+        )
+        self._forget_views()
 
     def add_edge(self, edge: Edge[T]):
         source, target = edge
-        self._edges.setdefault(source, {}).setdefault(target, {})
+        if (source, target) not in self.edges:
+            self._edges.setdefault(source, {})[target] = {}
+            self._edge_count += 1
         for node in edge:
             self.add_node(node)
 
@@ -253,12 +651,20 @@ class DiGraph[T: Hashable]:
         self._out_nodes[source].add(target)
         self._in_nodes[target].add(source)
 
-        self._clear_caches()
+        self._cache.forget_nodes(edge)
+        self._cache.forget_all_paths()
+        self._cache.forget_structures()
+        self._forget_views()
 
     def remove_node(self, node: Node[T]):
         if node not in self._nodes:
             return
         del self._nodes[node]
+        self._edge_count -= (
+            len(self._out_nodes[node])
+            + len(self._in_nodes[node])
+            - (node in self._out_nodes[node])
+        )
 
         for out_node in self._out_nodes[node]:
             self._in_nodes[out_node].remove(node)
@@ -266,7 +672,7 @@ class DiGraph[T: Hashable]:
                 del self._edges[out_node][node]
             except KeyError:
                 continue
-        del self._out_nodes[node]
+        out_nodes = self._out_nodes.pop(node)
 
         for in_node in self._in_nodes[node]:
             self._out_nodes[in_node].remove(node)
@@ -274,13 +680,21 @@ class DiGraph[T: Hashable]:
                 del self._edges[in_node][node]
             except KeyError:
                 continue
-        del self._in_nodes[node]
+        in_nodes = self._in_nodes.pop(node)
 
         try:
             del self._edges[node]
         except KeyError:
             pass
-        self._clear_caches()
+
+        self._cache.forget_nodes((node, *out_nodes, *in_nodes))
+        self._cache.forget_paths_through(node)
+        self._cache.forget_structures(keep={'_topological_order'})
+        self._cache.update_structures(
+            '_topological_order',
+            lambda order: [other for other in order if other != node]
+        )
+        self._forget_views()
 
     def remove_edge(self, edge: Edge[T]):
         source, target = edge
@@ -288,15 +702,20 @@ class DiGraph[T: Hashable]:
             return
 
         del self._edges[source][target]
+        self._edge_count -= 1
         self._out_nodes[source].remove(target)
         self._in_nodes[target].remove(source)
-        self._clear_caches()
 
-    @cache
+        self._cache.forget_nodes(edge)
+        self._cache.forget_paths_along(edge)
+        self._cache.forget_structures(keep={'_topological_order'})
+        self._forget_views()
+
+    @_cached_per_node
     def in_nodes(self, node: Node[T]) -> set[Node[T]]:
         return self._in_nodes[node]
 
-    @cache
+    @_cached_per_node
     def out_nodes(self, node: Node[T]) -> set[Node[T]]:
         return self._out_nodes[node]
 
@@ -306,7 +725,46 @@ class DiGraph[T: Hashable]:
     def children(self, parent: Node[T]) -> set[Node[T]]:
         return self.out_nodes(parent)
 
-    @cache
+    def to_compact(self, edge_weight: str = 'weight') -> CompactGraph[T]:
+        return CompactGraph.from_graph(self, edge_weight)
+
+    def save(
+            self,
+            path: str | os.PathLike,
+            edge_weight: str = 'weight',
+            content_hash: str | None = None
+    ) -> str:
+        return self.to_compact(edge_weight).save(path, content_hash)
+
+    @classmethod
+    def load(
+            cls,
+            path: str | os.PathLike,
+            mmap: bool = True,
+            content_hash: str | None = None
+    ) -> CompactGraph[T]:
+        """Load a snapshot written by save as a CompactGraph.
+
+        Like CompactGraph.load, this unpickles parts of the file, so only
+        load snapshots from a trusted source.
+        """
+        return CompactGraph.load(path, mmap, content_hash)
+
+    def _search_space(
+            self, edge_weight='weight', reverse: bool = False
+    ) -> SearchSpace[T, T]:
+        return _dict_search_space(
+            self,
+            self._in_nodes if reverse else self._out_nodes,
+            edge_weight,
+            reverse
+        )
+
+    @_cached_structure
+    def _has_integer_weights(self, edge_weight: str) -> bool:
+        return _dict_has_integer_weights(self._edges, edge_weight)
+
+    @_cached_paths(_shortest_paths_support)
     def all_shortest_paths(
             self,
             source: Node[T],
@@ -330,58 +788,152 @@ class DiGraph[T: Hashable]:
             return all_shortest_paths_to_targets(
                 graph=self,
                 source=source,
-                targets=[target] if target in self.nodes else target,
+                targets=_as_targets(self, target),
                 with_distance=with_distance,
                 edge_weight=edge_weight
             )
 
-    @cache
+    @_cached_paths(_shortest_path_support)
     def shortest_path(
             self,
             source: Node[T],
             target: Node[T],
             heuristic: Callable[[Node[T], Node[T]], float],
+            edge_weight = 'weight',
+            statistics: SearchStatistics | None = None
+    ) -> tuple[Sequence[Node[T]], float]:
+        return shortest_path(
+            self, source, target, heuristic, edge_weight, statistics
+        )
+
+    @_cached_paths(_shortest_path_support)
+    def shortest_path_to_any(
+            self,
+            source: Node[T],
+            targets: Iterable[Node[T]],
+            heuristic: Callable[[Node[T], Node[T]], float],
+            edge_weight = 'weight',
+            statistics: SearchStatistics | None = None
+    ) -> tuple[Sequence[Node[T]], float]:
+        return shortest_path_to_any(
+            self, source, targets, heuristic, edge_weight, statistics
+        )
+
+    @_cached_paths(_shortest_path_support)
+    def bidirectional_shortest_path(
+            self,
+            source: Node[T],
+            target: Node[T],
             edge_weight = 'weight'
     ) -> tuple[Sequence[Node[T]], float]:
-        return shortest_path(self, source, target, heuristic, edge_weight)
-
-    @lru_cache(1)
-    def sort_topologically(self) -> list[T]:
-        sorted_nodes: deque[T] = deque()
-        orphans = {node for node in self.nodes if not self.parents(node)}
-        remaining_nodes = set(self.nodes) - orphans
-        remaining_edges = set(self.edges)
-
-        while orphans:
-            orphan = orphans.pop()
-            sorted_nodes.append(orphan)
-            unvisited_children = {
-                child
-                for child in remaining_nodes
-                if (orphan, child) in remaining_edges
-            }
-            for unvisited_child in unvisited_children:
-                remaining_edges.remove((orphan, unvisited_child))
-                incoming_edges = {
-                    (source, target)
-                    for (source, target) in remaining_edges
-                    if target == unvisited_child
-                }
-                if not incoming_edges:
-                    orphans.add(unvisited_child)
-                    remaining_nodes.remove(unvisited_child)
-
-        return list(sorted_nodes)
-
-    def _clear_caches(self):
-        self.in_nodes.cache_clear()
-        self.out_nodes.cache_clear()
-        self.in_edges.cache_clear()
-        self.out_edges.cache_clear()
-        self.all_shortest_paths.cache_clear()
-        self.shortest_path.cache_clear()
-        self.sort_topologically.cache_clear()
+        return bidirectional_shortest_path(self, source, target, edge_weight)
+
+    @_cached_paths(_shortest_path_dag_support)
+    def shortest_path_dag(
+            self,
+            source: Node[T],
+            targets: Node[T] | Iterable[Node[T]],
+            edge_weight = 'weight'
+    ) -> ShortestPathDAG[T]:
+        return shortest_path_dag(
+            self, source, _as_targets(self, targets), edge_weight
+        )
+
+    @_cached_structure
+    def distances_from(
+            self, source: Node[T], edge_weight = 'weight'
+    ) -> ShortestPathTree[T]:
+        return distances_from(self, source, edge_weight)
+
+    @_cached_structure
+    def distances_to(
+            self, target: Node[T], edge_weight = 'weight'
+    ) -> ShortestPathTree[T]:
+        return distances_to(self, target, edge_weight)
+
+    @_cached_structure
+    def all_pairs_distances(
+            self,
+            edge_weight = 'weight',
+            cache_directory: str | os.PathLike | None = None
+    ) -> DistanceMatrix[T]:
+        return all_pairs_distances(self, edge_weight, cache_directory)
+
+    @_cached_structure
+    def node_index(self) -> dict[T, int]:
+        return {node: index for index, node in enumerate(self._nodes)}
+
+    @_cached_structure
+    def connected_components(self) -> list[set[Node[T]]]:
+        # Weakly connected components, ignoring edge directions
+        return _connected_components(
+            self._nodes,
+            lambda node: itertools.chain(
+                self._out_nodes[node], self._in_nodes[node]
+            )
+        )
+
+    @_cached_structure
+    def strongly_connected_components(self) -> list[set[Node[T]]]:
+        return _strongly_connected_components(
+            self._nodes, self._out_nodes.__getitem__
+        )
+
+    @_cached_structure
+    def condensation(self) -> DiGraph[frozenset[T]]:
+        component_of = {}
+        for component in map(
+                frozenset, self.strongly_connected_components()
+        ):
+            for node in component:
+                component_of[node] = component
+        condensed_graph = DiGraph(*{
+            (component_of[source], component_of[target])
+            for source, targets in self._out_nodes.items()
+            for target in targets
+            if component_of[source] != component_of[target]
+        })
+        for component in component_of.values():
+            condensed_graph.add_node(component)
+        return condensed_graph
+
+    @_cached_structure
+    def reachable_from(
+            self, node: Node[T], bitset: bool = False
+    ) -> set[Node[T]] | int:
+        reachable_nodes = _reachable_from(node, self._out_nodes.__getitem__)
+        if bitset:
+            return _pack_bitset(
+                map(self.node_index().__getitem__, reachable_nodes),
+                len(self._nodes)
+            )
+        return reachable_nodes
+
+    def sort_topologically(self, stable: bool = False) -> list[T]:
+        if stable:
+            return self._stable_topological_order()
+        return self._topological_order()
+
+    @_cached_structure
+    def _topological_order(self) -> list[T]:
+        return _sort_topologically(
+            self._nodes,
+            {node: len(parents) for node, parents in self._in_nodes.items()},
+            self._out_nodes.__getitem__,
+            self._in_nodes.__getitem__
+        )
+
+    @_cached_structure
+    def _stable_topological_order(self) -> list[T]:
+        return _sort_topologically(
+            self._nodes,
+            {node: len(parents) for node, parents in self._in_nodes.items()},
+            self._out_nodes.__getitem__,
+            self._in_nodes.__getitem__,
+            rank={node: rank for rank, node in enumerate(self._nodes)}
+        )
 
+    def _forget_views(self):
         for cached_property_name in ('nodes', 'edges'):
             try:
                 del self.__dict__[cached_property_name]
@@ -389,218 +941,1662 @@ class DiGraph[T: Hashable]:
                 pass
 
 
-class EdgeView[T: Hashable](Mapping, Set):
+class CompactGraph[T: Hashable]:
     def __init__(
             self,
-            edges: dict[Node[T], dict[Node[T], dict[str, Any]]],
-            directed: bool
+            nodes: Sequence[T],
+            node_index: Mapping[T, int],
+            out_adjacency: _CSR,
+            in_adjacency: _CSR,
+            edge_count: int,
+            directed: bool,
+            weight_attribute: str = 'weight'
     ):
-        self._edges = edges
+        self._nodes = nodes
+        self._index = node_index
+        self._out = out_adjacency
+        self._in = in_adjacency
+        self._edge_count = edge_count
         self._directed = directed
+        self._weight_attribute = weight_attribute
+        self._cache = _GraphCache()
 
-    def __getitem__(self, key, /):
-        try:
-            source, target = key
-            return self._edges[source][target]
-        except KeyError as key_error:
-            if not self._directed:
-                try:
-                    return self._edges[target][source]
-                except KeyError:
-                    pass
-            raise key_error
-        except ValueError:
-            return self._edges[key]
-
-    def __contains__(self, item):
-        try:
-            source, target = item
-        except ValueError:
-            return False
-        return (
-            source in self._edges and target in self._edges[source]
-            or (
-                not self._directed
-                and target in self._edges and source in self._edges[target]
-            )
+    def __getitem__(self, edge: Edge[T]):
+        return self.edges[edge]
+
+    @classmethod
+    def from_graph(
+            cls,
+            graph: UndirectedGraph[T] | DiGraph[T],
+            edge_weight: str = 'weight'
+    ) -> CompactGraph[T]:
+        return cls.from_edges(
+            graph.nodes,
+            (
+                (source, target, graph.edges[source, target].get(edge_weight))
+                for source, target in graph.edges
+            ),
+            directed=graph.is_directed,
+            weight_attribute=edge_weight
         )
 
-    def __iter__(self):
-        seen = set()
-        if not self._directed:
-            def update_seen(source, target):
-                nonlocal seen
-                seen |= {(source, target), (target, source)}
-        else:
-            def update_seen(*_):
-                pass
-
-        for source in self._edges:
-            for target in self._edges[source]:
-                if (source, target) not in seen:
-                    yield source, target
-                update_seen(source, target)
-
-    @lru_cache(1)
-    def __len__(self):
-        return len(list(self))
+    @classmethod
+    def from_edges(
+            cls,
+            nodes: Iterable[T],
+            weighted_edges: Iterable[tuple[*Edge[T], Any]],
+            directed: bool = True,
+            weight_attribute: str = 'weight'
+    ) -> CompactGraph[T]:
+        sources, targets, weights = [], [], []
+        for source, target, weight in weighted_edges:
+            sources.append(source)
+            targets.append(target)
+            weights.append(weight)
+        return cls.from_arrays(
+            sources, targets, weights, nodes=nodes, directed=directed,
+            weight_attribute=weight_attribute
+        )
 
+    @classmethod
+    def from_edge_iterable(
+            cls,
+            edges: Iterable[Edge[T] | tuple[*Edge[T], Any]],
+            default_edge_weight: Any = None,
+            directed: bool = True,
+            weight_attribute: str = 'weight'
+    ) -> CompactGraph[T]:
+        return cls.from_arrays(
+            *_split_edges(edges, default_edge_weight), directed=directed,
+            weight_attribute=weight_attribute
+        )
 
-def _build_edge_list[T: Hashable](
-        weighted_edges: tuple[Edge[T] | tuple[*Edge[T], Any], ...]
-) -> list[Edge[T]]:
-    return [
-        (source, target) for source, target, *_ in weighted_edges
-    ]
+    @classmethod
+    def from_arrays(
+            cls,
+            sources: Sequence[T],
+            targets: Sequence[T],
+            weights: Sequence[Any] | None = None,
+            nodes: Iterable[T] | None = None,
+            directed: bool = True,
+            weight_attribute: str = 'weight'
+    ) -> CompactGraph[T]:
+        if len(sources) != len(targets) or (
+                weights is not None and len(weights) != len(sources)
+        ):
+            raise ValueError(
+                'The sources, targets, and weights of the edges must have the '
+                'same length.'
+            )
+        if nodes is None:
+            nodes = dict.fromkeys(itertools.chain(sources, targets))
+        node_list = list(nodes)
+        node_index = {node: index for index, node in enumerate(node_list)}
+
+        heads = array('q', map(node_index.__getitem__, sources))
+        tails = array('q', map(node_index.__getitem__, targets))
+        weights = _weight_array(
+            [None] * len(heads) if weights is None else weights
+        )
+        edge_count = len(heads)
+        if not directed:
+            mirrored = [
+                position
+                for position, (head, tail) in enumerate(zip(heads, tails))
+                if head != tail
+            ]
+            heads, tails, weights = (
+                heads + array('q', map(tails.__getitem__, mirrored)),
+                tails + array('q', map(heads.__getitem__, mirrored)),
+                # Weights stay a list or an array of the same typecode.
+                weights + _take(weights, mirrored)  # type: ignore
+            )
 
+        out_adjacency = _CSR.from_arrays(len(node_list), heads, tails, weights)
+        if directed:
+            in_adjacency = _CSR.from_arrays(
+                len(node_list), tails, heads, weights
+            )
+        else:
+            in_adjacency = out_adjacency
+        return cls(
+            node_list, node_index, out_adjacency, in_adjacency, edge_count,
+            directed, weight_attribute
+        )
 
-def _build_attributes_maps[T: Hashable](
-        weighted_edges: tuple[Edge[T] | tuple[*Edge[T], Any], ...],
-        default_edge_weight: Any,
-        directed: bool
-) -> tuple[
-        dict[Node[T], dict[str, Any]],
-        dict[Node[T], dict[Node[T], dict[str, Any]]]
-]:
-    node_attributes = {}
-    edge_attributes = {}
-    for source, target, *rest in weighted_edges:
-        node_attributes.setdefault(source, {})
-        node_attributes.setdefault(target, {})
-        if len(rest) > 1:
+    @classmethod
+    def from_csr(
+            cls,
+            nodes: Sequence[T],
+            out_adjacency: tuple[Sequence[int], Sequence[int], Sequence[Any]],
+            in_adjacency: tuple[
+                Sequence[int], Sequence[int], Sequence[Any]
+            ] | None = None,
+            directed: bool = True,
+            weight_attribute: str = 'weight'
+    ) -> CompactGraph[T]:
+        # Adjacency is given as (offsets, adjacent node indices, weights),
+        # with the out-neighbors of node i at positions
+        # offsets[i]:offsets[i + 1]. Undirected graphs list every edge in
+        # both directions, except for self-loops.
+        out_adjacency = _CSR(*out_adjacency)
+        offsets, adjacent, weights = out_adjacency
+        if len(offsets) != len(nodes) + 1 or offsets[-1] != len(adjacent):
             raise ValueError(
-                'Providing multiple weights or attribute dictionaries per '
-                'edge in tuples passed to the constructor is not supported.'
+                f'Expected {len(nodes) + 1} offsets ending at '
+                f'{len(adjacent)}.'
             )
-        if source in edge_attributes and target in edge_attributes[source]:
-            raise ValueError(
-                'Attempting to construct a graph with multiple copies of edge '
-                f'{(source, target)}.'
+        if not directed:
+            self_loop_count = sum(
+                1
+                for index in range(len(nodes))
+                for neighbor in out_adjacency.adjacent_to(index)
+                if neighbor == index
             )
+            edge_count = (len(adjacent) + self_loop_count) // 2
+            in_adjacency = out_adjacency
         else:
-            edge_attributes.setdefault(source, {})
-        try:
-            edge_attributes[source][target] = {
-                key: value for key, value in rest[0].items()
-            }
-        except (IndexError, AttributeError):
-            edge_attributes[source][target] = {
-                'weight': rest[0] if rest else default_edge_weight
-            }
-    return node_attributes, edge_attributes
+            edge_count = len(adjacent)
+            if in_adjacency is None:
+                heads = array('q', itertools.chain.from_iterable(
+                    itertools.repeat(index, stop - start)
+                    for index, (start, stop) in enumerate(
+                        itertools.pairwise(offsets)
+                    )
+                ))
+                in_adjacency = _CSR.from_arrays(
+                    len(nodes), adjacent, heads, weights
+                )
+            else:
+                in_adjacency = _CSR(*in_adjacency)
+        return cls(
+            nodes,
+            {node: index for index, node in enumerate(nodes)},
+            out_adjacency,
+            in_adjacency,
+            edge_count,
+            directed,
+            weight_attribute
+        )
 
+    @property
+    def is_directed(self) -> bool:
+        return self._directed
 
-def _build_node_attributes_map[T: Hashable](
-        edges: Sequence[Edge[T]]
-) -> dict[Node[T], Any]:
-    return {
-        node: {}
-        for node in {
-            *(source_node for source_node, _ in edges),
-            *(target_node for _, target_node in edges)
-        }
-    }
+    @cached_property
+    def edges(self) -> CompactEdgeView[T]:
+        return CompactEdgeView(self)
 
+    @property
+    def nodes(self) -> Mapping[T, int]:
+        return self._index
 
-def _ibk_gpx[T: Hashable](
-        graph: UndirectedGraph[T],
-        clique: set,
-        prospective_nodes: set,
-        exclusions: set
-) -> Generator[set[T]]:
-    potential_pivots = prospective_nodes | exclusions
-    if not potential_pivots:
-        yield clique
-        return
-    pivot_node = potential_pivots.pop()
-    pivot_neighbors = prospective_nodes & graph.neighbors(pivot_node)
-    for node in potential_pivots:
-        prospective_neighbors = prospective_nodes & graph.neighbors(node)
-        if len(prospective_neighbors) > len(pivot_neighbors):
-            pivot_neighbors = prospective_neighbors
+    def out_nodes(self, node: Node[T]) -> frozenset[Node[T]]:
+        return frozenset(map(
+            self._nodes.__getitem__, self._out.adjacent_to(self._index[node])
+        ))
 
-    for node in prospective_nodes - pivot_neighbors:
-        prospective_nodes.remove(node)
-        yield from _ibk_gpx(
-            graph,
-            clique | {node},
-            prospective_nodes & graph.neighbors(node),
-            exclusions & graph.neighbors(node)
-        )
-        exclusions.add(node)
+    def in_nodes(self, node: Node[T]) -> frozenset[Node[T]]:
+        return frozenset(map(
+            self._nodes.__getitem__, self._in.adjacent_to(self._index[node])
+        ))
 
+    def neighbors(self, node: Node[T]) -> frozenset[Node[T]]:
+        if self._directed:
+            return self.out_nodes(node) | self.in_nodes(node)
+        return self.out_nodes(node)
 
-def all_shortest_paths[T: Hashable](
-        graph: UndirectedGraph[T] | DiGraph[T],
-        source: Node[T],
-        with_distance: bool = True,
-        edge_weight = 'weight'
-) -> Union[
-        Sequence[Node[T]],
-        tuple[Sequence[Node[T]], float],
-        Mapping[Node[T], Sequence[Node[T]]],
-        Mapping[Node[T], tuple[Sequence[Node[T]], float]]
-]:
-    if not graph.is_directed:
-        graph = graph.to_directed()  # type: ignore
+    def parents(self, child: Node[T]) -> frozenset[Node[T]]:
+        return self.in_nodes(child)
 
-    if isinstance(edge_weight, str):
-        def get_weight(edge):
-            return graph.edges[edge][edge_weight]
-    else:
-        def get_weight(edge):
-            return edge_weight
+    def children(self, parent: Node[T]) -> frozenset[Node[T]]:
+        return self.out_nodes(parent)
 
-    distance_from_source: defaultdict[Node[T], float] = defaultdict(
-        lambda: math.inf
-    )
-    distance_from_source[source] = 0
-    previous: dict[Node[T], set[Node[T]] | None] = {source: None}
-    heap = [(0, source)]
+    def out_edges(self, node: Node[T]) -> frozenset[Edge[T]]:
+        return frozenset((node, neighbor) for neighbor in self.out_nodes(node))
 
-    while heap:
-        distance_to_node, node = heapq.heappop(heap)
+    def in_edges(self, node: Node[T]) -> frozenset[Edge[T]]:
+        return frozenset((neighbor, node) for neighbor in self.in_nodes(node))
+
+    def to_directed(self) -> CompactGraph[T]:
+        if self._directed:
+            return self
+        return CompactGraph(
+            self._nodes, self._index, self._out, self._out,
+            len(self._out.adjacent), True, self._weight_attribute
+        )
+
+    def to_compact(self, edge_weight: str = 'weight') -> CompactGraph[T]:
+        if edge_weight != self._weight_attribute:
+            raise KeyError(edge_weight)
+        return self
+
+    def save(
+            self, path: str | os.PathLike, content_hash: str | None = None
+    ) -> str:
+        sections = {
+            'nodes': list(self._nodes),
+            'out_offsets': self._out.offsets,
+            'out_adjacent': self._out.adjacent,
+            'out_weights': self._out.weights
+        }
+        if self._directed:
+            sections |= {
+                'in_offsets': self._in.offsets,
+                'in_adjacent': self._in.adjacent,
+                'in_weights': self._in.weights
+            }
+        return _save_snapshot(
+            path,
+            sections,
+            {
+                'directed': self._directed,
+                'edge_count': self._edge_count,
+                'weight_attribute': self._weight_attribute
+            },
+            content_hash
+        )
 
-        for out_edge in graph.out_edges(node):
-            _, neighbor = out_edge
-            current_distance = distance_from_source[neighbor]
-            updated_distance = (
-                distance_to_node + get_weight((node, neighbor))
+    @classmethod
+    def load(
+            cls,
+            path: str | os.PathLike,
+            mmap: bool = True,
+            content_hash: str | None = None
+    ) -> CompactGraph[T]:
+        """Load a snapshot written by save.
+
+        Arrays are memory-mapped unless mmap is False. Raises ValueError if
+        the file is not a complete snapshot, or if content_hash is given and
+        differs from the saved one. Node labels and non-numeric weights are
+        stored with pickle and unpickled here, which can run arbitrary code,
+        so only load snapshots from a trusted source.
+        """
+        metadata, sections = _load_snapshot(path, mmap)
+        if content_hash is not None and content_hash != metadata.get(
+            'content_hash'
+        ):
+            raise ValueError(
+                f'{path} holds a graph with a different content hash.'
             )
-            if updated_distance > current_distance:
-                continue
-            elif updated_distance < current_distance:
-                distance_from_source[neighbor] = updated_distance
-                previous[neighbor] = {node}  # type: ignore
-            else:
-                previous[neighbor].add(node)  # type: ignore
-            heapq.heappush(
-                heap, (updated_distance, neighbor)
+        try:
+            nodes = sections['nodes']
+            out_adjacency = _CSR(
+                sections['out_offsets'],
+                sections['out_adjacent'],
+                sections['out_weights']
             )
+            if metadata['directed']:
+                in_adjacency = _CSR(
+                    sections['in_offsets'],
+                    sections['in_adjacent'],
+                    sections['in_weights']
+                )
+            else:
+                in_adjacency = out_adjacency
+            edge_count = metadata['edge_count']
+            weight_attribute = metadata['weight_attribute']
+        except KeyError as key_error:
+            raise ValueError(
+                f'{path} is missing the snapshot field {key_error}.'
+            ) from None
+        return cls(
+            nodes,
+            {node: index for index, node in enumerate(nodes)},
+            out_adjacency,
+            in_adjacency,
+            edge_count,
+            metadata['directed'],
+            weight_attribute
+        )
+
+    @_cached_paths(_shortest_paths_support)
+    def all_shortest_paths(
+            self,
+            source: Node[T],
+            target: Node[T] | Sequence[Node[T]] | None = None,
+            with_distance: bool = True,
+            edge_weight = 'weight'
+    ) -> Union[
+            Sequence[Node[T]],
+            tuple[Sequence[Node[T]], float],
+            Mapping[Node[T], Sequence[Node[T]]],
+            Mapping[Node[T], tuple[Sequence[Node[T]], float]]
+    ]:
+        if target is None:
+            return all_shortest_paths(
+                graph=self,
+                source=source,
+                with_distance=with_distance,
+                edge_weight=edge_weight
+            )
+        else:
+            return all_shortest_paths_to_targets(
+                graph=self,
+                source=source,
+                targets=_as_targets(self, target),
+                with_distance=with_distance,
+                edge_weight=edge_weight
+            )
+
+    @_cached_paths(_shortest_path_support)
+    def shortest_path(
+            self,
+            source: Node[T],
+            target: Node[T],
+            heuristic: Callable[[Node[T], Node[T]], float],
+            edge_weight = 'weight',
+            statistics: SearchStatistics | None = None
+    ) -> tuple[Sequence[Node[T]], float]:
+        return shortest_path(
+            self, source, target, heuristic, edge_weight, statistics
+        )
+
+    @_cached_paths(_shortest_path_support)
+    def shortest_path_to_any(
+            self,
+            source: Node[T],
+            targets: Iterable[Node[T]],
+            heuristic: Callable[[Node[T], Node[T]], float],
+            edge_weight = 'weight',
+            statistics: SearchStatistics | None = None
+    ) -> tuple[Sequence[Node[T]], float]:
+        return shortest_path_to_any(
+            self, source, targets, heuristic, edge_weight, statistics
+        )
+
+    @_cached_paths(_shortest_path_support)
+    def bidirectional_shortest_path(
+            self,
+            source: Node[T],
+            target: Node[T],
+            edge_weight = 'weight'
+    ) -> tuple[Sequence[Node[T]], float]:
+        return bidirectional_shortest_path(self, source, target, edge_weight)
+
+    @_cached_paths(_shortest_path_dag_support)
+    def shortest_path_dag(
+            self,
+            source: Node[T],
+            targets: Node[T] | Iterable[Node[T]],
+            edge_weight = 'weight'
+    ) -> ShortestPathDAG[T]:
+        return shortest_path_dag(
+            self, source, _as_targets(self, targets), edge_weight
+        )
+
+    @_cached_structure
+    def distances_from(
+            self, source: Node[T], edge_weight = 'weight'
+    ) -> ShortestPathTree[T]:
+        return distances_from(self, source, edge_weight)
+
+    @_cached_structure
+    def distances_to(
+            self, target: Node[T], edge_weight = 'weight'
+    ) -> ShortestPathTree[T]:
+        return distances_to(self, target, edge_weight)
+
+    @_cached_structure
+    def all_pairs_distances(
+            self,
+            edge_weight = 'weight',
+            cache_directory: str | os.PathLike | None = None
+    ) -> DistanceMatrix[T]:
+        return all_pairs_distances(self, edge_weight, cache_directory)
+
+    def node_index(self) -> Mapping[T, int]:
+        return self._index
+
+    @_cached_structure
+    def connected_components(self) -> list[set[Node[T]]]:
+        if self._directed:
+            def neighbors(index: int) -> Iterable[int]:
+                return itertools.chain(
+                    self._out.adjacent_to(index), self._in.adjacent_to(index)
+                )
+        else:
+            neighbors = self._out.adjacent_to
+        return [
+            set(map(self._nodes.__getitem__, component))
+            for component in _connected_components(
+                range(len(self._nodes)), neighbors
+            )
+        ]
+
+    @_cached_structure
+    def strongly_connected_components(self) -> list[set[Node[T]]]:
+        return [
+            set(map(self._nodes.__getitem__, component))
+            for component in _strongly_connected_components(
+                range(len(self._nodes)), self._out.adjacent_to
+            )
+        ]
+
+    @_cached_structure
+    def reachable_from(
+            self, node: Node[T], bitset: bool = False
+    ) -> set[Node[T]] | int:
+        reachable_indices = _reachable_from(
+            self._index[node], self._out.adjacent_to
+        )
+        if bitset:
+            return _pack_bitset(reachable_indices, len(self._nodes))
+        return set(map(self._nodes.__getitem__, reachable_indices))
+
+    @_cached_structure
+    def sort_topologically(self, stable: bool = False) -> list[T]:
+        if not self._directed:
+            raise ValueError('Undirected graphs have no topological order.')
+        node_indices = range(len(self._nodes))
+        in_degree = array('q', (
+            self._in.offsets[index + 1] - self._in.offsets[index]
+            for index in node_indices
+        ))
+        try:
+            sorted_indices = _sort_topologically(
+                node_indices,
+                in_degree,
+                self._out.adjacent_to,
+                self._in.adjacent_to,
+                rank=node_indices if stable else None
+            )
+        except CycleError as cycle_error:
+            raise CycleError([
+                self._nodes[index]  # type: ignore
+                for index in cycle_error.cycle
+            ]) from None
+        return [self._nodes[index] for index in sorted_indices]
+
+    def _search_space(
+            self, edge_weight='weight', reverse: bool = False
+    ) -> SearchSpace[T, int]:
+        offsets, adjacent, weights = self._in if reverse else self._out
+        if isinstance(edge_weight, str):
+            if edge_weight != self._weight_attribute:
+                raise KeyError(edge_weight)
+
+            def successors(index: int) -> Iterable[tuple[int, Any]]:
+                start, stop = offsets[index], offsets[index + 1]
+                return zip(adjacent[start:stop], weights[start:stop])
+        else:
+            def successors(index: int) -> Iterable[tuple[int, Any]]:
+                return zip(
+                    adjacent[offsets[index]:offsets[index + 1]],
+                    itertools.repeat(edge_weight)
+                )
+        return successors, self._index.__getitem__, self._nodes.__getitem__
+
+    @_cached_structure
+    def _has_integer_weights(self, edge_weight: str) -> bool:
+        weights = self._out.weights
+        return (
+            edge_weight == self._weight_attribute
+            and _typecode(weights) == 'q'
+            and min(weights, default=0) >= 0
+        )
+
+    def _edge_position(self, source: Node[T], target: Node[T]) -> int:
+        source_index = self._index[source]
+        target_index = self._index[target]
+        start = self._out.offsets[source_index]
+        stop = self._out.offsets[source_index + 1]
+        for position in range(start, stop):
+            if self._out.adjacent[position] == target_index:
+                return position
+        raise KeyError((source, target))
+
+
+type GridNode = tuple[int, int]
+
+_NONZERO_TO_ONE = bytes([0] + [1] * 255)
+
+
+class ImplicitGridGraph:
+    """An undirected 4-connected grid graph stored as a passability mask.
+
+    Nodes are ``(row, column)`` cells, and neighbors are computed on the
+    fly from a ``bytearray`` holding one byte per cell, so memory use is
+    linear in the number of cells rather than in the number of edges.
+    Removing a node blocks its cell.
+    """
+    def __init__(
+            self,
+            shape: tuple[int, int],
+            passable: bytes | bytearray | None = None
+    ):
+        rows, columns = shape
+        if passable is None:
+            passable = b'\x01' * (rows * columns)
+        if len(passable) != rows * columns:
+            raise ValueError(
+                f'Expected a mask of {rows * columns} cells for a grid of '
+                f'shape {shape}, not {len(passable)}.'
+            )
+        self._shape = (rows, columns)
+        self._passable = bytearray(passable).translate(_NONZERO_TO_ONE)
+        self._node_count = len(self._passable) - self._passable.count(0)
+        self._edge_count = self._count_edges()
+        self._cache = _GraphCache()
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self._shape
+
+    @property
+    def is_directed(self) -> bool:
+        return False
+
+    @cached_property
+    def nodes(self) -> GridNodeView:
+        return GridNodeView(self)
+
+    @cached_property
+    def edges(self) -> GridEdgeView:
+        return GridEdgeView(self)
+
+    def add_node(self, node: GridNode):
+        index = self._cell_index(node)
+        if self._passable[index]:
+            return
+        self._passable[index] = 1
+        self._node_count += 1
+        neighbors = self.neighbors(node)
+        self._edge_count += len(neighbors)
+
+        self._cache.forget_nodes((node, *neighbors))
+        self._cache.forget_all_paths()
+        self._cache.forget_structures()
+
+    def remove_node(self, node: GridNode):
+        if node not in self.nodes:
+            return
+        neighbors = self.neighbors(node)
+        self._passable[self._cell_index(node)] = 0
+        self._node_count -= 1
+        self._edge_count -= len(neighbors)
+
+        self._cache.forget_nodes((node, *neighbors))
+        self._cache.forget_paths_through(node)
+        self._cache.forget_structures()
+
+    def neighbors(self, node: GridNode) -> frozenset[GridNode]:
+        index = self._cell_index(node)
+        if not self._passable[index]:
+            raise KeyError(node)
+        columns = self._shape[1]
+        return frozenset(
+            divmod(neighbor, columns)
+            for neighbor in self._adjacent_cells(index)
+            if self._passable[neighbor]
+        )
+
+    def in_nodes(self, node: GridNode) -> frozenset[GridNode]:
+        return self.neighbors(node)
+
+    def out_nodes(self, node: GridNode) -> frozenset[GridNode]:
+        return self.neighbors(node)
+
+    def out_edges(self, node: GridNode) -> frozenset[Edge[GridNode]]:
+        return frozenset((node, neighbor) for neighbor in self.neighbors(node))
+
+    def in_edges(self, node: GridNode) -> frozenset[Edge[GridNode]]:
+        return frozenset((neighbor, node) for neighbor in self.neighbors(node))
+
+    @_cached_paths(_shortest_paths_support)
+    def all_shortest_paths(
+            self,
+            source: GridNode,
+            target: GridNode | Sequence[GridNode] | None = None,
+            with_distance: bool = True,
+            edge_weight = 1
+    ) -> Union[
+            Sequence[GridNode],
+            tuple[Sequence[GridNode], float],
+            Mapping[GridNode, Sequence[GridNode]],
+            Mapping[GridNode, tuple[Sequence[GridNode], float]]
+    ]:
+        if target is None:
+            return all_shortest_paths(
+                graph=self,
+                source=source,
+                with_distance=with_distance,
+                edge_weight=edge_weight
+            )
+        else:
+            return all_shortest_paths_to_targets(
+                graph=self,
+                source=source,
+                targets=_as_targets(self, target),
+                with_distance=with_distance,
+                edge_weight=edge_weight
+            )
+
+    @_cached_paths(_shortest_path_support)
+    def shortest_path(
+            self,
+            source: GridNode,
+            target: GridNode,
+            heuristic: Callable[[GridNode, GridNode], float],
+            edge_weight = 1,
+            statistics: SearchStatistics | None = None
+    ) -> tuple[Sequence[GridNode], float]:
+        return shortest_path(
+            self, source, target, heuristic, edge_weight, statistics
+        )
+
+    @_cached_paths(_shortest_path_support)
+    def shortest_path_to_any(
+            self,
+            source: GridNode,
+            targets: Iterable[GridNode],
+            heuristic: Callable[[GridNode, GridNode], float],
+            edge_weight = 1,
+            statistics: SearchStatistics | None = None
+    ) -> tuple[Sequence[GridNode], float]:
+        return shortest_path_to_any(
+            self, source, targets, heuristic, edge_weight, statistics
+        )
+
+    @_cached_paths(_shortest_path_support)
+    def bidirectional_shortest_path(
+            self,
+            source: GridNode,
+            target: GridNode,
+            edge_weight = 1
+    ) -> tuple[Sequence[GridNode], float]:
+        return bidirectional_shortest_path(self, source, target, edge_weight)
+
+    @_cached_paths(_shortest_path_dag_support)
+    def shortest_path_dag(
+            self,
+            source: GridNode,
+            targets: GridNode | Iterable[GridNode],
+            edge_weight = 1
+    ) -> ShortestPathDAG[GridNode]:
+        return shortest_path_dag(
+            self, source, _as_targets(self, targets), edge_weight
+        )
+
+    @_cached_structure
+    def distances_from(
+            self, source: GridNode, edge_weight = 1
+    ) -> ShortestPathTree[GridNode]:
+        return distances_from(self, source, edge_weight)
+
+    @_cached_structure
+    def distances_to(
+            self, target: GridNode, edge_weight = 1
+    ) -> ShortestPathTree[GridNode]:
+        return distances_to(self, target, edge_weight)
+
+    def _search_space(
+            self, edge_weight = 1, reverse: bool = False
+    ) -> SearchSpace[GridNode, int]:
+        if isinstance(edge_weight, str):
+            # Grid edges carry no attributes.
+            raise KeyError(edge_weight)
+        passable = self._passable
+        adjacent_cells = self._adjacent_cells
+
+        def successors(index: int) -> Iterable[tuple[int, Any]]:
+            return [
+                (neighbor, edge_weight)
+                for neighbor in adjacent_cells(index)
+                if passable[neighbor]
+            ]
+
+        def decode(index: int) -> GridNode:
+            return divmod(index, self._shape[1])
+        return successors, self._cell_index, decode
+
+    def _has_integer_weights(self, edge_weight: str) -> bool:
+        return False
+
+    def _count_edges(self) -> int:
+        # Treats the mask as one big integer with a bit at the bottom of
+        # each byte, so that cells are paired with their right and lower
+        # neighbors in a handful of big-integer operations.
+        rows, columns = self._shape
+        cells = int.from_bytes(self._passable, 'little')
+        not_last_column = int.from_bytes(
+            (b'\x01' * (columns - 1) + b'\x00') * rows, 'little'
+        )
+        horizontal_edges = cells & (cells >> 8) & not_last_column
+        vertical_edges = cells & (cells >> (8 * columns))
+        return horizontal_edges.bit_count() + vertical_edges.bit_count()
+
+    def _cell_index(self, node: GridNode) -> int:
+        row, column = node
+        rows, columns = self._shape
+        if not (0 <= row < rows and 0 <= column < columns):
+            raise KeyError(node)
+        return row * columns + column
+
+    def _adjacent_cells(self, index: int) -> list[int]:
+        rows, columns = self._shape
+        row, column = divmod(index, columns)
+        adjacent_cells = []
+        if row > 0:
+            adjacent_cells.append(index - columns)
+        if row < rows - 1:
+            adjacent_cells.append(index + columns)
+        if column > 0:
+            adjacent_cells.append(index - 1)
+        if column < columns - 1:
+            adjacent_cells.append(index + 1)
+        return adjacent_cells
+
+    def _later_adjacent_cells(self, index: int) -> list[int]:
+        rows, columns = self._shape
+        row, column = divmod(index, columns)
+        later_adjacent_cells = []
+        if column < columns - 1:
+            later_adjacent_cells.append(index + 1)
+        if row < rows - 1:
+            later_adjacent_cells.append(index + columns)
+        return later_adjacent_cells
+
+
+class EdgeView[T: Hashable](Mapping, Set):
+    def __init__(self, graph: UndirectedGraph[T] | DiGraph[T]):
+        self._graph = graph
+        self._edges = graph._edges
+        self._directed = graph.is_directed
+
+    def __getitem__(self, key, /):
+        try:
+            source, target = key
+            return self._edges[source][target]
+        except KeyError as key_error:
+            if not self._directed:
+                try:
+                    return self._edges[target][source]
+                except KeyError:
+                    pass
+            raise key_error
+        except ValueError:
+            return self._edges[key]
+
+    def __contains__(self, item):
+        try:
+            source, target = item
+        except ValueError:
+            return False
+        return (
+            source in self._edges and target in self._edges[source]
+            or (
+                not self._directed
+                and target in self._edges and source in self._edges[target]
+            )
+        )
+
+    def __iter__(self):
+        # Undirected edges are stored in a single orientation, so nothing
+        # needs deduplicating.
+        for source, targets in self._edges.items():
+            for target in targets:
+                yield source, target
+
+    def __len__(self):
+        return self._graph._edge_count
+
+
+class CompactEdgeView[T: Hashable](Mapping, Set):
+    def __init__(self, graph: CompactGraph[T]):
+        self._graph = graph
+
+    def __getitem__(self, key, /):
+        source, target = key
+        position = self._graph._edge_position(source, target)
+        return {
+            self._graph._weight_attribute: self._graph._out.weights[position]
+        }
+
+    def __contains__(self, item):
+        try:
+            source, target = item
+            self._graph._edge_position(source, target)
+        except (ValueError, TypeError, KeyError):
+            return False
+        return True
+
+    def __iter__(self):
+        nodes = self._graph._nodes
+        directed = self._graph.is_directed
+        out_adjacency = self._graph._out
+        for source_index, source in enumerate(nodes):
+            for target_index in out_adjacency.adjacent_to(source_index):
+                if directed or source_index <= target_index:
+                    yield source, nodes[target_index]
+
+    def __len__(self):
+        return self._graph._edge_count
+
+
+class GridNodeView(Set):
+    def __init__(self, graph: ImplicitGridGraph):
+        self._graph = graph
+
+    def __contains__(self, item):
+        try:
+            return bool(self._graph._passable[self._graph._cell_index(item)])
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def __iter__(self):
+        columns = self._graph.shape[1]
+        for index, passable in enumerate(self._graph._passable):
+            if passable:
+                yield divmod(index, columns)
+
+    def __len__(self):
+        return self._graph._node_count
+
+
+class GridEdgeView(Mapping, Set):
+    def __init__(self, graph: ImplicitGridGraph):
+        self._graph = graph
+
+    def __getitem__(self, key, /):
+        if key not in self:
+            raise KeyError(key)
+        return {}
+
+    def __contains__(self, item):
+        try:
+            source, target = item
+        except (TypeError, ValueError):
+            return False
+        return (
+            source in self._graph.nodes
+            and target in self._graph.nodes
+            and abs(source[0] - target[0]) + abs(source[1] - target[1]) == 1
+        )
+
+    def __iter__(self):
+        graph = self._graph
+        columns = graph.shape[1]
+        for index, passable in enumerate(graph._passable):
+            if not passable:
+                continue
+            for neighbor in graph._later_adjacent_cells(index):
+                if graph._passable[neighbor]:
+                    yield divmod(index, columns), divmod(neighbor, columns)
+
+    def __len__(self):
+        return self._graph._edge_count
+
+
+class ShortestPathDAG[T: Hashable]:
+    def __init__(
+            self,
+            source: Node[T],
+            targets: Sequence[Node[T]],
+            distance_from_source: Mapping[Any, float],
+            previous: Mapping[Any, set[Any] | None],
+            encode: Callable[[Node[T]], Any] = _identity,
+            decode: Callable[[Any], Node[T]] = _identity
+    ):
+        self._source = source
+        self._targets = list(targets)
+        self._distance = distance_from_source
+        self._previous = previous
+        self._encode = encode
+        self._decode = decode
+
+    @property
+    def source(self) -> Node[T]:
+        return self._source
+
+    @property
+    def targets(self) -> list[Node[T]]:
+        return self._targets
+
+    @cached_property
+    def nearest_targets(self) -> list[Node[T]]:
+        shortest_distance = self.shortest_distance
+        if shortest_distance == math.inf:
+            return []
+        return [
+            target
+            for target in self._targets
+            if self.distance(target) == shortest_distance
+        ]
+
+    @property
+    def shortest_distance(self) -> float:
+        return min(self.distance(target) for target in self._targets)
+
+    def distance(self, target: Node[T]) -> float:
+        encoded_target = self._encode(target)
+        if encoded_target not in self._previous:
+            return math.inf
+        return self._distance[encoded_target]
+
+    def count_paths(self, target: Node[T] | None = None) -> int:
+        return _count_all_paths(self._ends(target), self._previous)
+
+    def nodes_on_paths(self, target: Node[T] | None = None) -> set[Node[T]]:
+        on_path = set(self._ends(target))
+        to_visit = list(on_path)
+        while to_visit:
+            for predecessor in self._previous[to_visit.pop()] or ():
+                if predecessor not in on_path:
+                    on_path.add(predecessor)
+                    to_visit.append(predecessor)
+        return {self._decode(node) for node in on_path}
+
+    def edges_on_paths(self, target: Node[T] | None = None) -> set[Edge[T]]:
+        on_path = set(self._ends(target))
+        to_visit = list(on_path)
+        edges = set()
+        while to_visit:
+            node = to_visit.pop()
+            for predecessor in self._previous[node] or ():
+                edges.add((self._decode(predecessor), self._decode(node)))
+                if predecessor not in on_path:
+                    on_path.add(predecessor)
+                    to_visit.append(predecessor)
+        return edges
+
+    def paths(
+            self,
+            target: Node[T] | None = None,
+            limit: int | None = None
+    ) -> Iterator[list[Node[T]]]:
+        paths = itertools.chain.from_iterable(
+            _iter_all_paths(end, self._previous) for end in self._ends(target)
+        )
+        for path in itertools.islice(paths, limit):
+            yield [self._decode(node) for node in path]
+
+    def __iter__(self) -> Iterator[list[Node[T]]]:
+        return self.paths()
+
+    def _ends(self, target: Node[T] | None) -> list[Any]:
+        ends = self.nearest_targets if target is None else [target]
+        return [
+            encoded_end
+            for encoded_end in map(self._encode, ends)
+            if encoded_end in self._previous
+        ]
+
+
+class ShortestPathTree[T: Hashable](Mapping):
+    """Shortest distances between a root node and every node it connects to.
+
+    Trees from ``distances_from`` map nodes to their distance from the root,
+    and trees from ``distances_to`` map nodes to their distance to it. A
+    shortest path to or from any node is recovered by following one parent
+    link per step.
+    """
+    def __init__(
+            self,
+            root: Node[T],
+            distance_from_root: Mapping[Any, float],
+            previous: Mapping[Any, set[Any] | None],
+            towards_root: bool = False,
+            encode: Callable[[Node[T]], Any] = _identity,
+            decode: Callable[[Any], Node[T]] = _identity,
+            encoded_node_count: int | None = None
+    ):
+        self._root = root
+        self._distance = distance_from_root
+        self._previous = previous
+        self._towards_root = towards_root
+        self._encode = encode
+        self._decode = decode
+        self._encoded_node_count = encoded_node_count
+
+    @property
+    def root(self) -> Node[T]:
+        return self._root
+
+    @property
+    def towards_root(self) -> bool:
+        return self._towards_root
+
+    def __getitem__(self, node: Node[T]) -> float:
+        return self._distance[self._encode(node)]
+
+    def __iter__(self) -> Iterator[Node[T]]:
+        return map(self._decode, self._distance)
+
+    def __len__(self) -> int:
+        return len(self._distance)
+
+    def distance(self, node: Node[T]) -> float:
+        try:
+            return self[node]
+        except KeyError:
+            return math.inf
+
+    def path(self, node: Node[T]) -> list[Node[T]]:
+        encoded_node = self._encode(node)
+        if encoded_node not in self._previous:
+            if self._towards_root:
+                raise ValueError(
+                    f'Unable to find a path from {node} to {self._root}'
+                )
+            raise ValueError(
+                f'Unable to find a path from {self._root} to {node}'
+            )
+        path = [encoded_node]
+        while (parents := self._previous[path[-1]]) is not None:
+            path.append(next(iter(parents)))
+        if not self._towards_root:
+            path.reverse()
+        return [self._decode(node) for node in path]
+
+    def distance_array(self) -> array:
+        # Distances indexed by the graph's internal node numbering, i.e., node
+        # indices of compact graphs and flat cell indices of grid graphs.
+        if self._encoded_node_count is None:
+            raise ValueError(
+                'Distance arrays are only available for compact and grid '
+                'graphs.'
+            )
+        distances = array(
+            'd', itertools.repeat(math.inf, self._encoded_node_count)
+        )
+        for node, distance in self._distance.items():
+            distances[node] = distance
+        return distances
+
+
+class DistanceMatrix[T: Hashable](Mapping):
+    """Shortest distances between every pair of nodes of a graph.
+
+    Distances are stored row-major in one flat sequence of floats, with
+    rows and columns ordered as in ``node_index``. Unreachable pairs have
+    distance ``math.inf``.
+    """
+    def __init__(
+            self, node_index: Mapping[Node[T], int], distances: Sequence[float]
+    ):
+        if len(distances) != len(node_index) ** 2:
+            raise ValueError(
+                f'Expected {len(node_index) ** 2} distances for '
+                f'{len(node_index)} nodes, not {len(distances)}.'
+            )
+        self._node_index = node_index
+        self._distances = distances
 
-    def prepare_paths(
-            target: Node[T],
-            previous: Mapping[Node[T], set[Node[T]] | None],
-            with_distance: bool
+    @property
+    def node_index(self) -> Mapping[Node[T], int]:
+        return self._node_index
+
+    @property
+    def distances(self) -> Sequence[float]:
+        return self._distances
+
+    def __getitem__(self, pair: Edge[T]) -> float:
+        source, target = pair
+        node_count = len(self._node_index)
+        return self._distances[
+            self._node_index[source] * node_count + self._node_index[target]
+        ]
+
+    def __iter__(self) -> Iterator[Edge[T]]:
+        return itertools.product(self._node_index, self._node_index)
+
+    def __len__(self) -> int:
+        return len(self._distances)
+
+    def row(self, source: Node[T]) -> Sequence[float]:
+        node_count = len(self._node_index)
+        start = self._node_index[source] * node_count
+        return self._distances[start:start + node_count]
+
+
+@dataclass
+class SearchStatistics:
+    """Counters that a search adds to, for comparing heuristics.
+
+    Passing the same instance to several searches accumulates their
+    totals. Searches given statistics bypass the path cache.
+    """
+    nodes_expanded: int = 0
+    nodes_reached: int = 0
+
+
+class _CSR(NamedTuple):
+    offsets: Sequence[int]
+    adjacent: Sequence[int]
+    weights: Sequence[Any]
+
+    @classmethod
+    def from_arrays(
+            cls,
+            node_count: int,
+            heads: Sequence[int],
+            tails: Sequence[int],
+            weights: Sequence[Any]
+    ) -> _CSR:
+        counts = [0] * (node_count + 1)
+        for head in heads:
+            counts[head + 1] += 1
+        offsets = array('q', itertools.accumulate(counts))
+
+        cursor = offsets.tolist()
+        order = array('q', bytes(8 * len(heads)))
+        for position, head in enumerate(heads):
+            order[cursor[head]] = position
+            cursor[head] += 1
+
+        return cls(
+            offsets,
+            _take(tails, order),
+            _take(_weight_array(weights), order)
+        )
+
+    def adjacent_to(self, index: int) -> Sequence[int]:
+        return self.adjacent[self.offsets[index]:self.offsets[index + 1]]
+
+
+def _split_edges[T: Hashable](
+        edges: Iterable[Edge[T] | tuple[*Edge[T], Any]],
+        default_edge_weight: Any
+) -> tuple[list[T], list[T], list[Any]]:
+    sources, targets, weights = [], [], []
+    for source, target, *rest in edges:
+        if len(rest) > 1:
+            raise ValueError(
+                'Providing multiple weights per edge is not supported.'
+            )
+        sources.append(source)
+        targets.append(target)
+        weights.append(rest[0] if rest else default_edge_weight)
+    return sources, targets, weights
+
+
+def _typecode(values: Sequence[Any]) -> str | None:
+    if isinstance(values, array):
+        return values.typecode
+    if isinstance(values, memoryview):
+        return values.format
+    return None
+
+
+def _take(values: Sequence[Any], positions: Iterable[int]) -> Sequence[Any]:
+    if isinstance(values, array):
+        return array(values.typecode, map(values.__getitem__, positions))
+    return list(map(values.__getitem__, positions))
+
+
+def _weight_array(weights: Iterable[Any]) -> Sequence[Any]:
+    if isinstance(weights, array):
+        return weights
+    weights = list(weights)
+    if all(type(weight) is int for weight in weights):
+        try:
+            return array('q', weights)
+        except OverflowError:
+            return weights
+    if all(type(weight) in (int, float) for weight in weights):
+        return array('d', weights)
+    return weights
+
+
+def _dict_has_integer_weights(
+        edges: Mapping[Any, Mapping[Any, Mapping[str, Any]]],
+        edge_weight: str
+) -> bool:
+    return all(
+        type(weight := attributes.get(edge_weight)) is int and weight >= 0
+        for adjacent_edges in edges.values()
+        for attributes in adjacent_edges.values()
+    )
+
+
+def _as_targets[T: Hashable](
+        graph: SearchableGraph[T],
+        targets: Node[T] | Iterable[Node[T]]
+) -> list[Node[T]]:
+    try:
+        is_single_target = targets in graph.nodes
+    except TypeError:
+        is_single_target = False
+    return [targets] if is_single_target else list(targets)  # type: ignore
+
+
+def _dict_search_space[T: Hashable](
+        graph: UndirectedGraph[T] | DiGraph[T],
+        adjacent_nodes: Mapping[Node[T], Set[Node[T]]],
+        edge_weight: Any,
+        reverse: bool = False
+) -> SearchSpace[T, T]:
+    if isinstance(edge_weight, str) and reverse:
+        edges = graph.edges
+
+        def successors(node: Node[T]) -> Iterable[tuple[Node[T], Any]]:
+            return [
+                (neighbor, edges[neighbor, node][edge_weight])
+                for neighbor in adjacent_nodes[node]
+            ]
+    elif isinstance(edge_weight, str):
+        edges = graph.edges
+
+        def successors(node: Node[T]) -> Iterable[tuple[Node[T], Any]]:
+            return [
+                (neighbor, edges[node, neighbor][edge_weight])
+                for neighbor in adjacent_nodes[node]
+            ]
+    else:
+        def successors(node: Node[T]) -> Iterable[tuple[Node[T], Any]]:
+            return [
+                (neighbor, edge_weight) for neighbor in adjacent_nodes[node]
+            ]
+    return successors, _identity, _identity
+
+
+def _build_edge_list[T: Hashable](
+        weighted_edges: tuple[Edge[T] | tuple[*Edge[T], Any], ...]
+) -> list[Edge[T]]:
+    return [
+        (source, target) for source, target, *_ in weighted_edges
+    ]
+
+
+def _build_attributes_maps[T: Hashable](
+        weighted_edges: tuple[Edge[T] | tuple[*Edge[T], Any], ...],
+        default_edge_weight: Any,
+        directed: bool
+) -> tuple[
+        dict[Node[T], dict[str, Any]],
+        dict[Node[T], dict[Node[T], dict[str, Any]]]
+]:
+    node_attributes = {}
+    edge_attributes = {}
+    for source, target, *rest in weighted_edges:
+        node_attributes.setdefault(source, {})
+        node_attributes.setdefault(target, {})
+        if len(rest) > 1:
+            raise ValueError(
+                'Providing multiple weights or attribute dictionaries per '
+                'edge in tuples passed to the constructor is not supported.'
+            )
+        adjacent_edges = edge_attributes.setdefault(source, {})
+        if (
+                target in adjacent_edges
+                or not directed and source in edge_attributes.get(target, ())
+        ):
+            raise ValueError(
+                'Attempting to construct a graph with multiple copies of edge '
+                f'{(source, target)}.'
+            )
+        try:
+            adjacent_edges[target] = dict(rest[0].items())
+        except (IndexError, AttributeError):
+            adjacent_edges[target] = {
+                'weight': rest[0] if rest else default_edge_weight
+            }
+    return node_attributes, edge_attributes
+
+
+def _build_node_attributes_map[T: Hashable](
+        edges: Sequence[Edge[T]]
+) -> dict[Node[T], Any]:
+    return {
+        node: {}
+        for node in {
+            *(source_node for source_node, _ in edges),
+            *(target_node for _, target_node in edges)
+        }
+    }
+
+
+def _sort_topologically[N](
+        nodes: Iterable[N],
+        in_degree: MutableMapping[N, int] | MutableSequence[int],
+        children: Callable[[N], Iterable[N]],
+        parents: Callable[[N], Iterable[N]],
+        rank: Mapping[N, int] | Sequence[int] | None = None
+) -> list[N]:
+    orphans = [node for node in nodes if not in_degree[node]]  # type: ignore
+    queue: deque[N] | list[tuple[int, N]]
+    if rank is None:
+        queue = fifo = deque(orphans)
+        push, pop = fifo.append, fifo.popleft
+    else:
+        queue = heap = [
+            (rank[orphan], orphan) for orphan in orphans  # type: ignore
+        ]
+        heapq.heapify(heap)
+
+        def push(node: N):
+            heapq.heappush(heap, (rank[node], node))  # type: ignore
+
+        def pop() -> N:
+            return heapq.heappop(heap)[1]
+
+    sorted_nodes: list[N] = []
+    while queue:
+        orphan = pop()
+        sorted_nodes.append(orphan)
+        for child in children(orphan):
+            in_degree[child] -= 1  # type: ignore
+            if not in_degree[child]:  # type: ignore
+                push(child)
+
+    if len(sorted_nodes) < len(in_degree):
+        cycle = _find_cycle(in_degree, parents)
+        raise CycleError(cycle)
+    return sorted_nodes
+
+
+def _find_cycle[N](
+        in_degree: MutableMapping[N, int] | MutableSequence[int],
+        parents: Callable[[N], Iterable[N]]
+) -> list[N]:
+    # Every node left with a positive in-degree after Kahn's algorithm has a
+    # parent that was also left behind, so walking backwards must revisit a
+    # node.
+    node: N = next(  # type: ignore
+        node
+        for node, degree in (
+            in_degree.items() if isinstance(in_degree, Mapping)
+            else enumerate(in_degree)
+        )
+        if degree > 0
+    )
+    walk_position: dict[N, int] = {}
+    walk: list[N] = []
+    while node not in walk_position:
+        walk_position[node] = len(walk)
+        walk.append(node)
+        node = next(
+            parent
+            for parent in parents(node)
+            if in_degree[parent] > 0  # type: ignore
+        )
+    return walk[walk_position[node]:][::-1]
+
+
+def _reachable_from[N](
+        source: N, neighbors: Callable[[N], Iterable[N]]
+) -> set[N]:
+    reached = {source}
+    frontier = [source]
+    while frontier:
+        node = frontier.pop()
+        for neighbor in neighbors(node):
+            if neighbor not in reached:
+                reached.add(neighbor)
+                frontier.append(neighbor)
+    return reached
+
+
+def _connected_components[N](
+        nodes: Iterable[N], neighbors: Callable[[N], Iterable[N]]
+) -> list[set[N]]:
+    components: list[set[N]] = []
+    reached: set[N] = set()
+    for node in nodes:
+        if node not in reached:
+            component = _reachable_from(node, neighbors)
+            reached |= component
+            components.append(component)
+    return components
+
+
+def _strongly_connected_components[N](
+        nodes: Iterable[N], successors: Callable[[N], Iterable[N]]
+) -> list[set[N]]:
+    # Tarjan's algorithm with an explicit stack of successor iterators in
+    # place of recursion. Components are found in reverse topological order.
+    discovery_index: dict[N, int] = {}
+    low_link: dict[N, int] = {}
+    component_stack: list[N] = []
+    on_component_stack: set[N] = set()
+    components: list[set[N]] = []
+
+    for root in nodes:
+        if root in discovery_index:
+            continue
+        discovery_index[root] = low_link[root] = len(discovery_index)
+        component_stack.append(root)
+        on_component_stack.add(root)
+        search_stack = [(root, iter(successors(root)))]
+        while search_stack:
+            node, unexplored_successors = search_stack[-1]
+            for successor in unexplored_successors:
+                if successor not in discovery_index:
+                    discovery_index[successor] = low_link[successor] = len(
+                        discovery_index
+                    )
+                    component_stack.append(successor)
+                    on_component_stack.add(successor)
+                    search_stack.append(
+                        (successor, iter(successors(successor)))
+                    )
+                    break
+                if successor in on_component_stack:
+                    low_link[node] = min(
+                        low_link[node], discovery_index[successor]
+                    )
+            else:
+                search_stack.pop()
+                if search_stack:
+                    parent = search_stack[-1][0]
+                    low_link[parent] = min(low_link[parent], low_link[node])
+                if low_link[node] == discovery_index[node]:
+                    component = set()
+                    while True:
+                        member = component_stack.pop()
+                        on_component_stack.remove(member)
+                        component.add(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def _pack_bitset(indices: Iterable[int], size: int) -> int:
+    # Sets bits in a bytearray first, since OR-ing each bit into an int
+    # would copy the whole int every time.
+    packed_bits = bytearray((size + 7) // 8)
+    for index in indices:
+        packed_bits[index >> 3] |= 1 << (index & 7)
+    return int.from_bytes(packed_bits, 'little')
+
+
+def _degeneracy_order[T: Hashable](
+        neighbors: Mapping[Node[T], Set[Node[T]]]
+) -> list[T]:
+    # Repeatedly removes a node of minimum remaining degree (Matula & Beck),
+    # so each node has few neighbors later in the order.
+    degree = {
+        node: len(adjacent - {node}) for node, adjacent in neighbors.items()
+    }
+    nodes_with_degree: defaultdict[int, set[T]] = defaultdict(set)
+    for node, node_degree in degree.items():
+        nodes_with_degree[node_degree].add(node)
+
+    order: list[T] = []
+    minimum_degree = 0
+    while len(order) < len(degree):
+        minimum_degree = max(minimum_degree - 1, 0)
+        while not nodes_with_degree[minimum_degree]:
+            minimum_degree += 1
+        node = nodes_with_degree[minimum_degree].pop()
+        order.append(node)
+        degree[node] = -1
+        for neighbor in neighbors[node]:
+            if degree[neighbor] > 0:
+                nodes_with_degree[degree[neighbor]].remove(neighbor)
+                degree[neighbor] -= 1
+                nodes_with_degree[degree[neighbor]].add(neighbor)
+    return order
+
+
+def _clique_anchors[T: Hashable](
+        nodes: Sequence[T],
+        neighbors: Sequence[int],
+        filter: Callable[[T], bool] | None
+) -> Iterator[tuple[int, int]]:
+    # Pairs each anchor node with the neighbors that may complete a clique
+    # around it, such that every clique has exactly one anchor: its first
+    # node or, given a filter, its first node passing the filter. Cliques
+    # without any node passing the filter are never reached.
+    if filter is None:
+        for node, node_neighbors in enumerate(neighbors):
+            yield node, node_neighbors >> (node + 1) << (node + 1)
+        return
+    earlier_anchors = 0
+    for node, node_neighbors in enumerate(neighbors):
+        if filter(nodes[node]):
+            yield node, node_neighbors & ~earlier_anchors
+            earlier_anchors |= 1 << node
+
+
+def _iter_ordered_cliques(
+        neighbors: Sequence[int],
+        clique: list[int],
+        candidates: int,
+        size: int
+) -> Iterator[list[int]]:
+    # Extends clique by size candidates, adding them in increasing order so
+    # that each extension is produced once.
+    if size == 0:
+        yield clique
+        return
+    while candidates.bit_count() >= size:
+        lowest_bit = candidates & -candidates
+        candidates ^= lowest_bit
+        node = lowest_bit.bit_length() - 1
+        yield from _iter_ordered_cliques(
+            neighbors, clique + [node], candidates & neighbors[node], size - 1
+        )
+
+
+def _count_ordered_cliques(
+        neighbors: Sequence[int], candidates: int, size: int
+) -> int:
+    if size == 0:
+        return 1
+    if size == 1:
+        return candidates.bit_count()
+    count = 0
+    while candidates.bit_count() >= size:
+        lowest_bit = candidates & -candidates
+        candidates ^= lowest_bit
+        count += _count_ordered_cliques(
+            neighbors,
+            candidates & neighbors[lowest_bit.bit_length() - 1],
+            size - 1
+        )
+    return count
+
+
+def _iter_bitset_cliques(
+        neighbors: Sequence[int],
+        minimum_size: MutableSequence[int],
+        maximum_size: float = math.inf
+) -> Iterator[list[int]]:
+    # Bron-Kerbosch with Tomita pivoting over int bitsets, with the outer
+    # level in degeneracy order. Only maximal cliques with at least
+    # minimum_size[0] (re-read as it changes) and at most maximum_size nodes
+    # are produced.
+    for node, node_neighbors in enumerate(neighbors):
+        earlier_nodes = (1 << node) - 1
+        yield from _bron_kerbosch(
+            neighbors,
+            [node],
+            node_neighbors & ~earlier_nodes,
+            node_neighbors & earlier_nodes,
+            minimum_size,
+            maximum_size
+        )
+
+
+def _bron_kerbosch(
+        neighbors: Sequence[int],
+        clique: list[int],
+        candidates: int,
+        exclusions: int,
+        minimum_size: MutableSequence[int],
+        maximum_size: float
+) -> Iterator[list[int]]:
+    if not candidates:
+        if not exclusions and len(clique) >= minimum_size[0]:
+            yield clique
+        return
+    if (
+            len(clique) >= maximum_size
+            or len(clique) + candidates.bit_count() < minimum_size[0]
     ):
-        if target in previous:
-            paths = _recover_all_paths(target, previous)
+        return
+
+    pivot_neighbors = 0
+    pivot_candidates = candidates | exclusions
+    while pivot_candidates:
+        lowest_bit = pivot_candidates & -pivot_candidates
+        pivot_candidates ^= lowest_bit
+        neighbors_in_candidates = (
+            candidates & neighbors[lowest_bit.bit_length() - 1]
+        )
+        if neighbors_in_candidates.bit_count() > pivot_neighbors.bit_count():
+            pivot_neighbors = neighbors_in_candidates
+
+    branches = candidates & ~pivot_neighbors
+    while branches:
+        lowest_bit = branches & -branches
+        branches ^= lowest_bit
+        node = lowest_bit.bit_length() - 1
+        yield from _bron_kerbosch(
+            neighbors,
+            clique + [node],
+            candidates & neighbors[node],
+            exclusions & neighbors[node],
+            minimum_size,
+            maximum_size
+        )
+        candidates ^= lowest_bit
+        exclusions |= lowest_bit
+        if len(clique) + candidates.bit_count() < minimum_size[0]:
+            return
+
+
+def all_shortest_paths[T: Hashable](
+        graph: SearchableGraph[T],
+        source: Node[T],
+        with_distance: bool = True,
+        edge_weight = 'weight'
+) -> Union[
+        Sequence[Node[T]],
+        tuple[Sequence[Node[T]], float],
+        Mapping[Node[T], Sequence[Node[T]]],
+        Mapping[Node[T], tuple[Sequence[Node[T]], float]]
+]:
+    successors, encode, decode = graph._search_space(edge_weight)
+    dijkstra = _select_dijkstra(graph, edge_weight)
+    distance_from_source, previous = dijkstra(successors, encode(source))
+
+    def prepare_paths(target: Node[T], with_distance: bool):
+        encoded_target = encode(target)
+        if encoded_target in previous:
+            paths = [
+                [decode(node) for node in path]
+                for path in _iter_all_paths(encoded_target, previous)
+            ]
         else:
             paths = []
 
         if with_distance:
-            return paths, distance_from_source.get(target, math.inf)
+            return paths, distance_from_source.get(encoded_target, math.inf)
         else:
             return paths
 
     return {
-        target: prepare_paths(target, previous, with_distance)
+        target: prepare_paths(target, with_distance)
         for target in graph.nodes
     }
 
 
 def all_shortest_paths_to_targets[T: Hashable](
-        graph: UndirectedGraph[T] | DiGraph[T],
+        graph: SearchableGraph[T],
         source: Node[T],
         targets: list[Node[T]],
         with_distance: bool = True,
@@ -611,187 +2607,964 @@ def all_shortest_paths_to_targets[T: Hashable](
         Mapping[Node[T], Sequence[Node[T]]],
         Mapping[Node[T], tuple[Sequence[Node[T]], float]]
 ]:
-    if not targets:
-        raise ValueError('At least one target node must be provided.')
-    if not graph.is_directed:
-        graph = graph.to_directed()  # type: ignore
+    shortest_paths = shortest_path_dag(graph, source, targets, edge_weight)
 
-    if isinstance(edge_weight, str):
-        def get_weight(edge):
-            return graph.edges[edge][edge_weight]
+    def target_output(target: Node[T]):
+        paths = list(shortest_paths.paths(target))
+        if with_distance:
+            return paths, shortest_paths.distance(target)
+        else:
+            return paths
+    if len(targets) == 1:
+        return target_output(targets[0])
     else:
-        def get_weight(edge):
-            return edge_weight
+        return {target: target_output(target) for target in targets}
 
-    distance_from_source: defaultdict[Node[T], float] = defaultdict(
-        lambda: math.inf
+
+def shortest_path_dag[T: Hashable](
+        graph: SearchableGraph[T],
+        source: Node[T],
+        targets: Iterable[Node[T]],
+        edge_weight = 'weight'
+) -> ShortestPathDAG[T]:
+    targets = list(targets)
+    if not targets:
+        raise ValueError('At least one target node must be provided.')
+    successors, encode, decode = graph._search_space(edge_weight)
+    dijkstra = _select_dijkstra(graph, edge_weight)
+    distance_from_source, previous = dijkstra(
+        successors, encode(source), {encode(target) for target in targets}
+    )
+    return ShortestPathDAG(
+        source, targets, distance_from_source, previous, encode, decode
     )
-    distance_from_source[source] = 0
-    heap = [(0, source, {source})]
 
-    best_paths = {target: deque() for target in targets}
-    shortest_distance = {target: None for target in targets}
-    while heap:
-        distance_to_node, node, path = heapq.heappop(heap)
 
-        if node in targets:
-            cheapest_path_cost = shortest_distance[node]
-            if cheapest_path_cost is None or distance_to_node == cheapest_path_cost:
-                best_paths[node].append(path)
-                shortest_distance[node] = distance_to_node
-            continue
+def distances_from[T: Hashable](
+        graph: SearchableGraph[T],
+        source: Node[T],
+        edge_weight = 'weight'
+) -> ShortestPathTree[T]:
+    return _shortest_path_tree(graph, source, edge_weight, towards_root=False)
 
-        for out_edge in graph.out_edges(node):
-            _, neighbor = out_edge
-            current_distance = distance_from_source[neighbor]
-            updated_distance = (
-                distance_to_node + get_weight((node, neighbor))
-            )
-            if updated_distance > current_distance:
-                continue
-            elif updated_distance < current_distance:
-                distance_from_source[neighbor] = updated_distance
-            heapq.heappush(
-                heap, (updated_distance, neighbor, path | {neighbor})
-            )
 
-    def target_output(
-            target_paths: deque[Sequence[Node[T]]],
-            target_distance: float | None
-    ):
-        paths = [list(path) for path in target_paths]
-        if with_distance:
-            distance = math.inf if target_distance is None else target_distance
-            return paths, distance
-        else:
-            return paths
-    if len(targets) == 1:
-        return target_output(
-            best_paths[targets[0]], shortest_distance[targets[0]]
-        )
+def distances_to[T: Hashable](
+        graph: SearchableGraph[T],
+        target: Node[T],
+        edge_weight = 'weight'
+) -> ShortestPathTree[T]:
+    return _shortest_path_tree(graph, target, edge_weight, towards_root=True)
+
+
+def _shortest_path_tree[T: Hashable](
+        graph: SearchableGraph[T],
+        root: Node[T],
+        edge_weight: Any,
+        towards_root: bool
+) -> ShortestPathTree[T]:
+    successors, encode, decode = graph._search_space(
+        edge_weight, reverse=towards_root
+    )
+    dijkstra = _select_dijkstra(graph, edge_weight)
+    distance_from_root, previous = dijkstra(successors, encode(root))
+    if isinstance(graph, CompactGraph):
+        encoded_node_count = len(graph.nodes)
+    elif isinstance(graph, ImplicitGridGraph):
+        encoded_node_count = math.prod(graph.shape)
     else:
-        return {
-            target: target_output(
-                best_paths[target], shortest_distance[target]
-            ) for target in targets
-        }
+        encoded_node_count = None
+    return ShortestPathTree(
+        root,
+        distance_from_root,
+        previous,
+        towards_root,
+        encode,
+        decode,
+        encoded_node_count
+    )
 
 
 def shortest_path[T: Hashable](
-        graph: UndirectedGraph[T] | DiGraph[T],
+        graph: SearchableGraph[T],
         source: Node[T],
         target: Node[T],
         heuristic: Callable[[Node[T], Node[T]], float],
-        edge_weight='weight'
+        edge_weight='weight',
+        statistics: SearchStatistics | None = None
+) -> tuple[Sequence[Node[T]], float]:
+    try:
+        return shortest_path_to_any(
+            graph, source, [target], heuristic, edge_weight, statistics
+        )
+    except ValueError:
+        raise ValueError(
+            f'Unable to find a path from {source} to {target}'
+        ) from None
+
+
+def shortest_path_to_any[T: Hashable](
+        graph: SearchableGraph[T],
+        source: Node[T],
+        targets: Iterable[Node[T]],
+        heuristic: Callable[[Node[T], Node[T]], float],
+        edge_weight='weight',
+        statistics: SearchStatistics | None = None
 ) -> tuple[Sequence[Node[T]], float]:
-    if isinstance(edge_weight, str):
-        def get_weight(edge):
-            return graph.edges[edge][edge_weight]
+    targets = list(targets)
+    if not targets:
+        raise ValueError('At least one target node must be provided.')
+    successors, encode, decode = graph._search_space(edge_weight)
+
+    if len(targets) == 1:
+        target, = targets
+
+        def estimate_remaining(node):
+            return heuristic(decode(node), target)
+    else:
+        def estimate_remaining(node):
+            decoded_node = decode(node)
+            return min(heuristic(decoded_node, target) for target in targets)
+
+    if (
+            isinstance(edge_weight, str)
+            and not graph._has_integer_weights(edge_weight)
+    ):
+        queue_class: type[PriorityQueue | BucketQueue] = PriorityQueue
     else:
-        def get_weight(_):
-            return edge_weight
-
-    def recover_path(previous, end):
-        current = end
-        path = deque([current])
-        while current in previous:
-            current = previous[current]
-            path.appendleft(current)
-        return list(path)
-
-    score_best_known: defaultdict[Node[T], float] = defaultdict(
-        lambda: math.inf
+        queue_class = BucketQueue
+    path_and_distance = _a_star(
+        successors,
+        encode(source),
+        {encode(target) for target in targets},
+        estimate_remaining,
+        queue_class,
+        statistics
     )
-    # g_score
-    score_best_known[source] = 0
+    if path_and_distance is None:
+        raise ValueError(
+            f'Unable to find a path from {source} to any of {targets}'
+        )
+    path, distance = path_and_distance
+    return [decode(node) for node in path], distance
+
+
+def bidirectional_shortest_path[T: Hashable](
+        graph: SearchableGraph[T],
+        source: Node[T],
+        target: Node[T],
+        edge_weight='weight'
+) -> tuple[Sequence[Node[T]], float]:
+    successors, encode, decode = graph._search_space(edge_weight)
+    predecessors, *_ = graph._search_space(edge_weight, reverse=True)
 
-    score_through_node: defaultdict[Node[T], float] = defaultdict(
-        lambda: math.inf
+    path_and_distance = _bidirectional_dijkstra(
+        successors, predecessors, encode(source), encode(target)
     )
-    # f_score
-    score_through_node[source] = heuristic(source, target)
+    if path_and_distance is None:
+        raise ValueError(f'Unable to find a path from {source} to {target}')
+    path, distance = path_and_distance
+    return [decode(node) for node in path], distance
+
+
+def multi_source_shortest_paths[T: Hashable](
+        graph: SearchableGraph[T],
+        sources: Iterable[Node[T]],
+        targets: Iterable[Node[T]] | None = None,
+        edge_weight='weight',
+        workers: int | None = None
+) -> dict[Node[T], dict[Node[T], float]]:
+    """Find shortest distances from each of sources, searching in parallel.
+
+    Each source is searched independently in a pool of worker processes.
+    Graphs with adjacency lists are snapshotted to a temporary file that
+    every worker memory-maps, so they share one copy of the CSR arrays.
+    Results map each source, in the order given, to its distances to
+    targets (or to every reachable node when targets is None).
+    """
+    sources = list(dict.fromkeys(sources))
+    targets = None if targets is None else list(targets)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(sources))
+    if workers <= 1:
+        return {
+            source: _distances_from_source(
+                graph, targets, edge_weight, source
+            )
+            for source in sources
+        }
 
-    queue = PriorityQueue()
+    with tempfile.TemporaryDirectory() as snapshot_directory:
+        shared_graph: SearchableGraph[T] | pathlib.Path
+        if isinstance(graph, (UndirectedGraph, DiGraph, CompactGraph)):
+            shared_graph = pathlib.Path(snapshot_directory) / 'graph'
+            graph.to_compact(
+                edge_weight if isinstance(edge_weight, str) else 'weight'
+            ).save(shared_graph)
+        else:
+            # Implicit graphs are a bitmask, so copying them is already
+            # cheap.
+            shared_graph = graph
+        with ProcessPoolExecutor(
+                workers,
+                initializer=_initialize_search_worker,
+                initargs=(shared_graph,)
+        ) as executor:
+            distances = executor.map(
+                partial(_search_in_worker, targets, edge_weight),
+                sources,
+                chunksize=max(1, len(sources) // (4 * workers))
+            )
+            return dict(zip(sources, distances))
 
-    previous: dict[Node[T], Node[T]] = {}
-    queue.add(source, score_through_node[source])
 
-    while queue:
-        current, score_through = queue.pop()
+_worker_graph: Any = None
 
-        if current == target:
-            return recover_path(previous, target), score_through
 
-        out_neighbors = {
-            neighbor for _, neighbor in graph.out_edges(current)
-            if neighbor != current
-        }
-        for neighbor in out_neighbors:
-            updated_best_known = (
-                    score_best_known[current] + get_weight((current, neighbor))
-            )
-            if updated_best_known < score_best_known[neighbor]:
-                previous[neighbor] = current
-                score_best_known[neighbor] = updated_best_known
-                score_through_node[neighbor] = (
-                        updated_best_known
-                        + heuristic(neighbor, target)
-                )
-                queue.add(neighbor, score_through_node[neighbor])
+def _initialize_search_worker(
+        shared_graph: SearchableGraph[Any] | pathlib.Path
+):
+    global _worker_graph
+    if isinstance(shared_graph, pathlib.Path):
+        _worker_graph = CompactGraph.load(shared_graph)
+    else:
+        _worker_graph = shared_graph
 
-    raise ValueError(f'Unable to find a path from {source} to {target}')
 
+def _search_in_worker[T: Hashable](
+        targets: Sequence[Node[T]] | None, edge_weight: Any, source: Node[T]
+) -> dict[Node[T], float]:
+    return _distances_from_source(_worker_graph, targets, edge_weight, source)
 
-def _recover_all_paths[T: Hashable](
-        node: Node[T],
-        predecessor_set: Mapping[Node[T], set[Node[T]] | None],
-        path_tails: Sequence[Sequence[Node[T]]] | None = None
-) -> list[list[Node[T]]]:
-    if path_tails is None:
-        path_tails = deque([deque([node])])
 
-    return [
-        list(path)
-        for path in _recover_all_paths_recurrence(
-            node, predecessor_set, deque(deque(tail) for tail in path_tails)
+def _distances_from_source[T: Hashable](
+        graph: SearchableGraph[T],
+        targets: Sequence[Node[T]] | None,
+        edge_weight: Any,
+        source: Node[T]
+) -> dict[Node[T], float]:
+    successors, encode, decode = graph._search_space(edge_weight)
+    dijkstra = _select_dijkstra(graph, edge_weight)
+    if targets is None:
+        distance_from_source, _ = dijkstra(successors, encode(source))
+        return {
+            decode(node): distance
+            for node, distance in distance_from_source.items()
+        }
+    encoded_targets = [encode(target) for target in targets]
+    distance_from_source, _ = dijkstra(
+        successors, encode(source), frozenset(encoded_targets)
+    )
+    return {
+        target: distance_from_source.get(encoded_target, math.inf)
+        for target, encoded_target in zip(targets, encoded_targets)
+    }
+
+
+def all_pairs_distances[T: Hashable](
+        graph: SearchableGraph[T],
+        edge_weight = 'weight',
+        cache_directory: str | os.PathLike | None = None
+) -> DistanceMatrix[T]:
+    node_index = {node: index for index, node in enumerate(graph.nodes)}
+    if cache_directory is not None:
+        cache_path = pathlib.Path(cache_directory) / (
+            f'{_content_hash(graph, edge_weight)}.npy'
         )
+        try:
+            return DistanceMatrix(node_index, _load_npy(cache_path))
+        except (OSError, ValueError):
+            pass
+
+    successors, encode, _ = graph._search_space(edge_weight)
+    encoded_nodes = [encode(node) for node in node_index]
+    position = {node: index for index, node in enumerate(encoded_nodes)}
+    node_count = len(encoded_nodes)
+    adjacency = [
+        [(position[neighbor], weight) for neighbor, weight in successors(node)]
+        for node in encoded_nodes
     ]
+    edge_count = sum(map(len, adjacency))
+    if (
+            node_count <= _FLOYD_WARSHALL_MAX_NODES
+            and 2 * edge_count >= node_count ** 2
+    ):
+        distances = _floyd_warshall(adjacency)
+    else:
+        dijkstra = _select_dijkstra(graph, edge_weight)
+        distances = array('d', itertools.repeat(math.inf, node_count ** 2))
+        for source in range(node_count):
+            distance_from_source, _ = dijkstra(
+                adjacency.__getitem__, source, frozenset()
+            )
+            row_start = source * node_count
+            for target, distance in distance_from_source.items():
+                distances[row_start + target] = distance
+
+    if cache_directory is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        _save_npy(cache_path, distances, (node_count, node_count))
+    return DistanceMatrix(node_index, distances)
+
+
+_FLOYD_WARSHALL_MAX_NODES = 150
+
+
+def _floyd_warshall(
+        adjacency: Sequence[Iterable[tuple[int, float]]]
+) -> array:
+    node_count = len(adjacency)
+    rows = [[math.inf] * node_count for _ in range(node_count)]
+    for source, neighbors in enumerate(adjacency):
+        row = rows[source]
+        for target, weight in neighbors:
+            row[target] = min(row[target], weight)
+        row[source] = min(row[source], 0)
+
+    for intermediate in range(node_count):
+        intermediate_row = rows[intermediate]
+        for source in range(node_count):
+            distance_to_intermediate = rows[source][intermediate]
+            if distance_to_intermediate == math.inf:
+                continue
+            # Relax a whole row at once rather than entry by entry.
+            rows[source] = list(map(
+                min,
+                rows[source],
+                [
+                    distance_to_intermediate + distance
+                    for distance in intermediate_row
+                ]
+            ))
+    return array('d', itertools.chain.from_iterable(rows))
+
+
+def _content_hash[T: Hashable](
+        graph: SearchableGraph[T],
+        edge_weight: Any = 'weight'
+) -> str:
+    # Nodes are hashed in iteration order, since cached results are indexed
+    # by it.
+    successors, encode, decode = graph._search_space(edge_weight)
+    digest = hashlib.sha256(repr((graph.is_directed, edge_weight)).encode())
+    for node in graph.nodes:
+        digest.update(repr(node).encode())
+        digest.update(b'\x00')
+        digest.update(repr(sorted(
+            (repr(decode(neighbor)), repr(weight))
+            for neighbor, weight in successors(encode(node))
+        )).encode())
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+_NPY_MAGIC = b'\x93NUMPY\x01\x00'
+_NPY_FLOAT64 = '<f8' if sys.byteorder == 'little' else '>f8'
+
+
+def _save_npy(
+        path: str | os.PathLike, values: array, shape: tuple[int, ...]
+):
+    # Writes a version 1.0 .npy file, readable with numpy.load, without
+    # depending on NumPy.
+    header = repr({
+        'descr': _NPY_FLOAT64, 'fortran_order': False, 'shape': shape
+    })
+    padding = -(len(_NPY_MAGIC) + 2 + len(header) + 1) % 64
+    header = header + ' ' * padding + '\n'
+    with open(path, 'wb') as npy_file:
+        npy_file.write(_NPY_MAGIC)
+        npy_file.write(len(header).to_bytes(2, 'little'))
+        npy_file.write(header.encode('latin1'))
+        values.tofile(npy_file)
+
+
+def _load_npy(path: str | os.PathLike) -> memoryview[float]:
+    # Memory-maps a float64 .npy file written by _save_npy and returns its
+    # values without copying them. Any malformed file raises ValueError so
+    # that callers can fall back to recomputing it.
+    with open(path, 'rb') as npy_file:
+        mapped_file = mmap.mmap(npy_file.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped_file[:len(_NPY_MAGIC)] != _NPY_MAGIC:
+        raise ValueError(f'{path} is not a version 1.0 .npy file.')
+    header_length = int.from_bytes(
+        mapped_file[len(_NPY_MAGIC):len(_NPY_MAGIC) + 2], 'little'
+    )
+    data_offset = len(_NPY_MAGIC) + 2 + header_length
+    try:
+        header = ast.literal_eval(
+            mapped_file[len(_NPY_MAGIC) + 2:data_offset].decode('latin1')
+        )
+        descr, fortran_order = header['descr'], header['fortran_order']
+        value_count = math.prod(header['shape'])
+    except (SyntaxError, TypeError, KeyError, ValueError) as error:
+        raise ValueError(f'{path} has a malformed header.') from error
+    if descr != _NPY_FLOAT64 or fortran_order:
+        raise ValueError(f'{path} does not hold native float64 values.')
+    if len(mapped_file) - data_offset != 8 * value_count:
+        raise ValueError(f'{path} is truncated.')
+    return memoryview(mapped_file)[data_offset:].cast('d')
+
+
+_SNAPSHOT_MAGIC = b'\x93AOCGRAPH\x01'
+
+
+def _save_snapshot(
+        path: str | os.PathLike,
+        sections: Mapping[str, Sequence[Any]],
+        metadata: Mapping[str, Any],
+        content_hash: str | None = None
+) -> str:
+    # Typed arrays are written raw and 8-byte aligned so that _load_snapshot
+    # can map them back with memoryview.cast; anything else is pickled.
+    payloads = {}
+    for name, values in sections.items():
+        typecode = _typecode(values)
+        if typecode is None:
+            payloads[name] = ('pickle', pickle.dumps(values))
+        else:
+            payloads[name] = (
+                typecode, memoryview(values).cast('B')  # type: ignore
+            )
+
+    layout = {}
+    digest = hashlib.sha256(repr(sorted(metadata.items())).encode())
+    offset = 0
+    for name, (section_format, payload) in payloads.items():
+        offset += -offset % 8
+        layout[name] = (section_format, offset, len(payload))
+        offset += len(payload)
+        digest.update(payload)
+    if content_hash is None:
+        content_hash = digest.hexdigest()
+
+    header = repr({
+        **metadata,
+        'byteorder': sys.byteorder,
+        'content_hash': content_hash,
+        'sections': layout
+    })
+    header += ' ' * (-(len(_SNAPSHOT_MAGIC) + 4 + len(header)) % 8)
+    with open(path, 'wb') as snapshot_file:
+        snapshot_file.write(_SNAPSHOT_MAGIC)
+        snapshot_file.write(len(header).to_bytes(4, 'little'))
+        snapshot_file.write(header.encode('latin1'))
+        written = 0
+        for section_format, payload in payloads.values():
+            snapshot_file.write(bytes(-written % 8))
+            written += -written % 8
+            snapshot_file.write(payload)
+            written += len(payload)
+    return content_hash
+
+
+def _load_snapshot(
+        path: str | os.PathLike, map_file: bool = True
+) -> tuple[dict[str, Any], dict[str, Sequence[Any]]]:
+    # Pickled sections are trusted, so only load snapshots this module wrote.
+    with open(path, 'rb') as snapshot_file:
+        if map_file:
+            buffer = memoryview(mmap.mmap(
+                snapshot_file.fileno(), 0, access=mmap.ACCESS_READ
+            ))
+        else:
+            buffer = memoryview(snapshot_file.read())
+    if buffer[:len(_SNAPSHOT_MAGIC)] != _SNAPSHOT_MAGIC:
+        raise ValueError(f'{path} is not a graph snapshot.')
+    header_start = len(_SNAPSHOT_MAGIC) + 4
+    data_offset = header_start + int.from_bytes(
+        buffer[len(_SNAPSHOT_MAGIC):header_start], 'little'
+    )
+    try:
+        metadata = ast.literal_eval(
+            bytes(buffer[header_start:data_offset]).decode('latin1')
+        )
+        byteorder = metadata['byteorder']
+        layout = metadata.pop('sections').items()
+    except (
+            SyntaxError, TypeError, KeyError, AttributeError, ValueError
+    ) as error:
+        raise ValueError(f'{path} has a malformed header.') from error
+    if byteorder != sys.byteorder:
+        raise ValueError(f'{path} was written with a different byte order.')
+
+    sections: dict[str, Sequence[Any]] = {}
+    for name, (section_format, offset, length) in layout:
+        payload = buffer[data_offset + offset:data_offset + offset + length]
+        if len(payload) != length:
+            raise ValueError(f'{path} is truncated.')
+        try:
+            if section_format == 'pickle':
+                sections[name] = pickle.loads(payload)
+            elif map_file:
+                sections[name] = payload.cast(section_format)
+            else:
+                sections[name] = array(section_format, bytes(payload))
+        except (pickle.UnpicklingError, EOFError, TypeError) as error:
+            raise ValueError(
+                f'{path} has a corrupt {name} section.'
+            ) from error
+    return metadata, sections
+
+
+def first_disconnecting_removal[T: Hashable](
+        graph: SearchableGraph[T],
+        source: Node[T],
+        target: Node[T],
+        removals: Sequence[Node[T]]
+) -> tuple[int, Node[T]]:
+    """Find the first of removals whose removal disconnects target.
+
+    Nodes are considered removed cumulatively, in order, without modifying
+    the graph. Returns the position of the disconnecting removal together
+    with the removed node.
+    """
+    successors, encode, _ = graph._search_space(1)
+    encoded_source, encoded_target = encode(source), encode(target)
+    # Removing a node the graph lacks changes nothing, and restoring one
+    # would add a node that was never there.
+    nodes = graph.nodes
+    removal_time: dict[Any, int] = {}
+    for time, node in enumerate(removals):
+        if node in nodes:
+            removal_time.setdefault(encode(node), time)
+
+    if graph.is_directed:
+        disconnecting_count = _first_disconnecting_count_by_search(
+            successors, encoded_source, encoded_target, removal_time,
+            len(removals)
+        )
+    else:
+        disconnecting_count = _first_disconnecting_count_by_union_find(
+            successors, map(encode, graph.nodes), encoded_source,
+            encoded_target, removal_time, len(removals)
+        )
+    if disconnecting_count == 0:
+        raise ValueError(f'{target} is not reachable from {source}.')
+    if disconnecting_count is None:
+        raise ValueError(
+            f'{target} remains reachable from {source} after every removal.'
+        )
+    return disconnecting_count - 1, removals[disconnecting_count - 1]
+
+
+def _first_disconnecting_count_by_union_find[N](
+        successors: Successors[N],
+        nodes: Iterable[N],
+        source: N,
+        target: N,
+        removal_time: Mapping[N, int],
+        removal_count: int
+) -> int | None:
+    # Starts from the graph with every removal applied, then adds removed
+    # nodes back in reverse order until source and target are connected.
+    components: DisjointSet[N] = DisjointSet()
+    present = set()
+    for node in nodes:
+        if node not in removal_time:
+            present.add(node)
+            components.add(node)
+    for node in present:
+        for neighbor, _ in successors(node):
+            if neighbor in present:
+                components.union(node, neighbor)
+
+    def connected():
+        return (
+            source in present and target in present
+            and components.connected(source, target)
+        )
+
+    if connected():
+        return None
+    restored_at: dict[int, N] = {
+        time: node for node, time in removal_time.items()
+    }
+    for time in reversed(range(removal_count)):
+        if time not in restored_at:
+            continue
+        node = restored_at[time]
+        present.add(node)
+        components.add(node)
+        for neighbor, _ in successors(node):
+            if neighbor in present:
+                components.union(node, neighbor)
+        if connected():
+            return time + 1
+    return 0
+
+
+def _first_disconnecting_count_by_search[N](
+        successors: Successors[N],
+        source: N,
+        target: N,
+        removal_time: Mapping[N, int],
+        removal_count: int
+) -> int | None:
+    def connected_after(prefix_length: int) -> bool:
+        # Breadth-first search avoiding the first prefix_length removals.
+        def removed(node):
+            return removal_time.get(node, prefix_length) < prefix_length
+
+        if removed(source) or removed(target):
+            return False
+        visited = {source}
+        frontier = [source]
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                if node == target:
+                    return True
+                for neighbor, _ in successors(node):
+                    if neighbor not in visited and not removed(neighbor):
+                        visited.add(neighbor)
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        return False
+
+    if not connected_after(0):
+        return 0
+    if connected_after(removal_count):
+        return None
+    # Binary search for the shortest prefix of removals that disconnects.
+    connected_count, disconnected_count = 0, removal_count
+    while disconnected_count - connected_count > 1:
+        prefix_length = (connected_count + disconnected_count) // 2
+        if connected_after(prefix_length):
+            connected_count = prefix_length
+        else:
+            disconnected_count = prefix_length
+    return disconnected_count
+
+
+def _select_dijkstra[T: Hashable](
+        graph: SearchableGraph[T],
+        edge_weight: Any
+) -> Callable[..., tuple[dict[Any, float], dict[Any, set | None]]]:
+    # Callers pass a target set only when the search can stop early.
+    if not isinstance(edge_weight, str):
+        return _breadth_first_search if edge_weight > 0 else _dijkstra
+    if graph._has_integer_weights(edge_weight):
+        return _bucket_dijkstra
+    return _dijkstra
+
+
+def _dijkstra[N](
+        successors: Successors[N],
+        source: N,
+        targets: Set[N] = frozenset()
+) -> tuple[dict[N, float], dict[N, set[N] | None]]:
+    distance_from_source: dict[N, float] = {source: 0}
+    previous: dict[N, set[N] | None] = {source: None}
+    settled: set[N] = set()
+    unsettled_targets = set(targets)
+    farthest_target_distance = math.inf
+    counter = itertools.count()
+    heap = [(0, next(counter), source)]
+
+    while heap:
+        distance_to_node, _, node = heapq.heappop(heap)
+        if distance_to_node > farthest_target_distance:
+            break
+        if node in settled:
+            continue
+        settled.add(node)
+        if node in unsettled_targets:
+            unsettled_targets.remove(node)
+            if not unsettled_targets:
+                # Keep settling nodes at this distance so that zero-weight
+                # edges still contribute all of their predecessors.
+                farthest_target_distance = distance_to_node
+
+        for neighbor, weight in successors(node):
+            if neighbor == node:
+                continue
+            current_distance = distance_from_source.get(neighbor, math.inf)
+            updated_distance = distance_to_node + weight
+            if updated_distance < current_distance:
+                distance_from_source[neighbor] = updated_distance
+                previous[neighbor] = {node}
+                heapq.heappush(
+                    heap, (updated_distance, next(counter), neighbor)
+                )
+            elif (
+                    updated_distance == current_distance
+                    and previous[neighbor] is not None
+            ):
+                previous[neighbor].add(node)  # type: ignore
 
+    return distance_from_source, previous
+
+
+def _bucket_dijkstra[N](
+        successors: Successors[N],
+        source: N,
+        targets: Set[N] = frozenset()
+) -> tuple[dict[N, float], dict[N, set[N] | None]]:
+    # Dijkstra's algorithm settling one bucket of equidistant nodes at a time.
+    # Only distinct distances enter the heap, which pays off when edge
+    # weights are small integers and many nodes share a distance.
+    distance_from_source: dict[N, float] = {source: 0}
+    previous: dict[N, set[N] | None] = {source: None}
+    unsettled_targets = set(targets)
+    buckets: dict[float, list[N]] = {0: [source]}
+    distances = [0]
+
+    while distances:
+        distance_to_bucket = heapq.heappop(distances)
+        bucket = buckets.pop(distance_to_bucket)
+        # Nodes reached through zero-weight edges are appended to the bucket
+        # while it is being iterated over.
+        for node in bucket:
+            if distance_from_source[node] < distance_to_bucket:
+                continue
+            unsettled_targets.discard(node)
+
+            for neighbor, weight in successors(node):
+                if neighbor == node:
+                    continue
+                current_distance = distance_from_source.get(neighbor, math.inf)
+                updated_distance = distance_to_bucket + weight
+                if updated_distance < current_distance:
+                    distance_from_source[neighbor] = updated_distance
+                    previous[neighbor] = {node}
+                    if updated_distance == distance_to_bucket:
+                        bucket.append(neighbor)
+                    elif updated_distance in buckets:
+                        buckets[updated_distance].append(neighbor)
+                    else:
+                        buckets[updated_distance] = [neighbor]
+                        heapq.heappush(distances, updated_distance)
+                elif (
+                        updated_distance == current_distance
+                        and previous[neighbor] is not None
+                ):
+                    previous[neighbor].add(node)  # type: ignore
+        if targets and not unsettled_targets:
+            break
+
+    return distance_from_source, previous
+
+
+def _breadth_first_search[N](
+        successors: Successors[N],
+        source: N,
+        targets: Set[N] = frozenset()
+) -> tuple[dict[N, float], dict[N, set[N] | None]]:
+    # Dijkstra's algorithm for a constant positive edge weight, where every
+    # node in one BFS layer is one edge weight farther than the last.
+    distance_from_source: dict[N, float] = {source: 0}
+    previous: dict[N, set[N] | None] = {source: None}
+    unsettled_targets = set(targets)
+    unsettled_targets.discard(source)
+    layer = [source]
+    distance_to_layer: float = 0
+
+    while layer and (unsettled_targets or not targets):
+        next_layer = []
+        for node in layer:
+            for neighbor, weight in successors(node):
+                updated_distance = distance_to_layer + weight
+                if neighbor not in distance_from_source:
+                    distance_from_source[neighbor] = updated_distance
+                    previous[neighbor] = {node}
+                    next_layer.append(neighbor)
+                elif distance_from_source[neighbor] == updated_distance:
+                    previous[neighbor].add(node)  # type: ignore
+        if next_layer:
+            unsettled_targets.difference_update(next_layer)
+            distance_to_layer = distance_from_source[next_layer[0]]
+        layer = next_layer
+
+    return distance_from_source, previous
+
+
+def _a_star[N](
+        successors: Successors[N],
+        source: N,
+        targets: Set[N],
+        estimate_remaining: Callable[[N], float],
+        queue_class: type[PriorityQueue | BucketQueue] = PriorityQueue,
+        statistics: SearchStatistics | None = None
+) -> tuple[list[N], float] | None:
+    # g_score
+    score_best_known: dict[N, float] = {source: 0}
+    previous: dict[N, N] = {}
+
+    queue = queue_class()
+    queue.add(source, estimate_remaining(source))
+    expanded_count = 0
+
+    try:
+        while queue:
+            current, _ = queue.pop()
+            expanded_count += 1
+
+            if current in targets:
+                return (
+                    _recover_path(previous, current),
+                    score_best_known[current]
+                )
 
-def _recover_all_paths_recurrence[T: Hashable](
+            for neighbor, weight in successors(current):
+                if neighbor == current:
+                    continue
+                updated_best_known = score_best_known[current] + weight
+                if updated_best_known < score_best_known.get(
+                        neighbor, math.inf
+                ):
+                    previous[neighbor] = current
+                    score_best_known[neighbor] = updated_best_known
+                    # f_score
+                    queue.add(
+                        neighbor,
+                        updated_best_known + estimate_remaining(neighbor)
+                    )
+
+        return None
+    finally:
+        if statistics is not None:
+            statistics.nodes_expanded += expanded_count
+            statistics.nodes_reached += len(score_best_known)
+
+
+def _bidirectional_dijkstra[N](
+        successors: Successors[N],
+        predecessors: Successors[N],
+        source: N,
+        target: N
+) -> tuple[list[N], float] | None:
+    if source == target:
+        return [source], 0
+
+    # Index 0 holds the forward search from the source and index 1 holds the
+    # backward search from the target.
+    expand = (successors, predecessors)
+    distance: tuple[dict[N, float], dict[N, float]] = (
+        {source: 0}, {target: 0}
+    )
+    previous: tuple[dict[N, N], dict[N, N]] = ({}, {})
+    settled: tuple[set[N], set[N]] = (set(), set())
+    counter = itertools.count()
+    heaps = ([(0, next(counter), source)], [(0, next(counter), target)])
+
+    shortest_distance = math.inf
+    meeting_node = None
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= shortest_distance:
+            break
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        distance_to_node, _, node = heapq.heappop(heaps[side])
+        if node in settled[side]:
+            continue
+        settled[side].add(node)
+
+        for neighbor, weight in expand[side](node):
+            updated_distance = distance_to_node + weight
+            if updated_distance < distance[side].get(neighbor, math.inf):
+                distance[side][neighbor] = updated_distance
+                previous[side][neighbor] = node
+                heapq.heappush(
+                    heaps[side], (updated_distance, next(counter), neighbor)
+                )
+            if neighbor in distance[1 - side]:
+                candidate_distance = (
+                    distance[side][neighbor] + distance[1 - side][neighbor]
+                )
+                if candidate_distance < shortest_distance:
+                    shortest_distance = candidate_distance
+                    meeting_node = neighbor
+
+    if meeting_node is None:
+        return None
+    path = _recover_path(previous[0], meeting_node)
+    node = meeting_node
+    while node in previous[1]:
+        node = previous[1][node]
+        path.append(node)
+    return path, shortest_distance
+
+
+def _recover_path[N](previous: Mapping[N, N], end: N) -> list[N]:
+    current = end
+    path = deque([current])
+    while current in previous:
+        current = previous[current]
+        path.appendleft(current)
+    return list(path)
+
+
+def _iter_all_paths[T: Hashable](
         node: Node[T],
-        predecessor_set: Mapping[Node[T], set[Node[T]] | None],
-        path_tails: deque[deque[Node[T]]]
-) -> deque[deque[Node[T]]]:
-    predecessors = predecessor_set[node]
-    if predecessors is None:
-        return path_tails
-
-    recovered_paths: deque[deque[Node[T]]] = deque()
-    for predecessor in predecessors:
-        predecessor_path_tails = deepcopy(path_tails)
-        for tail in predecessor_path_tails:
-            tail.appendleft(predecessor)
-        recovered_paths.extend(
-            _recover_all_paths_recurrence(
-                predecessor,
-                predecessor_set,
-                predecessor_path_tails
-            )
-        )
-    return recovered_paths
-
-
-def grid2d(*shape):
-    edges = set.union(*(
-        {
+        predecessor_set: Mapping[Node[T], set[Node[T]] | None]
+) -> Iterator[list[Node[T]]]:
+    # Partial paths are stored as persistent linked lists of (node, rest)
+    # cells, where rest continues toward the final node. Every predecessor
+    # extends the shared cell in O(1), and a path is only copied into a list
+    # once it reaches the source.
+    partial_paths: list[tuple[Node[T], Any]] = [(node, None)]
+    while partial_paths:
+        partial_path = partial_paths.pop()
+        predecessors = predecessor_set[partial_path[0]]
+        if predecessors is not None:
+            partial_paths.extend(
+                (predecessor, partial_path) for predecessor in predecessors
+            )
+            continue
+
+        path = []
+        while partial_path is not None:
+            path_node, partial_path = partial_path
+            path.append(path_node)
+        yield path
+
+
+def _count_all_paths[T: Hashable](
+        nodes: Iterable[Node[T]],
+        predecessor_set: Mapping[Node[T], set[Node[T]] | None]
+) -> int:
+    path_count: dict[Node[T], int] = {}
+    total_path_count = 0
+    for end in nodes:
+        to_count = [end]
+        while to_count:
+            node = to_count[-1]
+            if node in path_count:
+                to_count.pop()
+                continue
+            predecessors = predecessor_set[node]
+            if predecessors is None:
+                path_count[node] = 1
+                to_count.pop()
+                continue
+            uncounted = [
+                predecessor
+                for predecessor in predecessors
+                if predecessor not in path_count
+            ]
+            if uncounted:
+                to_count.extend(uncounted)
+            else:
+                path_count[node] = sum(
+                    path_count[predecessor] for predecessor in predecessors
+                )
+                to_count.pop()
+        total_path_count += path_count[end]
+    return total_path_count
+
+
+def grid2d(
+        *shape: int, implicit: bool = False
+) -> UndirectedGraph[GridNode] | ImplicitGridGraph:
+    if implicit:
+        return ImplicitGridGraph(shape)  # type: ignore
+    rows, columns = shape
+    return UndirectedGraph(*(
+        edge
+        for row, column in itertools.product(range(rows), range(columns))
+        for edge in (
             ((row, column), (row + 1, column)),
             ((row, column), (row, column + 1))
-        }
-        for row, column in itertools.product(*map(range, shape))
+        )
+        if edge[1][0] < rows and edge[1][1] < columns
     ))
-    return UndirectedGraph(*(
-        (node, neighbor)
-        for (node, neighbor) in edges
-        if neighbor[0] < shape[0] and neighbor[1] < shape[1]
-    ))
\ No newline at end of file
@@ -1,18 +1,33 @@
 from __future__ import annotations
 
-from collections import deque
-from collections.abc import Sequence
+import hashlib
+import heapq
+import itertools
+import math
+import mmap
+import operator
+import os
+import pathlib
+from array import array
+from collections import Counter, defaultdict, deque
+from collections.abc import Callable, Iterable, Iterator, Sequence, Set
 from copy import deepcopy
 from enum import Enum
-from functools import partial
-from typing import Union
+from functools import cached_property, partial
+from typing import Any, Union, cast
 
-from aoc2024.graph_theory import DiGraph
+from aoc2024 import graph_theory
+from aoc2024.graph_theory import (
+    CompactGraph, DiGraph, SearchSpace, SearchStatistics, ShortestPathDAG,
+    ShortestPathTree
+)
 from aoc2024.pathfinding import Direction
-from aoc2024.vector import Vector, taxicab
+from aoc2024.vector import taxicab
 
 type Position = tuple[int, int]
 type OrientedPosition = tuple[Position, Direction]
+type MazeNode = Position | OrientedPosition
+type Heuristic[N: MazeNode] = Callable[[N, N], float]
 
 
 class Component(str, Enum):
@@ -22,18 +37,46 @@ class Component(str, Enum):
     END = 'E'
 
 
+# Maps map characters to 1 for passable cells, 0 for walls (including the
+# newlines framing each row), and 2 for anything else.
+_PASSABILITY = bytes(
+    1 if character in b'.SE' else 0 if character in b'#\n' else 2
+    for character in range(256)
+)
+
+
 class Maze[PositionType: Position | OrientedPosition]:
     def __init__(
             self,
-            graph: DiGraph[PositionType],
+            graph: (
+                DiGraph[PositionType]
+                | CompactGraph[PositionType]
+                | ImplicitMazeGraph[PositionType]
+            ),
             start: PositionType,
             ends: Sequence[PositionType],
-            oriented: bool = True
+            oriented: bool = True,
+            cost_move_forward: float = 1,
+            cost_rotate: float = 1000
     ):
         self._graph = graph
         self._start = start
         self._ends = set(ends)
         self._oriented_nodes = oriented
+        self._cost_move_forward = cost_move_forward
+        self._cost_rotate = cost_rotate
+        self._compressed = False
+        # Compressed mazes keep the skipped states of each corridor encoded,
+        # and decode them only for the paths that are expanded.
+        self._corridor_states: dict[
+            tuple[PositionType, PositionType], tuple[Any, ...]
+        ] = {}
+        self._decode_corridor_state: Callable[[Any], PositionType] = (
+            _identity
+        )
+        # Landmark heuristics by landmark count. Path queries are cached by
+        # their arguments, so each count must keep returning one callable.
+        self._landmark_heuristics: dict[int, Heuristic[PositionType]] = {}
 
     @property
     def start(self) -> PositionType:
@@ -43,62 +86,494 @@ class Maze[PositionType: Position | OrientedPosition]:
     def ends(self) -> set[PositionType]:
         return self._ends
 
-    def find_all_cheapest_paths(self):
+    def find_all_cheapest_paths(
+            self, limit: int | None = None, count_only: bool = False
+    ):
+        cheapest_paths = self.find_cheapest_paths_dag()
+
+        def paths_to(end):
+            if not count_only:
+                return [
+                    self._expand_path(path)
+                    for path in cheapest_paths.paths(end, limit=limit)
+                ]
+            path_count = cheapest_paths.count_paths(end)
+            return path_count if limit is None else min(path_count, limit)
+
         return {
-            end: self._graph.all_shortest_paths(self._start, end)
+            end: (paths_to(end), cheapest_paths.distance(end))
             for end in self._ends
         }
 
-    def find_cheapest_path(self):
-        if isinstance(self.start[0], tuple):
-            def heuristic(node1, node2):
-                return taxicab(node1[0], node2[0])
-        else:
-            heuristic = taxicab
-        return min(
-            (
-                self._graph.shortest_path(
-                    source=self._start,
-                    target=end,
-                    heuristic=heuristic
-                )
-                for end in self.ends
-            ),
-            key=lambda path_and_cost: path_and_cost[1]
+    def find_cheapest_paths_dag(self) -> ShortestPathDAG[PositionType]:
+        return self._graph.shortest_path_dag(self._start, tuple(self._ends))
+
+    def nodes_on_cheapest_paths(self) -> set[PositionType]:
+        cheapest_paths = self.find_cheapest_paths_dag()
+        nodes = cheapest_paths.nodes_on_paths()
+        if self._compressed:
+            for edge in cheapest_paths.edges_on_paths():
+                nodes.update(map(
+                    self._decode_corridor_state, self._corridor_states[edge]
+                ))
+        return nodes
+
+    def distances_from_start(self) -> ShortestPathTree[PositionType]:
+        return self._graph.distances_from(self._start)
+
+    def count_shortcuts(
+            self,
+            max_jump: int,
+            min_saving: float,
+            histogram: bool = False
+    ) -> int | dict[float, int]:
+        """Count the shortcuts through walls that save at least min_saving.
+
+        A shortcut jumps from one open cell to another at most max_jump
+        moves away by taxicab distance, ignoring any walls between them.
+        Each pair of cells counts once and is scored by the cheapest route
+        through it. These routes come from distance fields to the start and
+        the ends, scanned one diamond offset at a time, so no individual
+        shortcut is stored. With histogram, the counts are returned by
+        saving instead.
+        """
+        if self._oriented_nodes or self._compressed:
+            raise ValueError(
+                'Shortcuts can only be counted in uncompressed mazes without '
+                'oriented nodes.'
+            )
+        from_start = dict(self._graph.distances_from(self._start))
+        to_end: dict[Any, float] = {}
+        for end in self._ends:
+            for position, distance in self._graph.distances_to(end).items():
+                if distance < to_end.get(position, math.inf):
+                    to_end[position] = distance
+        cheapest_distance = min(
+            (from_start[end] for end in self._ends if end in from_start),
+            default=math.inf
         )
+        if cheapest_distance == math.inf:
+            raise ValueError(
+                f'Unable to find a path from {self._start} to any of '
+                f'{self._ends}'
+            )
 
-    def find_cheapest_paths_astar(self):
-        if isinstance(self.start[0], tuple):
-            def heuristic(node1, node2):
-                return taxicab(node1[0], node2[0])
-        else:
-            heuristic = taxicab
+        # Lay both fields out on one grid, padded by max_jump so that every
+        # jump lands inside it and no jump wraps onto another row.
+        positions = from_start.keys() | to_end.keys()
+        row_count = max(row for row, _ in positions) + 1
+        row_length = max(column for _, column in positions) + 1 + max_jump
+        padding = max_jump * row_length
+        from_start_field = [math.inf] * (
+            (row_count + 2 * max_jump) * row_length
+        )
+        to_end_field = from_start_field.copy()
+        for (row, column), distance in from_start.items():
+            from_start_field[padding + row * row_length + column] = distance
+        for (row, column), distance in to_end.items():
+            to_end_field[padding + row * row_length + column] = distance
+        from_start_field = from_start_field[
+            padding:padding + row_count * row_length
+        ]
+
+        shortcut_count = 0
+        savings: Counter[float] = Counter()
+        for row_offset in range(-max_jump, max_jump + 1):
+            column_reach = max_jump - abs(row_offset)
+            for column_offset in range(-column_reach, column_reach + 1):
+                jump_cost = self._cost_move_forward * (
+                    abs(row_offset) + abs(column_offset)
+                )
+                if jump_cost == 0:
+                    continue
+                landing = padding + row_offset * row_length + column_offset
+                routes = map(
+                    operator.add,
+                    from_start_field,
+                    to_end_field[landing:landing + len(from_start_field)]
+                )
+                if histogram:
+                    for route, count in Counter(routes).items():
+                        savings[cheapest_distance - route - jump_cost] += count
+                else:
+                    shortcut_count += sum(map(
+                        operator.le,
+                        routes,
+                        itertools.repeat(
+                            cheapest_distance - min_saving - jump_cost
+                        )
+                    ))
+        if not histogram:
+            return shortcut_count
         return {
-            end: self._graph.shortest_path(
+            saving: savings[saving]
+            for saving in sorted(savings)
+            if saving >= min_saving
+        }
+
+    def find_cheapest_path(
+            self,
+            heuristic: str | Heuristic[PositionType] = 'turns',
+            statistics: SearchStatistics | None = None
+    ):
+        path, distance = self._graph.shortest_path_to_any(
+            source=self._start,
+            targets=tuple(self._ends),
+            heuristic=self._as_heuristic(heuristic),
+            statistics=statistics
+        )
+        return self._expand_path(path), distance
+
+    def find_cheapest_paths_astar(
+            self,
+            heuristic: str | Heuristic[PositionType] = 'turns',
+            statistics: SearchStatistics | None = None
+    ):
+        heuristic = self._as_heuristic(heuristic)
+        cheapest_paths = {}
+        for end in self._ends:
+            path, distance = self._graph.shortest_path(
                 self._start, end,
-                heuristic=heuristic
+                heuristic=heuristic,
+                statistics=statistics
             )
-            for end in self._ends
+            cheapest_paths[end] = self._expand_path(path), distance
+        return cheapest_paths
+
+    def heuristic(
+            self, kind: str = 'turns', landmark_count: int = 4
+    ) -> Heuristic[PositionType]:
+        """Return an admissible A* heuristic for this maze.
+
+        'taxicab' bounds the cost of the moves left. 'turns' also counts
+        the rotations an oriented maze needs before it can cover the
+        remaining offset. 'landmarks' takes the larger of that and ALT
+        bounds, which apply the triangle inequality to distances to and
+        from landmark nodes. The same heuristic is returned for repeated
+        calls, so its distances are computed once per maze and landmark
+        count.
+        """
+        if kind == 'taxicab':
+            return self._taxicab_bound
+        if kind == 'turns':
+            return self._turns_bound
+        if kind == 'landmarks':
+            heuristic = self._landmark_heuristics.get(landmark_count)
+            if heuristic is None:
+                landmark_bound = self._landmark_bound(landmark_count)
+
+                def heuristic(
+                        node: PositionType, target: PositionType
+                ) -> float:
+                    return max(
+                        self._turns_bound(node, target),
+                        landmark_bound(node, target)
+                    )
+                self._landmark_heuristics[landmark_count] = heuristic
+            return heuristic
+        raise ValueError(f'Unknown heuristic {kind!r}.')
+
+    def _as_heuristic(
+            self, heuristic: str | Heuristic[PositionType]
+    ) -> Heuristic[PositionType]:
+        if isinstance(heuristic, str):
+            return self.heuristic(heuristic)
+        return heuristic
+
+    def _taxicab_bound(self, node: PositionType, target: PositionType):
+        if self._oriented_nodes:
+            node, target = node[0], target[0]  # type: ignore
+        return self._cost_move_forward * taxicab(node, target)
+
+    def _turns_bound(self, node: PositionType, target: PositionType):
+        if not self._oriented_nodes:
+            return self._taxicab_bound(node, target)
+        (row, column), heading = cast(OrientedPosition, node)
+        (target_row, target_column), _ = cast(OrientedPosition, target)
+        return (
+            self._cost_move_forward * (
+                abs(target_row - row) + abs(target_column - column)
+            )
+            + self._cost_rotate * _minimum_turns(
+                heading, target_row - row, target_column - column
+            )
+        )
+
+    def _landmark_bound(self, landmark_count: int) -> Heuristic[PositionType]:
+        landmarks = self._choose_landmarks(landmark_count)
+        landmarks_for_target: dict[PositionType, list] = {}
+
+        def landmark_bound(node: PositionType, target: PositionType):
+            # d(node, target) >= d(landmark, target) - d(landmark, node) and
+            # d(node, target) >= d(node, landmark) - d(target, landmark).
+            target_landmarks = landmarks_for_target.get(target)
+            if target_landmarks is None:
+                target_landmarks = landmarks_for_target[target] = [
+                    (
+                        from_landmark,
+                        from_landmark.get(target, math.nan),
+                        to_landmark,
+                        to_landmark.get(target, math.nan)
+                    )
+                    for from_landmark, to_landmark in landmarks
+                ]
+            bound = 0
+            for (
+                    from_landmark, from_landmark_to_target,
+                    to_landmark, from_target_to_landmark
+            ) in target_landmarks:
+                # Unreachable nodes make these differences NaN or -inf, so
+                # bounds through them are never chosen.
+                lower_bound = from_landmark_to_target - from_landmark.get(
+                    node, math.inf
+                )
+                if lower_bound > bound:
+                    bound = lower_bound
+                lower_bound = to_landmark.get(
+                    node, math.nan
+                ) - from_target_to_landmark
+                if lower_bound > bound:
+                    bound = lower_bound
+            return bound
+        return landmark_bound
+
+    def _choose_landmarks(
+            self, landmark_count: int
+    ) -> list[tuple[dict[PositionType, float], dict[PositionType, float]]]:
+        # Farthest-first: each landmark is the node farthest from the start
+        # and the landmarks chosen before it, so that landmarks sit behind
+        # the regions they bound.
+        closest_distance = dict(self._graph.distances_from(self._start))
+        landmarks = []
+        for _ in range(landmark_count):
+            landmark = max(closest_distance, key=closest_distance.__getitem__)
+            if closest_distance[landmark] == 0:
+                break
+            from_landmark = dict(self._graph.distances_from(landmark))
+            to_landmark = dict(self._graph.distances_to(landmark))
+            landmarks.append((from_landmark, to_landmark))
+            for node, distance in closest_distance.items():
+                closest_distance[node] = min(
+                    distance, from_landmark.get(node, math.inf)
+                )
+        return landmarks
+
+    def compress(self) -> Maze[PositionType]:
+        """Contract corridors into single edges between junctions.
+
+        Cells with exactly two open neighbors (other than the start and
+        ends) are removed, and each corridor between junctions becomes one
+        edge of a CompactGraph, weighted by the moves and turns taken along
+        it. The skipped nodes of each corridor are remembered, so paths
+        found in the compressed maze are expanded back into paths of the
+        original maze. Costs must be positive, since corridors are only
+        ever walked straight through. A compressed maze is returned as is.
+        """
+        if self._compressed:
+            return self
+        oriented = self._oriented_nodes
+
+        def position(node: MazeNode) -> Position:
+            if oriented:
+                return cast(OrientedPosition, node)[0]
+            return cast(Position, node)
+
+        # Corridors are followed over the encoded states of the search
+        # space, and only the nodes kept in the compressed maze are decoded.
+        search_space: SearchSpace[PositionType, Any] = (
+            self._graph._search_space()
+        )
+        successors, encode, decode = search_space
+        cell = {encode(node): position(node) for node in self._graph.nodes}
+        adjacency = {state: list(successors(state)) for state in cell}
+        neighbor_cells: defaultdict[Position, set[Position]] = (
+            defaultdict(set)
+        )
+        cell_states: defaultdict[Position, list[Any]] = defaultdict(list)
+        for state, adjacent_states in adjacency.items():
+            cell_states[cell[state]].append(state)
+            for neighbor, _ in adjacent_states:
+                if cell[neighbor] != cell[state]:
+                    neighbor_cells[cell[state]].add(cell[neighbor])
+        junctions = {
+            junction
+            for junction in cell_states
+            if len(neighbor_cells[junction]) != 2
         }
+        junctions.add(position(self._start))
+        junctions.update(map(position, self._ends))
+
+        def leave_cell(state, exit_cell):
+            # The cheapest way out of a corridor cell towards exit_cell,
+            # which for oriented mazes may begin with turns.
+            counter = itertools.count()
+            heap = [(0, next(counter), state, ())]
+            settled = set()
+            while heap:
+                cost, _, state, turns = heapq.heappop(heap)
+                if state in settled:
+                    continue
+                settled.add(state)
+                for neighbor, weight in adjacency[state]:
+                    if cell[neighbor] == exit_cell:
+                        return (*turns, state), neighbor, cost + weight
+                    if cell[neighbor] == cell[state]:
+                        heapq.heappush(heap, (
+                            cost + weight, next(counter), neighbor,
+                            (*turns, state)
+                        ))
+            raise ValueError(f'Cannot leave {cell[state]} for {exit_cell}.')
 
-    def to_graph(self) -> DiGraph[PositionType]:
+        def follow_corridor(source, state, cost):
+            via = []
+            previous_cell = cell[source]
+            while cell[state] not in junctions:
+                exit_cell, = neighbor_cells[cell[state]] - {previous_cell}
+                previous_cell = cell[state]
+                skipped_states, state, step_cost = leave_cell(state, exit_cell)
+                via.extend(skipped_states)
+                cost += step_cost
+            return state, cost, tuple(via)
+
+        # A walk starts with one edge out of a junction and follows the
+        # corridor to the next junction. Equally cheap parallel corridors
+        # would collapse into one edge, so all but one of them are split by
+        # making their first cell a junction. Only the walks through or out
+        # of those new junctions are then followed again, until no ties
+        # remain.
+        walks: dict[tuple[Any, Any, float], tuple[Any, float, tuple]] = {}
+        walks_between: defaultdict[tuple[Any, Any], set[tuple]] = (
+            defaultdict(set)
+        )
+        # Indexed by cell only once a tie is found, as most mazes have none.
+        walks_through: defaultdict[Position, list[tuple]] | None = None
+        pending = [
+            (source, neighbor, weight)
+            for junction in junctions
+            for source in cell_states[junction]
+            for neighbor, weight in adjacency[source]
+        ]
+        while pending:
+            tied_pairs = set()
+            for walk in pending:
+                source, neighbor, weight = walk
+                if walk in walks:
+                    walks_between[source, walks[walk][0]].discard(walk)
+                target, cost, via = follow_corridor(source, neighbor, weight)
+                walks[walk] = target, cost, via
+                if walks_through is not None:
+                    for state in via:
+                        walks_through[cell[state]].append(walk)
+                if target != source:
+                    parallel_walks = walks_between[source, target]
+                    parallel_walks.add(walk)
+                    if len(parallel_walks) > 1:
+                        tied_pairs.add((source, target))
+
+            new_junctions = set()
+            for pair in tied_pairs:
+                tied_walks = sorted(
+                    walks_between[pair],
+                    key=lambda walk: (walks[walk][1], len(walks[walk][2]))
+                )
+                cheapest_cost = walks[tied_walks[0]][1]
+                for walk in tied_walks[1:]:
+                    _, cost, via = walks[walk]
+                    if cost > cheapest_cost:
+                        break
+                    new_junctions.add(cell[via[0]])
+            if not new_junctions:
+                break
+            junctions.update(new_junctions)
+            if walks_through is None:
+                walks_through = defaultdict(list)
+                for walk, (_, _, via) in walks.items():
+                    for state in via:
+                        walks_through[cell[state]].append(walk)
+            pending = list(dict.fromkeys(itertools.chain(
+                (
+                    walk
+                    for junction in new_junctions
+                    for walk in walks_through.pop(junction, ())
+                    if any(cell[state] == junction for state in walks[walk][2])
+                ),
+                (
+                    (source, neighbor, weight)
+                    for junction in new_junctions
+                    for source in cell_states[junction]
+                    for neighbor, weight in adjacency[source]
+                )
+            )))
+
+        corridors: dict[tuple[Any, Any], tuple[float, tuple]] = {}
+        for (source, _, _), (target, cost, via) in walks.items():
+            if target != source and cost < corridors.get(
+                (source, target), (math.inf, ())
+            )[0]:
+                corridors[source, target] = cost, via
+        junction_nodes = {
+            state: decode(state)
+            for junction in junctions
+            for state in cell_states[junction]
+        }
+        compressed_maze = Maze(
+            CompactGraph.from_arrays(
+                [junction_nodes[source] for source, _ in corridors],
+                [junction_nodes[target] for _, target in corridors],
+                [cost for cost, _ in corridors.values()],
+                nodes=junction_nodes.values()
+            ),
+            self._start,
+            tuple(self._ends),
+            self._oriented_nodes,
+            self._cost_move_forward,
+            self._cost_rotate
+        )
+        compressed_maze._compressed = True
+        compressed_maze._corridor_states = {
+            (junction_nodes[source], junction_nodes[target]): via
+            for (source, target), (_, via) in corridors.items()
+        }
+        compressed_maze._decode_corridor_state = decode
+        return compressed_maze
+
+    def _expand_path(self, path: Sequence[PositionType]) -> list[PositionType]:
+        if not self._compressed or not path:
+            return list(path)
+        expanded_path = [path[0]]
+        for source, target in itertools.pairwise(path):
+            expanded_path.extend(map(
+                self._decode_corridor_state,
+                self._corridor_states[source, target]
+            ))
+            expanded_path.append(target)
+        return expanded_path
+
+    def to_graph(self) -> (
+            DiGraph[PositionType]
+            | CompactGraph[PositionType]
+            | ImplicitMazeGraph[PositionType]
+    ):
+        if isinstance(self._graph, (CompactGraph, ImplicitMazeGraph)):
+            # These graphs are immutable, so there is nothing to protect.
+            return self._graph
         return deepcopy(self._graph)
 
     @classmethod
     def from_map(
             cls,
-            maze_map: str,
+            maze_map: str | bytes | bytearray | memoryview | mmap.mmap,
             oriented_nodes: bool = False,
             cost_move_forward: float = 1,
             cost_rotate: float = 1000,
-            start_direction: Direction | None = None
+            start_direction: Direction | None = None,
+            cache_directory: str | os.PathLike | None = None,
+            implicit: bool = False
     ) -> Maze:
-        parsed_passable_position = {
-            (row, column): parsed_entry
-            for row, map_row in enumerate(maze_map.split('\n'))
-            for column, map_entry in enumerate(map_row)
-            if (parsed_entry := Component(map_entry)) is not Component.WALL
-        }
+        grid, row_length = _frame_map(maze_map)
+        passable = grid.translate(_PASSABILITY)
+        if (invalid_index := passable.find(2)) != -1:
+            Component(chr(grid[invalid_index]))
         if oriented_nodes and start_direction is None:
             raise ValueError(
                 'Requested a maze with orientation-tracking (oriented_nodes '
@@ -106,54 +581,82 @@ class Maze[PositionType: Position | OrientedPosition]:
                 'start_direction.'
             )
         create_node = partial(Maze.create_node, oriented=oriented_nodes)
-        create_edge = partial(Maze.create_edge, oriented=oriented_nodes)
 
-        edges: deque[tuple[PositionType, PositionType]] = deque()
+        def position(index: int) -> Position:
+            row, column = divmod(index, row_length)
+            return row - 1, column
+
         start: PositionType | None = None
+        if grid.count(Component.START.encode()) > 1:
+            raise NotImplementedError(
+                'Multiple starting locations are not supported.'
+            )
+        if (start_index := grid.find(Component.START.encode())) != -1:
+            start = create_node(  # type: ignore
+                position(start_index), start_direction
+            )
         ends: deque[PositionType] = deque()
-        for position, entry in parsed_passable_position.items():
-            if entry is Component.START:
-                if start is not None:
-                    raise NotImplementedError(
-                        'Multiple starting locations are not supported.'
-                    )
-                start = create_node(position, start_direction)  # type: ignore
-            for direction in Direction:
-                if entry is Component.END:
-                    ends.append(create_node(position, direction))  # type: ignore
-                if oriented_nodes:
-                    edges.append(
-                        create_edge(  # type: ignore
-                            position, direction,
-                            position, direction.rotate_clockwise(),
-                            cost_rotate, oriented=oriented_nodes
-                        )
-                    )
-                    edges.append(
-                        create_edge(  # type: ignore
-                            position, direction,
-                            position, direction.rotate_counterclockwise(),
-                            cost_rotate, oriented=oriented_nodes
-                        )
-                    )
-                neighbor = tuple(Vector(*position) + direction.grid_vector)
-                if neighbor in parsed_passable_position:
-                    edges.append(
-                        create_edge(  # type: ignore
-                            position, direction,
-                            neighbor, direction,
-                            cost_move_forward, oriented=oriented_nodes
-                        )
-                    )
+        end_index = grid.find(Component.END.encode())
+        while end_index != -1:
+            ends.extend(
+                create_node(position(end_index), direction)  # type: ignore
+                for direction in Direction
+            )
+            end_index = grid.find(Component.END.encode(), end_index + 1)
 
-        maze_graph = DiGraph(*edges)
+        build_graph = partial(
+            _build_maze_graph,
+            passable,
+            row_length,
+            oriented_nodes,
+            cost_move_forward,
+            cost_rotate
+        )
+        maze_graph: CompactGraph[MazeNode] | ImplicitMazeGraph[MazeNode]
+        if implicit:
+            maze_graph = ImplicitMazeGraph(
+                passable,
+                row_length,
+                oriented_nodes,
+                cost_move_forward,
+                cost_rotate
+            )
+        elif cache_directory is None:
+            maze_graph = build_graph()
+        else:
+            digest = hashlib.sha256(grid)
+            digest.update(repr((
+                oriented_nodes, cost_move_forward, cost_rotate
+            )).encode())
+            map_hash = digest.hexdigest()
+            cache_path = pathlib.Path(cache_directory) / f'{map_hash}.graph'
+            try:
+                maze_graph = CompactGraph.load(
+                    cache_path, content_hash=map_hash
+                )
+            except (OSError, ValueError):
+                maze_graph = build_graph()
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                maze_graph.save(cache_path, content_hash=map_hash)
         return cls(
-            graph=maze_graph,
+            graph=maze_graph,  # type: ignore
             start=start,  # type: ignore
             ends=ends,
-            oriented=oriented_nodes
+            oriented=oriented_nodes,
+            cost_move_forward=cost_move_forward,
+            cost_rotate=cost_rotate
         )
 
+    @classmethod
+    def from_file(cls, path: str | os.PathLike, **kwargs) -> Maze:
+        with (
+                open(path, 'rb') as map_file,
+                mmap.mmap(
+                    map_file.fileno(), 0, access=mmap.ACCESS_READ
+                ) as mapped_map
+        ):
+            return cls.from_map(mapped_map, **kwargs)
+
     @staticmethod
     def create_node(
             position: Position,
@@ -176,4 +679,361 @@ class Maze[PositionType: Position | OrientedPosition]:
         if oriented:
             return (position1, direction1), (position2, direction2), weight
         else:
-            return position1, position2, weight
\ No newline at end of file
+            return position1, position2, weight
+
+
+class ImplicitMazeGraph[N: Position | OrientedPosition]:
+    """A maze graph whose edges are computed from the map during searches.
+
+    Nodes are positions, or ``(position, Direction)`` states for oriented
+    mazes, encoded as integers over the passability mask of ``_frame_map``.
+    Successors (moving forward, and turning for oriented mazes) are
+    generated on the fly rather than stored, so memory use is proportional
+    to the map rather than to the number of edges.
+    """
+    def __init__(
+            self,
+            passable: bytes,
+            row_length: int,
+            oriented: bool = False,
+            cost_move_forward: float = 1,
+            cost_rotate: float = 1000
+    ):
+        self._passable = passable
+        self._row_length = row_length
+        self._oriented = oriented
+        self._cost_move_forward = cost_move_forward
+        self._cost_rotate = cost_rotate
+        self._directions = list(Direction)
+        self._heading = {
+            direction: heading
+            for heading, direction in enumerate(self._directions)
+        }
+        self._steps = [
+            row_step * row_length + column_step
+            for row_step, column_step in (
+                direction.grid_offsets for direction in self._directions
+            )
+        ]
+        self._turns = [
+            (
+                self._heading[direction.rotate_clockwise()],
+                self._heading[direction.rotate_counterclockwise()]
+            )
+            for direction in self._directions
+        ]
+
+    @property
+    def is_directed(self) -> bool:
+        return True
+
+    @cached_property
+    def nodes(self) -> MazeNodeView[N]:
+        return MazeNodeView(self)
+
+    def out_nodes(self, node: N) -> frozenset[N]:
+        successors, _, _ = self._search_space()
+        return frozenset(
+            self._decode(state) for state, _ in successors(self._encode(node))
+        )
+
+    def in_nodes(self, node: N) -> frozenset[N]:
+        predecessors, _, _ = self._search_space(reverse=True)
+        return frozenset(
+            self._decode(state)
+            for state, _ in predecessors(self._encode(node))
+        )
+
+    def all_shortest_paths(
+            self,
+            source: N,
+            target: N | Sequence[N] | None = None,
+            with_distance: bool = True,
+            edge_weight = 'weight'
+    ):
+        if target is None:
+            return graph_theory.all_shortest_paths(
+                self, source, with_distance, edge_weight
+            )
+        return graph_theory.all_shortest_paths_to_targets(
+            self, source, self._as_targets(target), with_distance, edge_weight
+        )
+
+    def shortest_path(
+            self,
+            source: N,
+            target: N,
+            heuristic: Callable[[N, N], float],
+            edge_weight = 'weight',
+            statistics: SearchStatistics | None = None
+    ) -> tuple[Sequence[N], float]:
+        return graph_theory.shortest_path(
+            self, source, target, heuristic, edge_weight, statistics
+        )
+
+    def shortest_path_to_any(
+            self,
+            source: N,
+            targets: Iterable[N],
+            heuristic: Callable[[N, N], float],
+            edge_weight = 'weight',
+            statistics: SearchStatistics | None = None
+    ) -> tuple[Sequence[N], float]:
+        return graph_theory.shortest_path_to_any(
+            self, source, targets, heuristic, edge_weight, statistics
+        )
+
+    def bidirectional_shortest_path(
+            self, source: N, target: N, edge_weight = 'weight'
+    ) -> tuple[Sequence[N], float]:
+        return graph_theory.bidirectional_shortest_path(
+            self, source, target, edge_weight
+        )
+
+    def shortest_path_dag(
+            self,
+            source: N,
+            targets: N | Iterable[N],
+            edge_weight = 'weight'
+    ) -> ShortestPathDAG[N]:
+        return graph_theory.shortest_path_dag(
+            self, source, self._as_targets(targets), edge_weight
+        )
+
+    def distances_from(
+            self, source: N, edge_weight = 'weight'
+    ) -> ShortestPathTree[N]:
+        return graph_theory.distances_from(self, source, edge_weight)
+
+    def distances_to(
+            self, target: N, edge_weight = 'weight'
+    ) -> ShortestPathTree[N]:
+        return graph_theory.distances_to(self, target, edge_weight)
+
+    def _as_targets(
+            self, targets: N | Iterable[N]
+    ) -> list[N]:
+        if targets in self.nodes:
+            return [cast(N, targets)]
+        return list(cast(Iterable[N], targets))
+
+    def _search_space(
+            self, edge_weight = 'weight', reverse: bool = False
+    ) -> SearchSpace[N, int]:
+        if isinstance(edge_weight, str):
+            if edge_weight != 'weight':
+                raise KeyError(edge_weight)
+            cost_move_forward = self._cost_move_forward
+            cost_rotate = self._cost_rotate
+        else:
+            cost_move_forward = cost_rotate = edge_weight
+        passable = self._passable
+        steps = [-step for step in self._steps] if reverse else self._steps
+
+        if not self._oriented:
+            def cell_successors(cell: int) -> Iterable[tuple[int, float]]:
+                return [
+                    (cell + step, cost_move_forward)
+                    for step in steps
+                    if passable[cell + step]
+                ]
+            return cell_successors, self._encode, self._decode
+
+        turns = self._turns
+
+        # Turning is its own reverse, so only moves depend on the direction
+        # of the search.
+        def state_successors(state: int) -> Iterable[tuple[int, float]]:
+            heading = state & 3
+            unturned_state = state - heading
+            step = steps[heading]
+            adjacent_states = [
+                (unturned_state + turn, cost_rotate)
+                for turn in turns[heading]
+            ]
+            if passable[(state >> 2) + step]:
+                adjacent_states.append((state + 4 * step, cost_move_forward))
+            return adjacent_states
+        return state_successors, self._encode, self._decode
+
+    def _has_integer_weights(self, edge_weight: str) -> bool:
+        return all(
+            type(cost) is int and cost >= 0
+            for cost in (self._cost_move_forward, self._cost_rotate)
+        )
+
+    def _encode(self, node: N) -> int:
+        # Cells are indices into the passability mask; oriented states pack
+        # a cell and a heading into 4 * cell + heading.
+        if self._oriented:
+            position, direction = cast(OrientedPosition, node)
+            heading = self._heading[direction]
+        else:
+            position = cast(Position, node)
+        row, column = position
+        cell = (row + 1) * self._row_length + column
+        if not (
+                0 <= column < self._row_length - 1
+                and 0 <= cell < len(self._passable)
+                and self._passable[cell]
+        ):
+            raise KeyError(node)
+        return 4 * cell + heading if self._oriented else cell
+
+    def _decode(self, state: int) -> N:
+        cell = state >> 2 if self._oriented else state
+        row, column = divmod(cell, self._row_length)
+        if self._oriented:
+            return cast(N, ((row - 1, column), self._directions[state & 3]))
+        return cast(N, (row - 1, column))
+
+
+class MazeNodeView[N: Position | OrientedPosition](Set[N]):
+    def __init__(self, graph: ImplicitMazeGraph[N]):
+        self._graph = graph
+
+    def __contains__(self, item):
+        try:
+            self._graph._encode(item)
+        except (KeyError, TypeError, ValueError):
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[N]:
+        cells = itertools.compress(itertools.count(), self._graph._passable)
+        if self._graph._oriented:
+            return map(self._graph._decode, (
+                4 * cell + heading for cell in cells for heading in range(4)
+            ))
+        return map(self._graph._decode, cells)
+
+    def __len__(self):
+        passable = self._graph._passable
+        cell_count = len(passable) - passable.count(0)
+        return 4 * cell_count if self._graph._oriented else cell_count
+
+
+def _identity[T](value: T) -> T:
+    return value
+
+
+def _minimum_turns(
+        heading: Direction, row_offset: int, column_offset: int
+) -> int:
+    # Quarter turns needed before every move towards an offset can be made:
+    # none to carry straight on, one to turn aside, and two to head back.
+    row_step, column_step = heading.value.real, heading.value.imag
+    ahead = row_step * row_offset + column_step * column_offset
+    aside = column_step * row_offset - row_step * column_offset
+    if ahead < 0:
+        return 2
+    return 0 if aside == 0 else 1
+
+
+def _frame_map(
+        maze_map: str | bytes | bytearray | memoryview | mmap.mmap
+) -> tuple[bytes, int]:
+    # Lays the map out as equal-length rows, each ending in a newline, with
+    # a row of newlines above and below. Newlines act as walls, so every
+    # neighbor of a map cell is a valid index, and cell (row, column) sits
+    # at index (row + 1) * row_length + column.
+    if isinstance(maze_map, str):
+        maze_map = maze_map.encode()
+    text = bytes(maze_map)
+    if not text.endswith(b'\n'):
+        text += b'\n'
+    row_length = text.find(b'\n') + 1
+    row_count = len(text) // row_length
+    if (
+            len(text) != row_count * row_length
+            or text[row_length - 1::row_length] != b'\n' * row_count
+    ):
+        rows = text.split(b'\n')[:-1]
+        width = max(map(len, rows))
+        row_length = width + 1
+        text = b''.join(row.ljust(width, b'#') + b'\n' for row in rows)
+    frame = b'\n' * row_length
+    return frame + text + frame, row_length
+
+
+def _build_maze_graph(
+        passable: bytes,
+        row_length: int,
+        oriented: bool,
+        cost_move_forward: float,
+        cost_rotate: float
+) -> CompactGraph[MazeNode]:
+    # Writes the CSR arrays of the maze graph directly from the passability
+    # mask of _frame_map, without building an edge list first.
+    cells = list(itertools.compress(range(len(passable)), passable))
+    rank = array('q', bytes(8 * len(passable)))
+    for cell_rank, cell in enumerate(cells):
+        rank[cell] = cell_rank
+    positions = [
+        (cell // row_length - 1, cell % row_length) for cell in cells
+    ]
+    directions = list(Direction)
+    steps = [
+        row_step * row_length + column_step
+        for row_step, column_step in (
+            direction.grid_offsets for direction in directions
+        )
+    ]
+    typecode = (
+        'q' if type(cost_move_forward) is type(cost_rotate) is int else 'd'
+    )
+
+    if not oriented:
+        offsets, adjacent = array('q', [0]), array('q')
+        for cell in cells:
+            for step in steps:
+                if passable[cell + step]:
+                    adjacent.append(rank[cell + step])
+            offsets.append(len(adjacent))
+        weights = array(typecode, [cost_move_forward]) * len(adjacent)
+        # Moves are reversible, so the graph is its own reverse.
+        adjacency = (offsets, adjacent, weights)
+        return CompactGraph.from_csr(positions, adjacency, adjacency)
+
+    clockwise = [
+        directions.index(direction.rotate_clockwise())
+        for direction in directions
+    ]
+    counterclockwise = [
+        directions.index(direction.rotate_counterclockwise())
+        for direction in directions
+    ]
+    out_offsets, out_adjacent = array('q', [0]), array('q')
+    out_weights: array[Any] = array(typecode)
+    in_offsets, in_adjacent = array('q', [0]), array('q')
+    in_weights: array[Any] = array(typecode)
+    rotations: array[Any] = array(typecode, [cost_rotate, cost_rotate])
+    for cell_rank, cell in enumerate(cells):
+        node = 4 * cell_rank
+        for heading, step in enumerate(steps):
+            # Turning either way is its own reverse, so rotations appear
+            # identically in both adjacency structures.
+            turns = (
+                node + clockwise[heading], node + counterclockwise[heading]
+            )
+            out_adjacent.extend(turns)
+            out_weights.extend(rotations)
+            in_adjacent.extend(turns)
+            in_weights.extend(rotations)
+            if passable[cell + step]:
+                out_adjacent.append(4 * rank[cell + step] + heading)
+                out_weights.append(cost_move_forward)
+            if passable[cell - step]:
+                in_adjacent.append(4 * rank[cell - step] + heading)
+                in_weights.append(cost_move_forward)
+            out_offsets.append(len(out_adjacent))
+            in_offsets.append(len(in_adjacent))
+    return CompactGraph.from_csr(
+        [
+            (position, direction)
+            for position in positions
+            for direction in directions
+        ],
+        (out_offsets, out_adjacent, out_weights),
+        (in_offsets, in_adjacent, in_weights)
+    )
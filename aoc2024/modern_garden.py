@@ -3,6 +3,7 @@ from __future__ import annotations
 import itertools
 import math
 
+from aoc2024.collections import DisjointSet
 from aoc2024.pathfinding import Direction
 from aoc2024.vector import Vector
 
@@ -13,21 +14,19 @@ type Region = frozenset[Plot]
 def garden_regions(garden: dict[Plot, str]) -> set[Region]:
     *_, final_indices = garden
     garden_shape = (final_indices[0] + 1, final_indices[1] + 1)
-    region = {
-        point: {point}
-        for point in itertools.product(*map(range, garden_shape))
-    }
+    columns = garden_shape[1]
+    regions: DisjointSet[int] = DisjointSet(garden_shape[0] * columns)
     for point in itertools.product(*map(range, garden_shape)):
-        neighbors_in_region = [
-            neighbor
-            for neighbor in _neighbors(point, garden_shape, ('up', 'left'))
-            if garden[point] == garden[neighbor]  # type: ignore
-        ]
-        for neighbor in neighbors_in_region:
-            region[point] |= region[neighbor]
-        for regionmate in region[point] - {point}:
-            region[regionmate] = region[point]
-    return set(map(frozenset, region.values()))  # type: ignore
+        for neighbor in _neighbors(point, garden_shape, ('up', 'left')):
+            if garden[point] == garden[neighbor]:  # type: ignore
+                regions.union(
+                    point[0] * columns + point[1],
+                    neighbor[0] * columns + neighbor[1]
+                )
+    return {
+        frozenset(divmod(plot_index, columns) for plot_index in region)
+        for region in regions.groups()
+    }
 
 
 def area(region: Region) -> int:
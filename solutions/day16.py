@@ -4,29 +4,23 @@ from aoc2024.pathfinding import Direction
 
 
 def solve_part_one():
-    return min(
-        score
-        for _, score in Maze.from_map(
-            '\n'.join(utilities.input_lines(year=2024, day=16)),
-            oriented_nodes=True,
-            start_direction=Direction.RIGHT
-        ).find_all_cheapest_paths().values()
-    )
+    return Maze.from_map(
+        '\n'.join(utilities.input_lines(year=2024, day=16)),
+        oriented_nodes=True,
+        start_direction=Direction.RIGHT,
+        implicit=True
+    ).find_cheapest_paths_dag().shortest_distance
 
 
 def solve_part_two():
     best_paths = Maze.from_map(
         '\n'.join(utilities.input_lines(year=2024, day=16)),
         oriented_nodes=True,
-        start_direction=Direction.RIGHT
-    ).find_all_cheapest_paths().values()
-    best_score = min(score for _, score in best_paths)
+        start_direction=Direction.RIGHT,
+        implicit=True
+    ).find_cheapest_paths_dag()
     best_path_positions = {
-        position
-        for paths, score in best_paths
-        for path in paths
-        for position, _ in path
-        if score == best_score
+        position for position, _ in best_paths.nodes_on_paths()
     }
     return len(best_path_positions)
 
@@ -1,7 +1,5 @@
-from tqdm import tqdm
-
 from aoc2024 import utilities
-from aoc2024.graph_theory import grid2d
+from aoc2024.graph_theory import first_disconnecting_removal, grid2d
 
 
 def solve_part_one():
@@ -21,21 +19,16 @@ def solve_part_one():
 def solve_part_two():
     pushed_bytes = list(utilities.input_lines(year=2024, day=18))
 
-    memory_space = grid2d(71, 71)
-    for pushed_byte in pushed_bytes[:1024]:
-        grid_node = tuple(map(int, pushed_byte.split(',')))[::-1]
-        memory_space.remove_node(grid_node)
-
-    for pushed_byte in tqdm(pushed_bytes[1024:]):
-        grid_node = tuple(map(int, pushed_byte.split(',')))[::-1]
-        memory_space.remove_node(grid_node)
-        try:
-            memory_space.shortest_path(
-                source=(0, 0), target=(70, 70), heuristic=taxicab,
-                edge_weight=1
-            )
-        except ValueError:
-            return pushed_byte
+    index, _ = first_disconnecting_removal(
+        grid2d(71, 71, implicit=True),
+        source=(0, 0),
+        target=(70, 70),
+        removals=[
+            tuple(map(int, pushed_byte.split(',')))[::-1]
+            for pushed_byte in pushed_bytes
+        ]
+    )
+    return pushed_bytes[index]
 
 
 def taxicab(node1, node2):
@@ -1,5 +1,3 @@
-import itertools
-
 from aoc2024 import utilities
 from aoc2024.graph_theory import UndirectedGraph
 
@@ -8,35 +6,13 @@ def solve_part_one():
     lan = UndirectedGraph(*(
         line.split('-') for line in utilities.input_lines(year=2024, day=23)
     ))
-    lan_maximal_cliques = lan.cliques()
-
-    chief_historian_pc_candidates = {
-        pc for pc in lan.nodes if pc.startswith('t')
-    }
-    possible_lan_parties = [
-        clique
-        for clique in lan_maximal_cliques
-        if len(clique) >= 3 and clique & chief_historian_pc_candidates
-    ]
-
-    return len({
-        frozenset((possible_chief, *others))
-        for possible_chief in chief_historian_pc_candidates
-        for possible_lan_party in possible_lan_parties
-        for others in itertools.combinations(
-            possible_lan_party - {possible_chief}, 2
-        )
-        if possible_chief in possible_lan_party
-    })
+    return lan.count_k_cliques(3, filter=lambda pc: pc.startswith('t'))
 
 
 def solve_part_two():
-    lan_party = max(
-        UndirectedGraph(*(
-            line.split('-') for line in utilities.input_lines(year=2024, day=23)
-        )).cliques(),
-        key=len
-    )
+    lan_party = UndirectedGraph(*(
+        line.split('-') for line in utilities.input_lines(year=2024, day=23)
+    )).max_clique()
     return ','.join(sorted(lan_party))
 
 
@@ -0,0 +1,172 @@
+import heapq
+import itertools
+import os
+import random
+import time
+
+import hypothesis as hyp
+import hypothesis.strategies as st
+import pytest
+
+from aoc2024.collections import BucketQueue, DisjointSet, PriorityQueue
+
+
+@hyp.given(prioritized_elements=st.lists(
+    st.tuples(st.integers(), st.integers(min_value=-100, max_value=100))
+))
+def test_priority_queue_pops_elements_in_priority_order(prioritized_elements):
+    queue = PriorityQueue(prioritized_elements)
+    expected_priority = dict(prioritized_elements)
+
+    assert len(queue) == len(expected_priority)
+    popped = [queue.pop() for _ in range(len(queue))]
+    popped_priorities = [priority for _, priority in popped]
+    assert popped_priorities == sorted(popped_priorities)
+    assert dict(popped) == expected_priority
+    assert not queue
+
+
+def test_priority_queue_can_update_and_remove_elements():
+    queue = PriorityQueue([('a', 5), ('b', 3), ('c', 4)])
+
+    queue.add('a', 1)
+    queue.decrease_key('c', 2)
+    queue.remove('b')
+
+    assert len(queue) == 2 and 'b' not in queue
+    assert queue.peek() == ('a', 1)
+    assert [queue.pop(), queue.pop()] == [('a', 1), ('c', 2)]
+    with pytest.raises(KeyError):
+        queue.peek()
+    with pytest.raises(KeyError):
+        queue.pop()
+
+
+def test_priority_queue_decrease_key_rejects_increases_and_missing_elements():
+    queue = PriorityQueue([('a', 5)])
+
+    with pytest.raises(ValueError, match='Cannot decrease'):
+        queue.decrease_key('a', 6)
+    with pytest.raises(KeyError):
+        queue.decrease_key('b', 1)
+
+
+def test_priority_queue_is_empty_when_only_removed_elements_remain():
+    queue = PriorityQueue([('a', 1), ('b', 2)])
+
+    queue.add('a', 0)
+    queue.pop()
+    queue.remove('b')
+
+    assert not queue
+    with pytest.raises(KeyError):
+        queue.pop()
+
+
+def test_priority_queue_compacts_removed_entries():
+    queue = PriorityQueue()
+
+    for priority in range(10_000, 0, -1):
+        queue.add('a', priority)
+
+    assert len(queue) == 1
+    assert len(queue._heap) <= 2 * PriorityQueue._COMPACTION_THRESHOLD
+    assert queue.pop() == ('a', 1)
+
+
+@pytest.mark.skipif(
+    not os.environ.get('AOC2024_BENCHMARKS'),
+    reason='Timing benchmarks run only when AOC2024_BENCHMARKS is set.'
+)
+def test_priority_queue_micro_benchmark_against_bare_heapq():
+    random.seed(0)
+    prioritized_elements = [
+        (element, random.random()) for element in range(50_000)
+    ]
+
+    start = time.perf_counter()
+    counter = itertools.count()
+    heap: list[tuple[float, int, int]] = []
+    for element, priority in prioritized_elements:
+        heapq.heappush(heap, (priority, next(counter), element))
+    while heap:
+        heapq.heappop(heap)
+    bare_heapq_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    queue = PriorityQueue()
+    for element, priority in prioritized_elements:
+        queue.add(element, priority)
+    while queue:
+        queue.pop()
+    priority_queue_seconds = time.perf_counter() - start
+
+    assert priority_queue_seconds < 5 * bare_heapq_seconds
+
+
+def test_bucket_queue_pops_elements_in_priority_order():
+    random.seed(0)
+    prioritized_elements = [
+        (element, random.randrange(10)) for element in range(100)
+    ]
+    queue = BucketQueue(prioritized_elements)
+
+    popped_priorities = []
+    while queue:
+        _, priority = queue.pop()
+        popped_priorities.append(priority)
+
+    assert popped_priorities == sorted(
+        priority for _, priority in prioritized_elements
+    )
+
+
+def test_bucket_queue_re_adding_an_element_updates_its_priority():
+    queue = BucketQueue([('a', 5), ('b', 3), ('c', 4)])
+
+    queue.add('a', 1)
+    queue.add('b', 6)
+
+    assert len(queue) == 3
+    assert [queue.pop() for _ in range(3)] == [('a', 1), ('c', 4), ('b', 6)]
+    assert not queue
+
+
+@pytest.mark.parametrize('elements', (10, range(10)))
+def test_disjoint_set_merges_sets_and_tracks_sizes(elements):
+    disjoint_set = DisjointSet(elements)
+
+    assert disjoint_set.union(0, 1)
+    assert disjoint_set.union(2, 3)
+    assert disjoint_set.union(1, 3)
+    assert not disjoint_set.union(0, 2)
+    assert disjoint_set.union(7, 8)
+
+    assert disjoint_set.connected(0, 3) and not disjoint_set.connected(0, 7)
+    assert disjoint_set.size(2) == 4 and disjoint_set.size(9) == 1
+    assert disjoint_set.set_count == 6 and len(disjoint_set) == 10
+    assert sorted(map(sorted, disjoint_set.groups())) == [
+        [0, 1, 2, 3], [4], [5], [6], [7, 8], [9]
+    ]
+
+
+def test_disjoint_set_adds_unseen_elements_on_demand():
+    disjoint_set = DisjointSet('abc')
+
+    disjoint_set.union('a', 'z')
+
+    assert 'z' in disjoint_set and len(disjoint_set) == 4
+    assert disjoint_set.find('y') == 'y'
+    assert disjoint_set.set_count == 4
+    with pytest.raises(KeyError):
+        DisjointSet(3).add(3)
+
+
+def test_disjoint_set_handles_long_chains():
+    disjoint_set = DisjointSet(100_000)
+
+    for element in range(1, 100_000):
+        disjoint_set.union(element - 1, element)
+
+    assert disjoint_set.size(0) == 100_000
+    assert disjoint_set.groups() == [set(range(100_000))]
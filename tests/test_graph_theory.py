@@ -1,8 +1,14 @@
+import itertools
 import math
+from array import array
 
 import pytest
 
-from aoc2024.graph_theory import DiGraph, UndirectedGraph, grid2d
+from aoc2024.graph_theory import (
+    CompactGraph, CycleError, DiGraph, ImplicitGridGraph, SearchStatistics,
+    UndirectedGraph, first_disconnecting_removal, grid2d,
+    multi_source_shortest_paths
+)
 
 
 @pytest.fixture
@@ -237,6 +243,102 @@ class TestCommonProperties:
             assert set(G.edges) == remaining_edges
             assert set(G.nodes) == initial_nodes
 
+    def test_edge_count_is_maintained_through_mutations(self, graph_class):
+        G = graph_class((0, 1), (1, 2), (2, 0), (2, 3))
+        assert len(G.edges) == 4
+
+        G.add_edge((3, 4))
+        G.add_edge((3, 4))
+        G.add_edge((4, 3))
+        assert len(G.edges) == (6 if G.is_directed else 5)
+
+        G.remove_edge((0, 1))
+        assert len(G.edges) == (5 if G.is_directed else 4)
+
+        G.remove_node(3)
+        assert len(G.edges) == 2
+        assert len(G.edges) == len(list(G.edges))
+
+    def test_multi_source_shortest_paths_match_serial_searches(
+            self, graph_class
+    ):
+        G = graph_class(
+            (0, 1, 5), (1, 2, 3), (2, 3, 7), (3, 4, 5),
+            (0, 2, 7), (0, 4, 10), (10, 11, 1)
+        )
+        sources = [4, 0, 10, 2]
+
+        for edge_weight in ('weight', 1):
+            serial_distances = multi_source_shortest_paths(
+                G, sources, edge_weight=edge_weight, workers=1
+            )
+            parallel_distances = multi_source_shortest_paths(
+                G, sources, edge_weight=edge_weight, workers=2
+            )
+
+            assert parallel_distances == serial_distances
+            assert list(parallel_distances) == sources
+            for source in sources:
+                assert serial_distances[source] == {
+                    target: distance
+                    for target, (_, distance) in G.all_shortest_paths(
+                        source, edge_weight=edge_weight
+                    ).items()
+                    if distance < math.inf
+                }
+
+        assert multi_source_shortest_paths(
+            G, [0, 11], targets=[4, 10], workers=2
+        ) == {
+            0: {4: 10, 10: math.inf},
+            11: {4: math.inf, 10: 1 if not G.is_directed else math.inf}
+        }
+
+    def test_shortest_path_trees_answer_repeated_queries(self, graph_class):
+        G = graph_class(
+            (0, 1, 5), (1, 2, 3), (2, 3, 7), (3, 4, 5),
+            (0, 2, 7), (0, 4, 10), (10, 11, 1)
+        )
+
+        for H in (G, G.to_compact()):
+            from_zero = H.distances_from(0)
+            to_four = H.distances_to(4)
+
+            assert dict(from_zero) == {0: 0, 1: 5, 2: 7, 3: 14, 4: 10}
+            assert from_zero.path(3) == [0, 2, 3]
+            assert from_zero.distance(11) == math.inf
+            with pytest.raises(ValueError, match='Unable to find a path'):
+                from_zero.path(11)
+            assert to_four.distance(2) == 12
+            assert to_four.path(2) == [2, 3, 4]
+            assert to_four.towards_root and to_four.root == 4
+            for node in H.nodes:
+                assert to_four.distance(node) == (
+                    H.all_shortest_paths(node, 4)[1]
+                )
+        assert G.to_compact().distances_from(0).distance_array() == array(
+            'd', [0, 5, 7, 14, 10, math.inf, math.inf]
+        )
+        with pytest.raises(ValueError, match='compact and grid'):
+            G.distances_from(0).distance_array()
+
+    def test_connected_components_and_reachability(self, graph_class):
+        G = graph_class((0, 1), (1, 2), (3, 2), (4, 5), (6, 6))
+        G.add_node(7)
+        expected_components = [{0, 1, 2, 3}, {4, 5}, {6}, {7}]
+
+        for H in (G, G.to_compact()):
+            assert sorted(H.connected_components(), key=min) == (
+                expected_components
+            )
+            expected_reachable = {0, 1, 2} if G.is_directed else {0, 1, 2, 3}
+            assert H.reachable_from(0) == expected_reachable
+            reachable_bits = H.reachable_from(0, bitset=True)
+            assert {
+                node for node, index in H.node_index().items()
+                if reachable_bits >> index & 1
+            } == expected_reachable
+
     def test_can_compute_all_shortest_paths_from_a_source_node(self, graph_class):
         G = graph_class(
             (0, 1, 5), (1, 2, 3), (2, 3, 7), (3, 4, 5),
@@ -287,6 +389,192 @@ class TestCommonProperties:
             G.shortest_path(0, 10, lambda p1, p2: 0)
 
 
+    def test_shortest_path_to_any_stops_at_the_nearest_target(
+            self, graph_class
+    ):
+        G = graph_class(
+            (0, 1, 5), (1, 2, 3), (2, 3, 7), (3, 4, 5),
+            (0, 2, 7), (0, 4, 10),
+            (10, 11, 1)
+        )
+
+        assert G.shortest_path_to_any(0, (3, 4), lambda p1, p2: 0) == (
+            [0, 4], 10
+        )
+        assert G.shortest_path_to_any(0, [3, 11], lambda p1, p2: 0) == (
+            [0, 2, 3], 14
+        )
+        with pytest.raises(ValueError, match='Unable to find a path'):
+            G.shortest_path_to_any(0, (10, 11), lambda p1, p2: 0)
+
+    def test_shortest_path_records_search_statistics(self, graph_class):
+        G = graph_class(
+            (0, 1, 5), (1, 2, 3), (2, 3, 7), (3, 4, 5),
+            (0, 2, 7), (0, 4, 10),
+            (10, 11, 1)
+        )
+        statistics = SearchStatistics()
+
+        G.shortest_path(0, 4, lambda p1, p2: 0, statistics=statistics)
+        assert statistics == SearchStatistics(
+            nodes_expanded=4, nodes_reached=5
+        )
+        G.shortest_path(0, 4, lambda p1, p2: 0, statistics=statistics)
+        assert statistics == SearchStatistics(
+            nodes_expanded=8, nodes_reached=10
+        )
+
+    def test_bidirectional_search_matches_dijkstra(self, graph_class):
+        G = graph_class(
+            (0, 1, 5), (1, 2, 3), (2, 3, 7), (3, 4, 5),
+            (0, 2, 7), (0, 4, 10),
+            (10, 11, 1)
+        )
+
+        for target in range(5):
+            assert G.bidirectional_shortest_path(0, target) == (
+                G.shortest_path(0, target, lambda p1, p2: 0)
+            )
+        with pytest.raises(ValueError, match='Unable to find a path'):
+            G.bidirectional_shortest_path(0, 10)
+
+    def test_search_engines_agree_on_integer_and_constant_weights(
+            self, graph_class
+    ):
+        edges = [
+            (0, 1, 1), (1, 2, 1000), (2, 3, 1), (0, 4, 1000), (4, 3, 1),
+            (1, 4, 2), (3, 5, 2), (5, 6, 1), (2, 6, 1001)
+        ]
+        integer_weights_G = graph_class(*edges)
+        float_weights_G = graph_class(
+            *((source, target, float(weight)) for source, target, weight in edges)
+        )
+        unit_weights_G = graph_class(
+            *((source, target, 1.0) for source, target, _ in edges)
+        )
+
+        for G in (integer_weights_G, integer_weights_G.to_compact()):
+            assert G.all_shortest_paths(0) == float_weights_G.all_shortest_paths(0)
+            assert (
+                G.shortest_path(0, 6, lambda p1, p2: 0)
+                == float_weights_G.shortest_path(0, 6, lambda p1, p2: 0)
+            )
+            assert (
+                G.all_shortest_paths(0, edge_weight=1.0)
+                == unit_weights_G.all_shortest_paths(0)
+            )
+
+    def test_all_pairs_distances_match_single_source_searches(
+            self, graph_class
+    ):
+        sparse_G = graph_class(
+            (0, 1, 5), (1, 2, 3), (2, 3, 7), (3, 4, 5),
+            (0, 2, 7), (0, 4, 10),
+            (10, 11, 1)
+        )
+        node_pairs = (
+            itertools.permutations if graph_class is DiGraph
+            else itertools.combinations
+        )(range(8), 2)
+        dense_G = graph_class(*(
+            (source, target, (3 * source + target) % 7 + 1)
+            for source, target in node_pairs
+        ))
+
+        for G in (sparse_G, dense_G, dense_G.to_compact()):
+            distances = G.all_pairs_distances()
+            assert len(distances) == len(G.nodes) ** 2
+            for source, target in itertools.product(G.nodes, repeat=2):
+                assert distances[source, target] == (
+                    G.all_shortest_paths(source, target)[1]
+                )
+
+    def test_all_pairs_distances_can_be_cached_on_disk(
+            self, graph_class, tmp_path
+    ):
+        G = graph_class((0, 1, 5), (1, 2, 3), (0, 2, 9))
+        distances = G.all_pairs_distances(cache_directory=tmp_path)
+        cache_files = list(tmp_path.glob('*.npy'))
+        assert len(cache_files) == 1
+
+        loaded_distances = graph_class(
+            (0, 1, 5), (1, 2, 3), (0, 2, 9)
+        ).all_pairs_distances(cache_directory=tmp_path)
+        assert list(loaded_distances.distances) == list(distances.distances)
+        assert loaded_distances.row(0)[2] == 8
+
+        graph_class((0, 1, 5), (1, 2, 3), (0, 2, 7)).all_pairs_distances(
+            cache_directory=tmp_path
+        )
+        assert len(list(tmp_path.glob('*.npy'))) == 2
+
+    @pytest.mark.parametrize('kept_bytes', [0, 9, 30, -3, -8])
+    def test_corrupt_distance_caches_are_recomputed(
+            self, graph_class, tmp_path, kept_bytes
+    ):
+        G = graph_class((0, 1, 5), (1, 2, 3), (0, 2, 9))
+        distances = G.all_pairs_distances(cache_directory=tmp_path)
+        cache_file, = tmp_path.glob('*.npy')
+        cache_contents = cache_file.read_bytes()
+        cache_file.write_bytes(cache_contents[:kept_bytes])
+
+        recomputed_distances = graph_class(
+            (0, 1, 5), (1, 2, 3), (0, 2, 9)
+        ).all_pairs_distances(cache_directory=tmp_path)
+        assert list(recomputed_distances.distances) == list(
+            distances.distances
+        )
+        assert cache_file.read_bytes() == cache_contents
+
+    def test_removing_a_node_off_a_cached_shortest_path_keeps_the_result(
+            self, graph_class
+    ):
+        G = graph_class(
+            (0, 1, 5), (1, 2, 3), (2, 3, 7), (3, 4, 5),
+            (0, 2, 7), (0, 4, 10),
+            (10, 11, 1)
+        )
+        def dijkstra_heuristic(node1, node2):
+            return 0
+        cached_path = G.shortest_path(0, 3, dijkstra_heuristic)
+
+        G.remove_node(10)
+        assert G.shortest_path(0, 3, dijkstra_heuristic) is cached_path
+
+        G.remove_node(2)
+        G.remove_node(4)
+        with pytest.raises(ValueError, match='Unable to find a path'):
+            G.shortest_path(0, 3, dijkstra_heuristic)
+
+    def test_mutations_invalidate_affected_cached_results(self, graph_class):
+        G = graph_class(
+            (0, 1, 5), (1, 2, 3), (2, 3, 7), (3, 4, 5),
+            (0, 2, 7), (0, 4, 11),
+            (10, 11, 1)
+        )
+        assert G.all_shortest_paths(0, 3) == ([[0, 2, 3]], 14)
+        assert G.out_edges(1) == {(1, 2)} | (
+            set() if G.is_directed else {(1, 0)}
+        )
+
+        G.remove_edge((0, 2))
+        assert G.all_shortest_paths(0, 3) == ([[0, 1, 2, 3]], 15)
+
+        G.add_edge((1, 3))
+        G[1, 3]['weight'] = 1
+        assert G.all_shortest_paths(0, 3) == ([[0, 1, 3]], 6)
+        assert (1, 3) in G.out_edges(1)
+
+    def test_cached_results_are_not_shared_between_graphs(self, graph_class):
+        G = graph_class((0, 1, 1), (1, 2, 1))
+        H = graph_class((0, 1, 1), (1, 2, 1))
+
+        G.remove_node(1)
+
+        assert H.all_shortest_paths(0, 2) == ([[0, 1, 2]], 2)
+        assert G.all_shortest_paths(0, 2) == ([], math.inf)
+
+
 class TestGraph:
     def test_can_retrieve_neighbors_of_a_given_node(self):
         G = UndirectedGraph((0, 1), (1, 2), (2, 3), (3, 4), (3, 0), (0, 2), (0, 4))
@@ -317,6 +605,77 @@ class TestGraph:
         }
         assert actual_clique_membership == expected_clique_membership
 
+    def test_can_find_a_maximum_clique(self, karate_club):
+        assert karate_club.max_clique() in ({1, 2, 3, 4, 8}, {1, 2, 3, 4, 14})
+
+    def test_can_find_maximal_cliques_of_a_given_size(self, karate_club):
+        maximal_cliques = karate_club.cliques()
+
+        for size in range(7):
+            assert sorted(map(sorted, karate_club.cliques_of_size(size))) == (
+                sorted(
+                    sorted(clique)
+                    for clique in maximal_cliques
+                    if len(clique) == size
+                )
+            )
+
+    def test_can_enumerate_triangles_once_each(self, karate_club):
+        triangles = list(karate_club.triangles())
+
+        assert len(triangles) == 45
+        assert len({frozenset(triangle) for triangle in triangles}) == 45
+        for triangle in triangles:
+            for node, other_node in itertools.combinations(triangle, 2):
+                assert other_node in karate_club.neighbors(node)
+
+    def test_can_count_k_cliques_containing_a_filtered_node(self):
+        lan = UndirectedGraph(*(line.split('-') for line in [
+            'kh-tc', 'qp-kh', 'de-cg', 'ka-co', 'yn-aq', 'qp-ub', 'cg-tb',
+            'vc-aq', 'tb-ka', 'wh-tc', 'yn-cg', 'kh-ub', 'ta-co', 'de-co',
+            'tc-td', 'tb-wq', 'wh-td', 'ta-ka', 'td-qp', 'aq-cg', 'wq-ub',
+            'ub-vc', 'de-ta', 'wq-aq', 'wq-vc', 'wh-yn', 'ka-de', 'kh-ta',
+            'co-tc', 'wh-qp', 'tb-vc', 'td-yn'
+        ]))
+
+        assert lan.count_k_cliques(3) == 12
+        assert lan.count_k_cliques(
+            3, filter=lambda pc: pc.startswith('t')
+        ) == 7
+        assert len(list(
+            lan.triangles(filter=lambda pc: pc.startswith('t'))
+        )) == 7
+        assert lan.count_k_cliques(4) == 1
+        assert lan.count_k_cliques(2) == 32
+        with pytest.raises(ValueError):
+            lan.count_k_cliques(0)
+
+    def test_cliques_can_be_streamed(self):
+        # A complete 12-partite graph with parts of size 3 has 3 ** 12
+        # maximal cliques, far too many to list just to look at a few.
+        G = UndirectedGraph(*(
+            (node, other_node)
+            for node, other_node in itertools.combinations(range(36), 2)
+            if node // 3 != other_node // 3
+        ))
+
+        first_cliques = list(itertools.islice(G.iter_cliques(), 5))
+
+        assert len(first_cliques) == 5
+        for clique in first_cliques:
+            assert len(clique) == 12
+            assert {node // 3 for node in clique} == set(range(12))
+
+
+    def test_undirected_edges_are_stored_and_iterated_once(self):
+        with pytest.raises(ValueError, match='multiple copies'):
+            UndirectedGraph((0, 1), (1, 0))
+
+        G = grid2d(40, 40)
+
+        assert len(G.edges) == 2 * 40 * 39
+        assert sum(1 for _ in G.edges) == len(G.edges)
+
 
 class TestDiGraph:
     def test_can_retrieve_parents_and_children_of_a_given_node(self):
@@ -354,9 +713,111 @@ class TestDiGraph:
         for source, target in DAG.edges:
             assert sorted_nodes.index(source) < sorted_nodes.index(target)
 
+    def test_sort_topologically_scales_to_large_dags(self):
+        layer_width, layer_count = 50, 40
+        DAG = DiGraph(*{
+            (
+                (layer, position),
+                (layer + 1, (position * step + 1) % layer_width)
+            )
+            for layer in range(layer_count - 1)
+            for position in range(layer_width)
+            for step in (1, 3, 7, 11, 13)
+        })
+
+        sorted_nodes = DAG.sort_topologically()
+
+        node_position = {node: index for index, node in enumerate(sorted_nodes)}
+        assert len(sorted_nodes) == layer_width * layer_count
+        for source, target in DAG.edges:
+            assert node_position[source] < node_position[target]
+
+    def test_stable_topological_sort_prefers_earlier_nodes(self):
+        DAG = DiGraph((3, 4), (0, 4), (2, 1), (1, 4))
+
+        assert DAG.sort_topologically(stable=True) == [3, 0, 2, 1, 4]
+        assert DAG.to_compact().sort_topologically(stable=True) == [
+            3, 0, 2, 1, 4
+        ]
+
+    @pytest.mark.parametrize('compact', (False, True))
+    def test_sort_topologically_raises_cycle_error_naming_a_cycle(
+            self, compact
+    ):
+        G = DiGraph((0, 1), (1, 2), (2, 3), (3, 1), (3, 4), (5, 0))
+        if compact:
+            G = G.to_compact()
+
+        with pytest.raises(CycleError, match='cycle') as cycle_error:
+            G.sort_topologically()
+
+        cycle = cycle_error.value.cycle
+        assert set(cycle) == {1, 2, 3}
+        for source, target in zip(cycle, cycle[1:] + cycle[:1]):
+            assert (source, target) in G.edges
+
+    def test_self_loops_are_reported_as_cycles(self):
+        with pytest.raises(CycleError) as cycle_error:
+            DiGraph((0, 1), (1, 1)).sort_topologically()
+
+        assert cycle_error.value.cycle == [1]
+
+    def test_topological_order_is_updated_after_removing_nodes(self):
+        DAG = DiGraph((0, 1), (1, 2), (2, 3), (0, 2), (4, 3))
+        DAG.sort_topologically()
+
+        DAG.remove_node(2)
+        DAG.add_node(5)
+        DAG.add_edge((3, 1))
+        sorted_nodes = DAG.sort_topologically()
 
+        assert set(sorted_nodes) == {0, 1, 3, 4, 5}
+        for source, target in DAG.edges:
+            assert sorted_nodes.index(source) < sorted_nodes.index(target)
+
+    def test_strongly_connected_components_and_condensation(self):
+        G = DiGraph(
+            (0, 1), (1, 2), (2, 0), (2, 3), (3, 4), (4, 3), (4, 5),
+            (6, 5), (5, 6), (7, 7), (0, 7)
+        )
+        G.add_node(8)
+        expected_components = [{0, 1, 2}, {3, 4}, {5, 6}, {7}, {8}]
+
+        for H in (G, G.to_compact()):
+            components = H.strongly_connected_components()
+            assert sorted(components, key=min) == expected_components
+            # Tarjan's algorithm emits components in reverse topological order
+            position = {
+                node: index
+                for index, component in enumerate(components)
+                for node in component
+            }
+            for source, target in H.edges:
+                assert position[source] >= position[target]
+
+        condensed = G.condensation()
+        assert set(condensed.nodes) == set(map(frozenset, expected_components))
+        assert set(condensed.edges) == {
+            (frozenset({0, 1, 2}), frozenset({3, 4})),
+            (frozenset({0, 1, 2}), frozenset({7})),
+            (frozenset({3, 4}), frozenset({5, 6}))
+        }
+        assert len(condensed.sort_topologically()) == 5
+
+    def test_strongly_connected_components_do_not_recurse(self):
+        node_count = 100_000
+        G = DiGraph(*((node, node + 1) for node in range(node_count - 1)))
+        G.add_edge((node_count - 1, 0))
+
+        assert G.strongly_connected_components() == [set(range(node_count))]
+        assert G.reachable_from(node_count // 2, bitset=True) == (
+            (1 << node_count) - 1
+        )
+
+
+@pytest.mark.parametrize('implicit', (False, True))
 class TestGraphConstructors:
-    def test_grid2d_creates_2d_grid_of_given_shape(self):
+    def test_grid2d_creates_2d_grid_of_given_shape(self, implicit):
         shape = (2, 3)
         expected_edges = {
             ((0, 0), (0, 1)), ((0, 1), (0, 2)),
@@ -366,18 +827,19 @@ class TestGraphConstructors:
 
         expected_grid = UndirectedGraph(*expected_edges)
 
-        actual_grid = grid2d(*shape)
+        actual_grid = grid2d(*shape, implicit=implicit)
         assert set(actual_grid.nodes) == set(expected_grid.nodes)
         assert set(actual_grid.edges) == set(expected_grid.edges)
+        assert len(actual_grid.edges) == len(expected_edges)
 
-    def test_day18_part1_example1(self):
+    def test_day18_part1_example1(self, implicit):
         pushed_bytes = '\n'.join([
             '5,4', '4,2', '4,5', '3,0', '2,1', '6,3', '2,4', '1,5', '0,6',
             '3,3', '2,6', '5,1', '1,2', '5,5', '2,5', '6,5', '1,4', '0,4',
             '6,4', '1,1', '6,1', '1,0', '0,5', '1,6', '2,0'
         ])
 
-        memory_space = grid2d(7, 7)
+        memory_space = grid2d(7, 7, implicit=implicit)
         for pushed_byte in pushed_bytes.split('\n')[:12]:
             grid_node = tuple(map(int, pushed_byte.split(',')))[::-1]
             memory_space.remove_node(grid_node)
@@ -395,4 +857,380 @@ class TestGraphConstructors:
         path, distance = memory_space.shortest_path(
             source=(0, 0), target=(6, 6), heuristic=taxicab, edge_weight=1
         )
-        assert distance == 22
\ No newline at end of file
+        assert distance == 22
+
+    def test_day18_part2_example1(self, implicit):
+        pushed_bytes = [
+            '5,4', '4,2', '4,5', '3,0', '2,1', '6,3', '2,4', '1,5', '0,6',
+            '3,3', '2,6', '5,1', '1,2', '5,5', '2,5', '6,5', '1,4', '0,4',
+            '6,4', '1,1', '6,1', '1,0', '0,5', '1,6', '2,0'
+        ]
+        memory_space = grid2d(7, 7, implicit=implicit)
+        removals = [
+            tuple(map(int, pushed_byte.split(',')))[::-1]
+            for pushed_byte in pushed_bytes
+        ]
+
+        index, node = first_disconnecting_removal(
+            memory_space, (0, 0), (6, 6), removals
+        )
+
+        assert pushed_bytes[index] == '6,1' and node == (1, 6)
+        assert len(memory_space.nodes) == 49
+        with pytest.raises(ValueError, match='remains reachable'):
+            first_disconnecting_removal(
+                memory_space, (0, 0), (6, 6), removals[:index]
+            )
+
+
+    def test_removals_of_missing_nodes_are_ignored(self, implicit):
+        grids = {
+            'undirected': grid2d(3, 3, implicit=implicit),
+            'directed': grid2d(3, 3).to_directed()
+        }
+        results = {}
+        for kind, grid in grids.items():
+            grid.remove_node((0, 1))
+            grid.remove_node((2, 1))
+            results[kind] = first_disconnecting_removal(
+                grid, (0, 0), (0, 2), [(1, 1), (0, 1)]
+            )
+
+        assert results == {
+            'undirected': (0, (1, 1)),
+            'directed': (0, (1, 1))
+        }
+
+class TestImplicitGridGraph:
+    def test_mask_determines_nodes_and_edges(self):
+        G = ImplicitGridGraph((3, 4), bytes([
+            1, 1, 0, 1,
+            1, 0, 1, 1,
+            1, 1, 1, 0
+        ]))
+
+        assert len(G.nodes) == 9
+        assert (0, 2) not in G.nodes and (2, 2) in G.nodes
+        assert len(G.edges) == len(list(G.edges)) == 8
+        assert G.neighbors((2, 1)) == {(2, 0), (2, 2)}
+        assert G.out_edges((0, 0)) == {((0, 0), (0, 1)), ((0, 0), (1, 0))}
+        with pytest.raises(KeyError):
+            G.neighbors((1, 1))
+
+    def test_multi_source_shortest_paths_on_grids(self):
+        G = ImplicitGridGraph((3, 4), bytes([
+            1, 1, 0, 1,
+            1, 0, 1, 1,
+            1, 1, 1, 0
+        ]))
+
+        distances = multi_source_shortest_paths(
+            G, [(2, 2), (0, 0)], targets=[(0, 3), (2, 0)], edge_weight=1,
+            workers=2
+        )
+
+        assert distances == {
+            (2, 2): {(0, 3): 3, (2, 0): 2},
+            (0, 0): {(0, 3): 7, (2, 0): 2}
+        }
+
+    def test_distance_fields_are_indexed_by_cell(self):
+        G = ImplicitGridGraph((2, 3), bytes([
+            1, 0, 1,
+            1, 1, 1
+        ]))
+
+        distances = G.distances_from((0, 0))
+
+        assert distances.distance_array() == array(
+            'd', [0, math.inf, 4, 1, 2, 3]
+        )
+        assert distances.path((0, 2)) == [
+            (0, 0), (1, 0), (1, 1), (1, 2), (0, 2)
+        ]
+        assert G.distances_to((0, 2))[0, 0] == 4
+
+    def test_removing_and_restoring_nodes_updates_cached_paths(self):
+        G = ImplicitGridGraph((3, 3))
+
+        assert G.shortest_path((0, 0), (0, 2), lambda p1, p2: 0) == (
+            [(0, 0), (0, 1), (0, 2)], 2
+        )
+
+        G.remove_node((0, 1))
+        path, distance = G.shortest_path((0, 0), (0, 2), lambda p1, p2: 0)
+        assert distance == 4 and (0, 1) not in path
+        assert len(G.nodes) == 8 and len(G.edges) == 9
+
+        G.add_node((0, 1))
+        assert G.bidirectional_shortest_path((0, 0), (0, 2))[1] == 2
+        assert G.shortest_path_dag((0, 0), (2, 2)).count_paths() == 6
+
+    def test_grid_edges_have_no_weight_attribute(self):
+        with pytest.raises(KeyError):
+            ImplicitGridGraph((2, 2)).all_shortest_paths(
+                (0, 0), edge_weight='weight'
+            )
+
+
+@pytest.mark.parametrize(
+    'graph_class',
+    (UndirectedGraph, DiGraph)
+)
+class TestCompactGraph:
+    def test_compact_graph_has_the_same_nodes_and_edges(self, graph_class):
+        G = graph_class(
+            (0, 1, 5), (1, 2, 3), (2, 3, 7), (3, 4, 5),
+            (0, 2, 7), (0, 4, 10), (10, 11, 1), (5, 5, 2)
+        )
+
+        compact_G = G.to_compact()
+
+        assert compact_G.is_directed == G.is_directed
+        assert set(compact_G.nodes) == set(G.nodes)
+        assert set(compact_G.edges) == set(G.edges)
+        assert len(compact_G.edges) == len(G.edges)
+        for edge in G.edges:
+            assert compact_G[edge]['weight'] == G.edges[edge]['weight']
+            assert edge in compact_G.edges
+            assert G.is_directed or edge[::-1] in compact_G.edges
+        for node in G.nodes:
+            assert compact_G.in_edges(node) == G.in_edges(node)
+            assert compact_G.out_edges(node) == G.out_edges(node)
+            assert compact_G.in_nodes(node) == G.in_nodes(node)
+            assert compact_G.out_nodes(node) == G.out_nodes(node)
+
+    def test_compact_graph_computes_the_same_shortest_paths(
+            self, graph_class
+    ):
+        G = graph_class(
+            (0, 1, 5), (1, 2, 3), (2, 3, 7), (3, 4, 5),
+            (0, 2, 7), (0, 4, 10),
+            (10, 11, 1)
+        )
+
+        compact_G = G.to_compact()
+
+        assert compact_G.all_shortest_paths(0) == G.all_shortest_paths(0)
+        for target in (1, 2, 3, 4):
+            assert (
+                compact_G.shortest_path(0, target, lambda p1, p2: 0)
+                == G.shortest_path(0, target, lambda p1, p2: 0)
+            )
+            assert (
+                compact_G.all_shortest_paths(0, target)
+                == G.all_shortest_paths(0, target)
+            )
+        with pytest.raises(ValueError, match='Unable to find a path'):
+            compact_G.shortest_path(0, 10, lambda p1, p2: 0)
+
+    def test_compact_graph_supports_goal_set_and_bidirectional_searches(
+            self, graph_class
+    ):
+        G = graph_class(*(
+            (node, neighbor, 1) for node, neighbor in grid2d(12, 12).edges
+        ))
+        compact_G = G.to_compact()
+
+        def manhattan(p1, p2):
+            return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
+
+        path, distance = compact_G.shortest_path_to_any(
+            (0, 0), [(11, 11), (3, 9), (9, 4)], manhattan
+        )
+        assert path[-1] == (3, 9) and distance == 12
+
+        path, distance = compact_G.bidirectional_shortest_path((0, 0), (11, 7))
+        assert distance == 18 == len(path) - 1
+        for node, next_node in itertools.pairwise(path):
+            assert (node, next_node) in G.edges
+
+    def test_compact_graph_supports_constant_edge_weights(self, graph_class):
+        G = grid2d(5, 5)
+        if graph_class is DiGraph:
+            G = G.to_directed()
+
+        path, distance = G.to_compact().shortest_path(
+            (0, 0), (4, 4), lambda p1, p2: 0, edge_weight=1
+        )
+
+        assert distance == 8
+        assert path[0] == (0, 0) and path[-1] == (4, 4)
+
+    def test_bulk_constructors_match_the_edge_constructor(self, graph_class):
+        weighted_edges = [
+            ('a', 'b', 5), ('b', 'c', 3), ('c', 'd', 7), ('d', 'a', 5),
+            ('a', 'c', 7), ('e', 'e', 2), ('f', 'g', 1)
+        ]
+        G = graph_class(*weighted_edges)
+        sources, targets, weights = zip(*weighted_edges)
+
+        directed = G.is_directed
+
+        for bulk_G in (
+                CompactGraph.from_arrays(
+                    sources, targets, weights, directed=directed
+                ),
+                CompactGraph.from_edge_iterable(
+                    iter(weighted_edges), directed=directed
+                )
+        ):
+            assert bulk_G.is_directed == G.is_directed
+            assert set(bulk_G.nodes) == set(G.nodes)
+            assert len(bulk_G.edges) == len(G.edges)
+            for edge in G.edges:
+                assert edge in bulk_G.edges
+                assert bulk_G[edge]['weight'] == G.edges[edge]['weight']
+            for node in G.nodes:
+                assert bulk_G.out_nodes(node) == G.out_nodes(node)
+                assert bulk_G.in_nodes(node) == G.in_nodes(node)
+            assert bulk_G.all_shortest_paths('a', 'd')[1] == (
+                G.all_shortest_paths('a', 'd')[1]
+            )
+
+        unweighted_G = CompactGraph.from_edge_iterable(
+            [(0, 1), (1, 2)], default_edge_weight=4, directed=directed
+        )
+        assert unweighted_G[1, 2]['weight'] == 4
+        with pytest.raises(ValueError, match='same length'):
+            CompactGraph.from_arrays([0, 1], [1], [1, 1])
+
+
+    @pytest.mark.parametrize('mmap', (True, False))
+    def test_graph_snapshots_round_trip(self, graph_class, tmp_path, mmap):
+        G = graph_class(
+            ((0, 0), (0, 1), 5), ((0, 1), (1, 1), 3), ((1, 1), (1, 0), 7),
+            ((1, 0), (0, 0), 5), ((0, 0), (1, 1), 7), ((2, 2), (2, 3), 1)
+        )
+        G.add_node((9, 9))
+
+        content_hash = G.save(tmp_path / 'graph')
+        loaded_G = graph_class.load(
+            tmp_path / 'graph', mmap=mmap, content_hash=content_hash
+        )
+
+        assert loaded_G.is_directed == G.is_directed
+        assert list(loaded_G.nodes) == list(G.nodes)
+        assert len(loaded_G.edges) == len(G.edges)
+        for edge in G.edges:
+            assert loaded_G[edge]['weight'] == G.edges[edge]['weight']
+        for node in G.nodes:
+            assert loaded_G.in_nodes(node) == G.in_nodes(node)
+        assert loaded_G.all_shortest_paths((0, 0), (1, 0)) == (
+            G.all_shortest_paths((0, 0), (1, 0))
+        )
+        assert loaded_G.save(tmp_path / 'copy') == content_hash
+
+        with pytest.raises(ValueError, match='content hash'):
+            graph_class.load(tmp_path / 'graph', content_hash='stale')
+        (tmp_path / 'not_a_graph').write_bytes(b'#.#.#\n')
+        with pytest.raises(ValueError, match='not a graph snapshot'):
+            graph_class.load(tmp_path / 'not_a_graph', mmap=mmap)
+
+    def test_graph_snapshots_keep_non_numeric_weights(
+            self, graph_class, tmp_path
+    ):
+        G = graph_class(('a', 'b', 'left'), ('b', 'c', None))
+
+        G.save(tmp_path / 'graph')
+        loaded_G = graph_class.load(tmp_path / 'graph')
+
+        assert loaded_G['a', 'b']['weight'] == 'left'
+        assert loaded_G['b', 'c']['weight'] is None
+
+
+def test_compact_graphs_can_be_built_from_csr_arrays():
+    out_adjacency = (
+        array('q', [0, 2, 3, 3]), array('q', [1, 2, 2]), array('q', [4, 1, 2])
+    )
+
+    G = CompactGraph.from_csr('abc', out_adjacency)
+
+    assert set(G.edges) == {('a', 'b'), ('a', 'c'), ('b', 'c')}
+    assert G.in_nodes('c') == {'a', 'b'}
+    assert G.all_shortest_paths('a', 'c') == ([['a', 'c']], 1)
+    with pytest.raises(ValueError, match='offsets'):
+        CompactGraph.from_csr('ab', out_adjacency)
+
+    undirected_G = CompactGraph.from_csr(
+        'ab',
+        (array('q', [0, 2, 3]), array('q', [0, 1, 0]), [1, 2, 2]),
+        directed=False
+    )
+    assert len(undirected_G.edges) == 2
+    assert undirected_G.neighbors('b') == {'a'}
+
+
+def test_compact_digraph_can_be_topologically_sorted():
+    DAG = DiGraph(
+        (0, 1), (1, 2), (2, 3), (3, 4), (0, 2), (0, 4),
+        (5, 2), (5, 3), (5, 6), (5, 7), (5, 8),
+        (7, 4), (7, 11), (8, 4), (8, 11)
+    ).to_compact()
+
+    sorted_nodes = DAG.sort_topologically()
+
+    assert set(sorted_nodes) == set(DAG.nodes)
+    for source, target in DAG.edges:
+        assert sorted_nodes.index(source) < sorted_nodes.index(target)
+
+
+class TestShortestPathDAG:
+    def test_counts_paths_without_enumerating_them(self):
+        G = grid2d(15, 15).to_directed()
+
+        shortest_paths = G.shortest_path_dag((0, 0), (14, 14), edge_weight=1)
+
+        assert shortest_paths.distance((14, 14)) == 28
+        assert shortest_paths.count_paths() == math.comb(28, 14)
+        assert shortest_paths.nodes_on_paths() == set(G.nodes)
+
+    def test_paths_are_generated_lazily_in_order(self):
+        G = grid2d(15, 15)
+
+        shortest_paths = G.shortest_path_dag((0, 0), [(14, 14)], edge_weight=1)
+        first_paths = list(itertools.islice(shortest_paths.paths(), 5))
+
+        assert len(first_paths) == 5
+        for path in first_paths:
+            assert path[0] == (0, 0) and path[-1] == (14, 14)
+            assert len(path) == 29
+            for node, next_node in itertools.pairwise(path):
+                assert (node, next_node) in G.edges
+
+    def test_paths_can_be_recovered_along_long_corridors(self):
+        corridor_length = 5000
+        G = DiGraph(*((node, node + 1, 1) for node in range(corridor_length)))
+
+        paths, distance = G.all_shortest_paths(0, corridor_length)
+
+        assert distance == corridor_length
+        assert paths == [list(range(corridor_length + 1))]
+
+    def test_path_enumeration_can_be_limited(self):
+        G = grid2d(15, 15)
+
+        shortest_paths = G.shortest_path_dag((0, 0), (14, 14), edge_weight=1)
+
+        assert len(list(shortest_paths.paths(limit=10))) == 10
+        assert len(list(shortest_paths.paths((14, 14), limit=0))) == 0
+
+    def test_multiple_targets_match_single_target_searches(self):
+        G = DiGraph(
+            (0, 1, 1), (0, 2, 1), (1, 3, 1), (2, 3, 1), (3, 4, 2), (3, 5, 5),
+            (4, 5, 3), (6, 5, 1)
+        )
+
+        shortest_paths = G.shortest_path_dag(0, (3, 5, 6))
+
+        assert shortest_paths.nearest_targets == [3]
+        assert shortest_paths.shortest_distance == 2
+        assert shortest_paths.distance(5) == 7
+        assert shortest_paths.distance(6) == math.inf
+        assert shortest_paths.count_paths(5) == 4
+        assert sorted(shortest_paths.paths(5)) == sorted(
+            G.all_shortest_paths(0, 5, with_distance=False)
+        )
+        assert shortest_paths.nodes_on_paths(5) == {0, 1, 2, 3, 4, 5}
+        assert list(shortest_paths.paths(6)) == []
+        assert shortest_paths.count_paths(6) == 0
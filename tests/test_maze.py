@@ -1,5 +1,6 @@
 import pytest
 
+from aoc2024.graph_theory import SearchStatistics
 from aoc2024.maze import Maze
 from aoc2024.pathfinding import Direction
 
@@ -15,6 +16,42 @@ def test_from_map_with_orientation_requires_a_start_orientation_parameter():
         )
 
 
+def test_from_map_rejects_unknown_map_entries():
+    with pytest.raises(ValueError, match="'x' is not a valid Component"):
+        Maze.from_map('\n'.join(['S.x', '..E']))
+
+
+def test_from_map_pads_ragged_rows_with_walls():
+    maze = Maze.from_map('\n'.join(['S..', '.', '..E.']))
+
+    assert maze.start == (0, 0)
+    assert maze.ends == {(2, 2)}
+    assert maze.find_cheapest_path() == (
+        [(0, 0), (1, 0), (2, 0), (2, 1), (2, 2)], 4
+    )
+
+
+def test_from_file_matches_from_map(tmp_path):
+    unparsed_maze = '\n'.join(['#####', '#S..#', '#.#E#', '#####'])
+    (tmp_path / 'maze.txt').write_text(unparsed_maze + '\n')
+
+    mapped_maze = Maze.from_file(
+        tmp_path / 'maze.txt',
+        oriented_nodes=True,
+        start_direction=Direction.RIGHT
+    )
+    parsed_maze = Maze.from_map(
+        unparsed_maze, oriented_nodes=True, start_direction=Direction.RIGHT
+    )
+
+    assert mapped_maze.start == parsed_maze.start == ((1, 1), Direction.RIGHT)
+    assert mapped_maze.ends == parsed_maze.ends
+    assert set(mapped_maze.to_graph().edges) == set(
+        parsed_maze.to_graph().edges
+    )
+    assert mapped_maze.find_cheapest_paths_dag().shortest_distance == 1003
+
+
 def test_day16_part1_example1():
     unparsed_maze = '\n'.join([
         '###############',
@@ -129,6 +166,61 @@ def test_find_all_cheapest_paths_day16_part2_example1():
     assert len(best_path_positions) == 45
 
 
+def test_find_all_cheapest_paths_can_limit_or_count_paths():
+    unparsed_maze = '\n'.join([
+        '#######',
+        '#....E#',
+        '#.....#',
+        '#.....#',
+        '#S....#',
+        '#######'
+    ])
+    maze = Maze.from_map(unparsed_maze)
+    end = next(iter(maze.ends))
+
+    limited_paths, distance = maze.find_all_cheapest_paths(limit=3)[end]
+    path_count, _ = maze.find_all_cheapest_paths(count_only=True)[end]
+    capped_path_count, _ = maze.find_all_cheapest_paths(
+        limit=3, count_only=True
+    )[end]
+
+    assert distance == 7
+    assert len(limited_paths) == 3
+    assert all(len(path) == 8 for path in limited_paths)
+    assert path_count == 35
+    assert capped_path_count == 3
+
+
+def test_find_cheapest_paths_dag_day16_part2_example1():
+    unparsed_maze = '\n'.join([
+        '#################',
+        '#...#...#...#..E#',
+        '#.#.#.#.#.#.#.#.#',
+        '#.#.#.#...#...#.#',
+        '#.#.#.#.###.#.#.#',
+        '#...#.#.#.....#.#',
+        '#.#.#.#.#.#####.#',
+        '#.#...#.#.#.....#',
+        '#.#.#####.#.###.#',
+        '#.#.#.......#...#',
+        '#.#.###.#####.###',
+        '#.#.#...#.....#.#',
+        '#.#.#.#####.###.#',
+        '#.#.#.........#.#',
+        '#.#.#.#########.#',
+        '#S#.............#',
+        '#################'
+    ])
+    maze = Maze.from_map(
+        unparsed_maze, oriented_nodes=True, start_direction=Direction.RIGHT
+    )
+
+    best_paths = maze.find_cheapest_paths_dag()
+
+    assert best_paths.shortest_distance == 11048
+    assert len({position for position, _ in best_paths.nodes_on_paths()}) == 64
+
+
 def test_find_all_cheapest_paths_day20_part1_example1():
     unparsed_maze = '\n'.join([
         '###############',
@@ -183,3 +275,306 @@ def test_find_cheapest_path_day20_part1_example1():
     best_paths = grid.all_shortest_paths(start, end, with_distance=True, edge_weight=1)
 
     assert best_paths[1] == 84
+
+
+def test_from_map_reuses_cached_graphs(tmp_path):
+    unparsed_maze = '\n'.join([
+        '#######',
+        '#...#E#',
+        '#.#.#.#',
+        '#S#...#',
+        '#######'
+    ])
+    built_maze = Maze.from_map(
+        unparsed_maze,
+        oriented_nodes=True,
+        start_direction=Direction.RIGHT,
+        cache_directory=tmp_path
+    )
+    cached_files = list(tmp_path.iterdir())
+    cached_maze = Maze.from_map(
+        unparsed_maze,
+        oriented_nodes=True,
+        start_direction=Direction.RIGHT,
+        cache_directory=tmp_path
+    )
+
+    assert len(cached_files) == 1
+    assert list(tmp_path.iterdir()) == cached_files
+    assert cached_maze.start == built_maze.start
+    assert cached_maze.ends == built_maze.ends
+    assert cached_maze.to_graph() is cached_maze.to_graph()
+    assert (
+        cached_maze.find_cheapest_paths_dag().shortest_distance
+        == built_maze.find_cheapest_paths_dag().shortest_distance
+        == 5010
+    )
+
+    Maze.from_map(unparsed_maze, cache_directory=tmp_path)
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+@pytest.mark.parametrize('kept_bytes', [0, 12, 40, -5])
+def test_from_map_rebuilds_corrupt_cached_graphs(tmp_path, kept_bytes):
+    unparsed_maze = '\n'.join([
+        '#######',
+        '#...#E#',
+        '#.#.#.#',
+        '#S#...#',
+        '#######'
+    ])
+    Maze.from_map(unparsed_maze, cache_directory=tmp_path)
+    cache_file, = tmp_path.iterdir()
+    cache_contents = cache_file.read_bytes()
+    cache_file.write_bytes(cache_contents[:kept_bytes])
+
+    maze = Maze.from_map(unparsed_maze, cache_directory=tmp_path)
+
+    assert maze.find_cheapest_paths_dag().shortest_distance == 10
+    assert cache_file.read_bytes() == cache_contents
+
+
+def test_distances_from_start_day20_part1_example1():
+    unparsed_maze = '\n'.join([
+        '###############',
+        '#...#...#.....#',
+        '#.#.#.#.#.###.#',
+        '#S#...#.#.#...#',
+        '#######.#.#.###',
+        '#######.#.#...#',
+        '#######.#.###.#',
+        '###..E#...#...#',
+        '###.#######.###',
+        '#...###...#...#',
+        '#.#####.#.###.#',
+        '#.#...#.#.#...#',
+        '#.#.#.#.#.#.###',
+        '#...#...#...###',
+        '###############'
+    ])
+    maze = Maze.from_map(unparsed_maze)
+    end = next(iter(maze.ends))
+
+    distances = maze.distances_from_start()
+
+    assert distances[end] == 84
+    assert len(distances) == 85
+    assert distances.path(end)[0] == maze.start
+
+
+@pytest.mark.parametrize('oriented_nodes', (False, True))
+def test_implicit_mazes_match_materialized_mazes(oriented_nodes):
+    unparsed_maze = '\n'.join([
+        '#################',
+        '#...#...#...#..E#',
+        '#.#.#.#.#.#.#.#.#',
+        '#.#.#.#...#...#.#',
+        '#.#.#.#.###.#.#.#',
+        '#...#.#.#.....#.#',
+        '#.#.#.#.#.#####.#',
+        '#.#...#.#.#.....#',
+        '#.#.#####.#.###.#',
+        '#.#.#.......#...#',
+        '#.#.###.#####.###',
+        '#.#.#...#.....#.#',
+        '#.#.#.#####.###.#',
+        '#.#.#.........#.#',
+        '#.#.#.#########.#',
+        '#S#.............#',
+        '#################'
+    ])
+    maze_options = {
+        'oriented_nodes': oriented_nodes,
+        'start_direction': Direction.RIGHT
+    }
+    maze = Maze.from_map(unparsed_maze, **maze_options)
+    implicit_maze = Maze.from_map(
+        unparsed_maze, implicit=True, **maze_options
+    )
+    graph, implicit_graph = maze.to_graph(), implicit_maze.to_graph()
+
+    assert set(implicit_graph.nodes) == set(graph.nodes)
+    assert len(implicit_graph.nodes) == len(graph.nodes)
+    for node in graph.nodes:
+        assert implicit_graph.out_nodes(node) == graph.out_nodes(node)
+        assert implicit_graph.in_nodes(node) == graph.in_nodes(node)
+    assert implicit_maze.find_cheapest_path() == maze.find_cheapest_path()
+    best_paths = maze.find_cheapest_paths_dag()
+    implicit_best_paths = implicit_maze.find_cheapest_paths_dag()
+    assert implicit_best_paths.shortest_distance == (
+        best_paths.shortest_distance
+    )
+    assert implicit_best_paths.nodes_on_paths() == best_paths.nodes_on_paths()
+    assert dict(implicit_maze.distances_from_start()) == dict(
+        maze.distances_from_start()
+    )
+
+
+@pytest.mark.parametrize('oriented_nodes', [False, True])
+def test_compressed_mazes_match_uncompressed_mazes(oriented_nodes):
+    unparsed_maze = '\n'.join([
+        '#################',
+        '#...#...#...#..E#',
+        '#.#.#.#.#.#.#.#.#',
+        '#.#.#.#...#...#.#',
+        '#.#.#.#.###.#.#.#',
+        '#...#.#.#.....#.#',
+        '#.#.#.#.#.#####.#',
+        '#.#...#.#.#.....#',
+        '#.#.#####.#.###.#',
+        '#.#.#.......#...#',
+        '#.#.###.#####.###',
+        '#.#.#...#.....#.#',
+        '#.#.#.#####.###.#',
+        '#.#.#.........#.#',
+        '#.#.#.#########.#',
+        '#S#.............#',
+        '#################'
+    ])
+    maze = Maze.from_map(
+        unparsed_maze,
+        oriented_nodes=oriented_nodes,
+        start_direction=Direction.RIGHT if oriented_nodes else None
+    )
+
+    compressed_maze = maze.compress()
+
+    assert compressed_maze.start == maze.start
+    assert compressed_maze.ends == maze.ends
+    assert (
+        len(compressed_maze.to_graph().nodes) * 2
+        < len(maze.to_graph().nodes)
+    )
+    compressed_paths = compressed_maze.find_all_cheapest_paths()
+    paths = maze.find_all_cheapest_paths()
+    path, distance = compressed_maze.find_cheapest_path()
+    assert distance == maze.find_cheapest_path()[1]
+    assert path in paths[path[-1]][0]
+    assert {
+        end: (sorted(end_paths), distance)
+        for end, (end_paths, distance) in compressed_paths.items()
+    } == {
+        end: (sorted(end_paths), distance)
+        for end, (end_paths, distance) in paths.items()
+    }
+    assert (
+        compressed_maze.nodes_on_cheapest_paths()
+        == maze.find_cheapest_paths_dag().nodes_on_paths()
+    )
+    assert compressed_maze.compress() is compressed_maze
+
+
+@pytest.mark.parametrize('oriented_nodes', [False, True])
+def test_compressing_keeps_equally_cheap_parallel_corridors(oriented_nodes):
+    # Each ring offers two corridors of the same cost between one pair of
+    # junctions, and both must stay on the cheapest paths.
+    unparsed_maze = '\n'.join([
+        '#' + '#####' * 3 + '#',
+        '#' + '#...#' * 3 + '#',
+        'S' + '..#..' * 3 + 'E',
+        '#' + '#...#' * 3 + '#',
+        '#' + '#####' * 3 + '#'
+    ])
+    maze = Maze.from_map(
+        unparsed_maze,
+        oriented_nodes=oriented_nodes,
+        start_direction=Direction.RIGHT if oriented_nodes else None
+    )
+
+    compressed_maze = maze.compress()
+
+    assert compressed_maze.find_all_cheapest_paths(count_only=True) == (
+        maze.find_all_cheapest_paths(count_only=True)
+    )
+    assert (
+        compressed_maze.nodes_on_cheapest_paths()
+        == maze.find_cheapest_paths_dag().nodes_on_paths()
+    )
+
+
+@pytest.mark.parametrize('oriented_nodes', [False, True])
+def test_stronger_heuristics_expand_fewer_nodes(oriented_nodes):
+    unparsed_maze = '\n'.join([
+        '#################',
+        '#...#...#...#..E#',
+        '#.#.#.#.#.#.#.#.#',
+        '#.#.#.#...#...#.#',
+        '#.#.#.#.###.#.#.#',
+        '#...#.#.#.....#.#',
+        '#.#.#.#.#.#####.#',
+        '#.#...#.#.#.....#',
+        '#.#.#####.#.###.#',
+        '#.#.#.......#...#',
+        '#.#.###.#####.###',
+        '#.#.#...#.....#.#',
+        '#.#.#.#####.###.#',
+        '#.#.#.........#.#',
+        '#.#.#.#########.#',
+        '#S#.............#',
+        '#################'
+    ])
+    maze = Maze.from_map(
+        unparsed_maze,
+        oriented_nodes=oriented_nodes,
+        start_direction=Direction.RIGHT if oriented_nodes else None
+    )
+    expected_distance = 11048 if oriented_nodes else 40
+
+    statistics = {}
+    for heuristic in ('taxicab', 'turns', 'landmarks'):
+        statistics[heuristic] = SearchStatistics()
+        _, distance = maze.find_cheapest_path(
+            heuristic, statistics[heuristic]
+        )
+        assert distance == expected_distance
+
+    assert (
+        statistics['landmarks'].nodes_expanded
+        < statistics['turns'].nodes_expanded
+        <= statistics['taxicab'].nodes_expanded
+    )
+    assert maze.heuristic('landmarks') is maze.heuristic('landmarks')
+    assert maze.heuristic('landmarks', 2) is not maze.heuristic('landmarks')
+    with pytest.raises(ValueError, match='Unknown heuristic'):
+        maze.find_cheapest_path('euclidean')
+
+
+def test_count_shortcuts_day20_examples():
+    unparsed_maze = '\n'.join([
+        '###############',
+        '#...#...#.....#',
+        '#.#.#.#.#.###.#',
+        '#S#...#.#.#...#',
+        '#######.#.#.###',
+        '#######.#.#...#',
+        '#######.#.###.#',
+        '###..E#...#...#',
+        '###.#######.###',
+        '#...###...#...#',
+        '#.#####.#.###.#',
+        '#.#...#.#.#...#',
+        '#.#.#.#.#.#.###',
+        '#...#...#...###',
+        '###############'
+    ])
+    maze = Maze.from_map(unparsed_maze)
+
+    assert maze.count_shortcuts(max_jump=2, min_saving=1, histogram=True) == {
+        2: 14, 4: 14, 6: 2, 8: 4, 10: 2, 12: 3, 20: 1, 36: 1, 38: 1, 40: 1,
+        64: 1
+    }
+    assert maze.count_shortcuts(max_jump=2, min_saving=1) == 44
+    assert maze.count_shortcuts(max_jump=20, min_saving=50) == 285
+    assert maze.count_shortcuts(
+        max_jump=20, min_saving=72, histogram=True
+    ) == {72: 22, 74: 4, 76: 3}
+
+
+def test_count_shortcuts_rejects_oriented_mazes():
+    maze = Maze.from_map(
+        '\n'.join(['S..', '..E']),
+        oriented_nodes=True,
+        start_direction=Direction.RIGHT
+    )
+    with pytest.raises(ValueError, match='oriented nodes'):
+        maze.count_shortcuts(max_jump=2, min_saving=1)